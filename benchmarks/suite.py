@@ -0,0 +1,412 @@
+"""
+Suíte de benchmarks: geradores, orquestração, codificação CSV e caminho HTTP.
+
+Cada caso roda em um processo novo, medindo linhas por segundo (melhor de
+N repetições) e o pico de memória residente (RSS) do processo. Os
+resultados são gravados em JSON e podem ser comparados com uma execução
+anterior; uma queda acima do limite faz o comando sair com código 1.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.suite --saida base.json
+    python -m benchmarks.suite --saida atual.json --comparar base.json \
+        --limite-regressao 0.15
+    python -m benchmarks.suite --escala completa --filtro orquestracao
+"""
+import argparse
+import json
+import multiprocessing
+import platform
+import resource
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import UTC, datetime
+
+import numpy as np
+
+# Padrões dos geradores de regex medidos isoladamente
+PADROES = {
+    "CPF": r"\d{3}\.\d{3}\.\d{3}-\d{2}",
+    "UUID": (
+        r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-"
+        r"[0-9a-fA-F]{4}-[0-9a-fA-F]{12}"
+    ),
+    "IPV4": r"((25[0-5]|2[0-4]\d|1?\d?\d)\.){3}(25[0-5]|2[0-4]\d|1?\d?\d)",
+}
+
+# Distribuições adicionais medidas isoladamente
+DISTRIBUICOES = [
+    {"tipoGerador": "uniforme", "minimo": 0, "maximo": 100},
+    {"tipoGerador": "exponencial", "taxa": 0.5},
+    {"tipoGerador": "lognormal", "media": 0, "desvioPadrao": 1},
+    {"tipoGerador": "poisson", "media": 4},
+    {"tipoGerador": "categorico", "categorias": ["A", "B", "C", "D"],
+     "pesos": [0.5, 0.3, 0.15, 0.05]},
+]
+
+# Configurações de gerador usadas nas colunas (alternadas pela posição da coluna)
+CONFIGS_COLUNAS = [
+    {"tipoGerador": "regex", "expressao": "USER_[A-Z0-9]{8}"},
+    {"tipoGerador": "gaussiano", "media": 150.5, "desvioPadrao": 25.0},
+    {"tipoGerador": "linear", "valorInicial": 10, "incremento": 0.5},
+]
+
+ESCALAS = {
+    "rapida": {
+        "valores_gerador": 100_000,
+        "linhas": [10**3, 10**4, 10**5],
+        "colunas": [1, 10],
+        "linhas_csv": 100_000,
+        "linhas_http": 100_000,
+        "linhas_memoria": 100_000,
+        "requisicoes_latencia": 500,
+    },
+    "completa": {
+        "valores_gerador": 1_000_000,
+        "linhas": [10**3, 10**4, 10**5, 10**6, 10**7],
+        "colunas": [1, 10, 100],
+        "linhas_csv": 1_000_000,
+        "linhas_http": 1_000_000,
+        "linhas_memoria": 1_000_000,
+        "requisicoes_latencia": 5_000,
+    },
+}
+
+# 'gerar_dados' materializa todas as linhas em memória; acima deste
+# número de células o caso é pulado (a memória, e não a CPU, seria medida)
+MAX_CELULAS_PADRAO = 20_000_000
+
+
+def configuracao(num_linhas: int, num_colunas: int) -> dict:
+    """Configuração com 'num_colunas' colunas alternando regex, gaussiano e linear."""
+    return {
+        "numLinhas": num_linhas,
+        "colunas": [
+            {
+                "nome": f"C{i}",
+                "configGerador": CONFIGS_COLUNAS[i % len(CONFIGS_COLUNAS)],
+            }
+            for i in range(num_colunas)
+        ],
+    }
+
+
+def montar_casos(escala: str, max_celulas: int) -> list[dict]:
+    """Lista os casos da escala escolhida (cada caso é um dicionário serializável)."""
+    parametros = ESCALAS[escala]
+    valores = parametros["valores_gerador"]
+    casos = [
+        {"nome": f"gerador/regex-{nome}", "grupo": "gerador", "linhas": valores,
+         "config": {"tipoGerador": "regex", "expressao": expressao}}
+        for nome, expressao in PADROES.items()
+    ]
+    casos += [
+        {"nome": "gerador/gaussiano", "grupo": "gerador", "linhas": valores,
+         "config": CONFIGS_COLUNAS[1]},
+        {"nome": "gerador/linear", "grupo": "gerador", "linhas": valores,
+         "config": CONFIGS_COLUNAS[2]},
+    ]
+    casos += [
+        {"nome": f"gerador/{config['tipoGerador']}", "grupo": "gerador",
+         "linhas": valores, "config": config}
+        for config in DISTRIBUICOES
+    ]
+    for num_colunas in parametros["colunas"]:
+        for num_linhas in parametros["linhas"]:
+            casos.append({
+                "nome": f"orquestracao/gerar_dados-{num_linhas}x{num_colunas}",
+                "grupo": "orquestracao",
+                "linhas": num_linhas,
+                "colunas": num_colunas,
+                "pulado": (
+                    f"{num_linhas * num_colunas} células > --max-celulas {max_celulas}"
+                    if num_linhas * num_colunas > max_celulas else None
+                ),
+            })
+    casos += [
+        {"nome": "csv/converter_para_csv_string", "grupo": "csv",
+         "linhas": parametros["linhas_csv"], "colunas": 3},
+        # Memória de 'gerar_dados' por linha (aumento do pico de RSS / linhas)
+        {"nome": "memoria/gerar_dados-10-colunas", "grupo": "memoria",
+         "linhas": parametros["linhas_memoria"], "colunas": 10},
+        {"nome": "http/gerar-csv", "grupo": "http",
+         "linhas": parametros["linhas_http"], "colunas": 3},
+        # Requisições pequenas: domina o custo fixo (validação, construção, resposta)
+        {"nome": "latencia/gerar-csv-10-linhas", "grupo": "latencia",
+         "linhas": 10, "colunas": 10,
+         "requisicoes": parametros["requisicoes_latencia"]},
+        # Pré-visualização de 20 linhas de uma configuração de 10M linhas
+        {"nome": "latencia/pre-visualizar-20-linhas", "grupo": "latencia",
+         "rota": "/pre-visualizar", "linhas": 20, "numLinhas": 10_000_000,
+         "colunas": 10, "requisicoes": parametros["requisicoes_latencia"]},
+    ]
+    return casos
+
+
+def _rss_pico_mb() -> float:
+    """Pico de memória residente do processo atual, em MB."""
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KiB; macOS, em bytes
+    return pico / 1024**2 if sys.platform == "darwin" else pico / 1024
+
+
+def _preparar(caso: dict):
+    """
+    Importa e monta o que o caso precisa (fora da medição) e retorna a
+    função medida. Os imports ficam aqui para não pesar no processo principal.
+    """
+    grupo = caso["grupo"]
+    if grupo == "gerador":
+        from src.gerador_dados.modelos import ConfiguracaoColuna
+        from src.gerador_dados.servicos import get_gerador
+
+        config = ConfiguracaoColuna(
+            nome="C", configGerador=caso["config"]
+        ).configGerador
+
+        def medir():
+            get_gerador(config, np.random.default_rng(0)).gerarLote(caso["linhas"])
+        return medir
+
+    config = configuracao(caso.get("numLinhas", caso["linhas"]), caso["colunas"])
+    if grupo in ("orquestracao", "memoria"):
+        from src.gerador_dados.modelos import ConfiguracaoCSV
+        from src.gerador_dados.servicos import SistemaGerador
+
+        modelo = ConfiguracaoCSV.model_validate(config)
+        return lambda: SistemaGerador(modelo).gerar_dados()
+
+    if grupo == "csv":
+        from src.gerador_dados.modelos import ConfiguracaoCSV
+        from src.gerador_dados.servicos import SistemaGerador
+        from src.gerador_dados.utils_csv import converter_para_csv_string
+
+        sistema = SistemaGerador(ConfiguracaoCSV.model_validate(config))
+        dados = sistema.gerar_dados()
+        return lambda: converter_para_csv_string(dados, sistema.nomes_colunas)
+
+    if grupo == "latencia":
+        rota = caso.get("rota", "/gerar-csv")
+        return _preparar_latencia(config, caso["requisicoes"], rota)
+
+    if grupo == "http":
+        from fastapi.testclient import TestClient
+
+        from src.gerador_dados.main import app
+
+        client = TestClient(app)
+
+        def medir():
+            # 'identity': mede a geração e a codificação, não a compressão
+            response = client.post(
+                "/gerar-csv", json=config, headers={"Accept-Encoding": "identity"}
+            )
+            response.raise_for_status()
+
+        return medir
+
+    raise ValueError(f"Grupo de benchmark desconhecido: {grupo}")
+
+
+def _preparar_latencia(config: dict, requisicoes: int, rota: str):
+    """
+    Mede requisições pequenas chamando a aplicação ASGI no próprio loop de
+    eventos (httpx.ASGITransport), sem a ponte entre threads do TestClient,
+    que dominaria o tempo de uma requisição de poucas linhas.
+    """
+    import asyncio
+
+    import httpx
+
+    from src.gerador_dados.main import app
+
+    async def rodada(quantidade: int) -> list[float]:
+        transporte = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transporte, base_url="http://bench"
+        ) as client:
+            latencias = []
+            for _ in range(quantidade):
+                inicio = time.perf_counter()
+                response = await client.post(
+                    rota, json=config, headers={"Accept-Encoding": "identity"}
+                )
+                response.raise_for_status()
+                latencias.append(time.perf_counter() - inicio)
+            return latencias
+
+    asyncio.run(rodada(1))  # aquecimento: a primeira requisição compila o plano
+    return lambda: asyncio.run(rodada(requisicoes))
+
+
+def _cronometrar(funcao) -> float:
+    inicio = time.perf_counter()
+    funcao()
+    return time.perf_counter() - inicio
+
+
+def executar_caso(caso: dict, repeticoes: int) -> dict:
+    """Executa um caso (no processo filho) e devolve a melhor das repetições."""
+    medir = _preparar(caso)
+    if caso["grupo"] == "latencia":
+        # Latência por requisição: percentis sobre todas as repetições
+        latencias = np.concatenate([medir() for _ in range(repeticoes)])
+        media = float(latencias.mean())
+        return {
+            "segundos": media,
+            "linhasPorSegundo": caso["linhas"] / media,
+            "p50Ms": round(float(np.percentile(latencias, 50)) * 1000, 3),
+            "p99Ms": round(float(np.percentile(latencias, 99)) * 1000, 3),
+            "rssPicoMB": round(_rss_pico_mb(), 1),
+        }
+
+    if caso["grupo"] == "memoria":
+        # Uma única execução: o pico de RSS não diminui entre repetições
+        antes = _rss_pico_mb()
+        segundos = _cronometrar(medir)
+        depois = _rss_pico_mb()
+        return {
+            "segundos": segundos,
+            "linhasPorSegundo": caso["linhas"] / segundos,
+            "bytesPorLinha": round((depois - antes) * 1024**2 / caso["linhas"], 1),
+            "rssPicoMB": round(depois, 1),
+        }
+
+    tempos = [_cronometrar(medir) for _ in range(repeticoes)]
+    melhor = min(tempos)
+    return {
+        "segundos": melhor,
+        "linhasPorSegundo": caso["linhas"] / melhor,
+        "rssPicoMB": round(_rss_pico_mb(), 1),
+    }
+
+
+def _commit_atual() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def comparar(atual: dict, base: dict, limite: float) -> list[str]:
+    """
+    Compara duas execuções caso a caso. Retorna as regressões: queda de
+    linhas/s ou aumento do pico de RSS (ou da latência p99) maiores que
+    'limite' (fração).
+    """
+    anteriores = {r["nome"]: r for r in base["resultados"] if "segundos" in r}
+    regressoes = []
+    for resultado in atual["resultados"]:
+        anterior = anteriores.get(resultado["nome"])
+        if anterior is None or "segundos" not in resultado:
+            continue
+        razao_taxa = resultado["linhasPorSegundo"] / anterior["linhasPorSegundo"]
+        if razao_taxa < 1 - limite:
+            regressoes.append(
+                f"{resultado['nome']}: {resultado['linhasPorSegundo']:,.0f} linhas/s "
+                f"({razao_taxa - 1:+.1%} vs. {anterior['linhasPorSegundo']:,.0f})"
+            )
+        if "p99Ms" in resultado and "p99Ms" in anterior:
+            razao_p99 = resultado["p99Ms"] / anterior["p99Ms"]
+            if razao_p99 > 1 + limite:
+                regressoes.append(
+                    f"{resultado['nome']}: p99 {resultado['p99Ms']} ms "
+                    f"({razao_p99 - 1:+.1%} vs. {anterior['p99Ms']} ms)"
+                )
+        razao_rss = resultado["rssPicoMB"] / anterior["rssPicoMB"]
+        if razao_rss > 1 + limite:
+            regressoes.append(
+                f"{resultado['nome']}: pico de RSS {resultado['rssPicoMB']} MB "
+                f"({razao_rss - 1:+.1%} vs. {anterior['rssPicoMB']} MB)"
+            )
+    return regressoes
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--escala", choices=ESCALAS, default="rapida")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument(
+        "--filtro", default="", help="executa apenas casos cujo nome contém este texto"
+    )
+    parser.add_argument("--max-celulas", type=int, default=MAX_CELULAS_PADRAO)
+    parser.add_argument("--saida", help="arquivo JSON com os resultados")
+    parser.add_argument(
+        "--comparar", help="JSON de uma execução anterior (linha de base)"
+    )
+    parser.add_argument(
+        "--limite-regressao", type=float, default=0.10,
+        help="fração tolerada de piora antes de falhar (padrão: 0.10)",
+    )
+    args = parser.parse_args(argv)
+
+    casos = montar_casos(args.escala, args.max_celulas)
+    casos = [caso for caso in casos if args.filtro in caso["nome"]]
+    resultados = []
+    # Um processo novo por caso: o pico de RSS de um caso não contamina o próximo
+    contexto = multiprocessing.get_context("spawn")
+    print(f"{'caso':<42}{'linhas/s':>16}{'RSS pico (MB)':>16}", file=sys.stderr)
+    for caso in casos:
+        resultado = {
+            "nome": caso["nome"],
+            "grupo": caso["grupo"],
+            "linhas": caso["linhas"],
+        }
+        if "colunas" in caso:
+            resultado["colunas"] = caso["colunas"]
+        if caso.get("pulado"):
+            resultado["pulado"] = caso["pulado"]
+            print(f"{caso['nome']:<42}{'pulado':>16}", file=sys.stderr)
+        else:
+            with ProcessPoolExecutor(max_workers=1, mp_context=contexto) as executor:
+                resultado.update(
+                    executor.submit(executar_caso, caso, args.repeticoes).result()
+                )
+            detalhe = (
+                f"   p50 {resultado['p50Ms']} ms, p99 {resultado['p99Ms']} ms"
+                if "p50Ms" in resultado else ""
+            )
+            if "bytesPorLinha" in resultado:
+                detalhe = f"   {resultado['bytesPorLinha']} bytes/linha"
+            print(
+                f"{caso['nome']:<42}{resultado['linhasPorSegundo']:>16,.0f}"
+                f"{resultado['rssPicoMB']:>16}{detalhe}",
+                file=sys.stderr,
+            )
+        resultados.append(resultado)
+
+    execucao = {
+        "metadados": {
+            "data": datetime.now(UTC).isoformat(timespec="seconds"),
+            "commit": _commit_atual(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "plataforma": platform.platform(),
+            "cpus": multiprocessing.cpu_count(),
+            "escala": args.escala,
+            "repeticoes": args.repeticoes,
+        },
+        "resultados": resultados,
+    }
+    if args.saida:
+        with open(args.saida, "w") as f:
+            json.dump(execucao, f, indent=2, ensure_ascii=False)
+
+    if args.comparar:
+        with open(args.comparar) as f:
+            regressoes = comparar(execucao, json.load(f), args.limite_regressao)
+        for regressao in regressoes:
+            print(f"REGRESSÃO {regressao}", file=sys.stderr)
+        if regressoes:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from collections.abc import Iterable, Iterator
+from typing import BinaryIO
+
+from pydantic import BaseModel
+
+# Nome dos arquivos do cache: o próprio hash SHA-256 da configuração
+_NOME_ENTRADA = re.compile(r"^[0-9a-f]{64}$")
+# Sufixo dos arquivos ainda em gravação
+_SUFIXO_PARCIAL = ".parcial"
+
+
+def chave_configuracao(config: BaseModel, **contexto) -> str:
+    """
+    Calcula a chave do cache: hash SHA-256 da forma canônica da configuração.
+
+    A configuração já validada é serializada com todos os valores padrão e
+    chaves ordenadas, então JSONs equivalentes (ex: '10' e '10.0', campos
+    omitidos ou explícitos) geram a mesma chave. O 'contexto' inclui
+    parâmetros do servidor que também alteram a saída.
+    """
+    canonico = json.dumps(
+        {"config": config.model_dump(mode="json"), "contexto": contexto},
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(canonico.encode("utf-8")).hexdigest()
+
+
+def ler_em_blocos(
+    arquivo: BinaryIO, tamanho_bloco: int = 1024 * 1024
+) -> Iterator[bytes]:
+    """Lê um arquivo aberto do cache em blocos, fechando-o no fim."""
+    with arquivo:
+        while bloco := arquivo.read(tamanho_bloco):
+            yield bloco
+
+
+class CacheResultados:
+    """
+    Cache em disco de arquivos gerados, endereçado pelo hash da configuração.
+
+    O tamanho total é limitado a 'tamanho_maximo' bytes, com despejo da
+    entrada usada há mais tempo (LRU). É seguro para uso entre threads.
+    """
+    def __init__(self, diretorio: str, tamanho_maximo: int):
+        self.diretorio = diretorio
+        self.tamanho_maximo = tamanho_maximo
+        self._lock = threading.Lock()
+        # chave -> tamanho em bytes, da menos para a mais recentemente usada
+        self._entradas: OrderedDict[str, int] = OrderedDict()
+        self._tamanho_total = 0
+        self.acertos = 0
+        self.falhas = 0
+        self.despejos = 0
+
+        os.makedirs(diretorio, exist_ok=True)
+        existentes = []
+        for entrada in os.scandir(diretorio):
+            if not entrada.is_file():
+                continue
+            if entrada.name.endswith(_SUFIXO_PARCIAL):
+                # Gravação interrompida por um processo que terminou no meio do fluxo
+                try:
+                    os.remove(entrada.path)
+                except FileNotFoundError:
+                    pass
+            elif _NOME_ENTRADA.match(entrada.name):
+                existentes.append(entrada)
+        # Reaproveita entradas de execuções anteriores, das mais antigas às mais novas
+        for entrada in sorted(existentes, key=lambda e: e.stat().st_mtime):
+            self._registrar(entrada.name, entrada.stat().st_size)
+
+    def caminho(self, chave: str) -> str:
+        """Caminho do arquivo de uma entrada do cache."""
+        return os.path.join(self.diretorio, chave)
+
+    def abrir(self, chave: str) -> BinaryIO | None:
+        """
+        Abre o arquivo em cache (marcando-o como recente) ou retorna None.
+
+        O arquivo é aberto sob o lock, antes que uma publicação concorrente
+        possa despejá-lo; depois de aberto, continua legível mesmo que seja
+        removido da pasta.
+        """
+        with self._lock:
+            if chave not in self._entradas:
+                self.falhas += 1
+                return None
+            try:
+                arquivo = open(self.caminho(chave), "rb")
+            except FileNotFoundError:
+                # Removido por fora do cache (ex: limpeza da pasta temporária)
+                self._tamanho_total -= self._entradas.pop(chave)
+                self.falhas += 1
+                return None
+            self._entradas.move_to_end(chave)
+            self.acertos += 1
+            return arquivo
+
+    def gravar_em_fluxo(self, chave: str, blocos: Iterable[bytes]) -> Iterator[bytes]:
+        """
+        Repassa os blocos ao consumidor enquanto os grava em disco.
+
+        A entrada só é publicada no cache se o fluxo for consumido até o fim;
+        uma geração interrompida (ex: cliente desconectado) é descartada.
+        """
+        import tempfile
+
+        temporario = tempfile.NamedTemporaryFile(
+            dir=self.diretorio, suffix=_SUFIXO_PARCIAL, delete=False
+        )
+        completo = False
+        try:
+            for bloco in blocos:
+                temporario.write(bloco)
+                yield bloco
+            completo = True
+        finally:
+            temporario.close()
+            if completo:
+                self._publicar(chave, temporario.name)
+            else:
+                try:
+                    os.remove(temporario.name)
+                except FileNotFoundError:
+                    pass
+
+    def estatisticas(self) -> dict:
+        """Contadores de uso do cache."""
+        with self._lock:
+            return {
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "despejos": self.despejos,
+                "entradas": len(self._entradas),
+                "bytes": self._tamanho_total,
+                "bytesMaximo": self.tamanho_maximo,
+            }
+
+    def _publicar(self, chave: str, arquivo_temporario: str) -> None:
+        try:
+            tamanho = os.path.getsize(arquivo_temporario)
+            if tamanho > self.tamanho_maximo:
+                # Maior que o cache inteiro: não vale a pena guardar
+                os.remove(arquivo_temporario)
+                return
+            os.replace(arquivo_temporario, self.caminho(chave))
+        except FileNotFoundError:
+            # Removido como sobra por outro processo que abriu a mesma pasta
+            return
+        with self._lock:
+            self._registrar(chave, tamanho)
+
+    def _registrar(self, chave: str, tamanho: int) -> None:
+        """Registra uma entrada e despeja as menos usadas até caber no limite."""
+        if chave in self._entradas:
+            self._tamanho_total -= self._entradas.pop(chave)
+        self._entradas[chave] = tamanho
+        self._tamanho_total += tamanho
+
+        while self._tamanho_total > self.tamanho_maximo:
+            antiga, tamanho_antiga = self._entradas.popitem(last=False)
+            self._tamanho_total -= tamanho_antiga
+            self.despejos += 1
+            try:
+                os.remove(self.caminho(antiga))
+            except OSError:
+                # Já removido, ou aberto por uma leitura em andamento (Windows)
+                pass
@@ -0,0 +1,471 @@
+"""
+Linha de comando para gerar arquivos sem passar pelo servidor HTTP.
+
+Exemplos:
+    gerador-dados config/exemplo.json -o dados.csv
+    gerador-dados config/exemplo.json --linhas 100000000 --compressao zstd \\
+        -o dados.csv.zst
+    gerador-dados config/exemplo.json --linhas 100000000 --linhas-por-parte 10000000 \\
+        --workers 8 -o partes/
+    gerador-dados numerico.json --formato npy --workers 8 -o matriz.npy
+    gerador-dados config/exemplo.json --linhas 500000000 --checkpoint dados.ckpt \\
+        --retomar -o dados.csv
+    gerador-dados config/exemplo.json --linhas 1000000 --checkpoint dados.ckpt \\
+        --anexar -o dados.csv
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from collections.abc import Iterable
+from typing import BinaryIO, get_args
+
+import numpy as np
+from pydantic import ValidationError
+
+from .cache import chave_configuracao
+from .formatos import FORMATOS_CONTINUAVEIS, extensao_arquivo, gerar_em_formato
+from .modelos import CompressaoSaida, ConfiguracaoCSV, FormatoSaida
+from .servicos import (
+    TAMANHO_LOTE_PADRAO,
+    VERSAO_GERACAO,
+    PlanoGeracao,
+    SistemaGerador,
+    gerar_shard,
+    iniciar_processo_shards,
+)
+
+
+def _escrever(blocos: Iterable[bytes], destino: BinaryIO) -> int:
+    """Escreve os blocos no destino e retorna o total de bytes escritos."""
+    total = 0
+    for bloco in blocos:
+        destino.write(bloco)
+        total += len(bloco)
+    return total
+
+
+def _gerar_parte(
+    config: ConfiguracaoCSV,
+    entropia: int,
+    indice: int,
+    inicio: int,
+    caminho: str,
+    tamanho: int,
+) -> int:
+    """
+    Gera um arquivo de parte (executado em um processo separado).
+
+    Como os shards do modo paralelo, cada parte tem seu próprio fluxo
+    aleatório (SeedSequence com 'spawn_key=(indice,)') e os geradores
+    posicionais começam na linha 'inicio'. O resultado depende da semente
+    e do tamanho da parte, e não do número de workers.
+    """
+    semente = np.random.SeedSequence(entropia, spawn_key=(indice,))
+    sistema = SistemaGerador(config, semente=semente)
+    sistema.avancar(inicio)
+    with open(caminho, "wb") as arquivo:
+        return _escrever(gerar_em_formato(sistema, tamanho), arquivo)
+
+
+def gerar_partes(
+    config: ConfiguracaoCSV,
+    diretorio: str,
+    linhas_por_parte: int,
+    workers: int = 1,
+    tamanho: int = TAMANHO_LOTE_PADRAO,
+) -> list[str]:
+    """
+    Divide a saída em arquivos de 'linhas_por_parte' linhas (a última pode
+    ser menor), gerados em paralelo por até 'workers' processos.
+
+    Cada parte é um arquivo completo no formato pedido (com cabeçalho, no CSV).
+    """
+    plano = PlanoGeracao(config)
+    if not plano.permite_shards:
+        raise ValueError(
+            "As colunas únicas de comprimento variável não podem ser divididas "
+            "em partes: "
+            f"{', '.join(plano.colunas_sem_shards)}."
+        )
+    os.makedirs(diretorio, exist_ok=True)
+    # Sem semente, sorteia uma única entropia para que as partes sejam independentes
+    entropia = np.random.SeedSequence(config.semente).entropy
+    num_partes = math.ceil(config.numLinhas / linhas_por_parte)
+    digitos = max(5, len(str(num_partes - 1)))
+    extensao = extensao_arquivo(config)
+
+    tarefas = []
+    for indice in range(num_partes):
+        inicio = indice * linhas_por_parte
+        quantidade = min(linhas_por_parte, config.numLinhas - inicio)
+        caminho = os.path.join(diretorio, f"parte-{indice:0{digitos}d}.{extensao}")
+        config_parte = config.model_copy(update={"numLinhas": quantidade})
+        tarefas.append((config_parte, entropia, indice, inicio, caminho, tamanho))
+
+    if workers <= 1:
+        for tarefa in tarefas:
+            _gerar_parte(*tarefa)
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # 'result' propaga o primeiro erro de um worker
+            for futuro in [
+                executor.submit(_gerar_parte, *tarefa) for tarefa in tarefas
+            ]:
+                futuro.result()
+    return [tarefa[4] for tarefa in tarefas]
+
+
+def _preencher_npy(
+    caminho: str,
+    entropia: int,
+    indice: int,
+    inicio: int,
+    quantidade: int,
+) -> None:
+    """Gera um shard e o escreve direto na sua faixa de linhas do .npy mapeado."""
+    matriz = np.load(caminho, mmap_mode="r+")
+    colunas = gerar_shard(entropia, indice, inicio, quantidade)
+    matriz[inicio:inicio + quantidade] = np.column_stack(colunas)
+    matriz.flush()
+
+
+def gerar_npy_mmap(
+    sistema: SistemaGerador,
+    caminho: str,
+    workers: int = 1,
+    tamanho: int = TAMANHO_LOTE_PADRAO,
+) -> None:
+    """
+    Gera um .npy pré-alocando o arquivo inteiro e preenchendo-o via mmap.
+
+    O formato é fixo (float64, numLinhas x numColunas), então cada lote é
+    copiado direto para sua posição no arquivo, sem buffers intermediários.
+    Com 'workers' > 1, cada processo preenche as faixas dos seus shards,
+    com os mesmos valores do modo paralelo do servidor.
+    """
+    config = sistema.config
+    formato = (config.numLinhas, len(sistema.nomes_colunas))
+    matriz = np.lib.format.open_memmap(caminho, mode="w+", dtype="<f8", shape=formato)
+
+    if workers <= 1:
+        inicio = 0
+        for colunas in sistema.gerar_lotes_colunares(tamanho):
+            quantidade = len(colunas[0])
+            matriz[inicio:inicio + quantidade] = np.column_stack(colunas)
+            inicio += quantidade
+        matriz.flush()
+        return
+
+    # Os workers abrem o mesmo arquivo; o mapeamento do processo principal é liberado
+    matriz.flush()
+    del matriz
+    from concurrent.futures import ProcessPoolExecutor
+
+    entropia = sistema.semente.entropy
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=iniciar_processo_shards, initargs=(config,)
+    ) as executor:
+        futuros = [
+            executor.submit(
+                _preencher_npy, caminho, entropia, indice, inicio,
+                min(tamanho, config.numLinhas - inicio),
+            )
+            for indice, inicio in enumerate(range(0, config.numLinhas, tamanho))
+        ]
+        for futuro in futuros:
+            futuro.result()
+
+
+# Versão do formato dos arquivos de checkpoint
+VERSAO_CHECKPOINT = 1
+
+# Linhas geradas entre dois checkpoints (arredondadas para lotes inteiros)
+CHECKPOINT_A_CADA_PADRAO = 1_000_000
+
+
+def _chave_continuacao(config: ConfiguracaoCSV) -> str:
+    """Hash da configuração sem 'numLinhas': o que não pode mudar entre as execuções."""
+    return chave_configuracao(
+        config.model_copy(update={"numLinhas": 0}), versao=VERSAO_GERACAO
+    )
+
+
+def _ler_checkpoint(caminho: str, config: ConfiguracaoCSV) -> dict:
+    try:
+        with open(caminho, encoding="utf-8") as f:
+            checkpoint = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        raise ValueError(f"Não foi possível ler o checkpoint '{caminho}': {e}")
+    if checkpoint.get("versao") != VERSAO_CHECKPOINT:
+        raise ValueError(f"O checkpoint '{caminho}' tem uma versão não suportada.")
+    if checkpoint["configuracao"] != _chave_continuacao(config):
+        raise ValueError(
+            f"O checkpoint '{caminho}' foi salvo com outra configuração "
+            "(apenas 'numLinhas' pode mudar)."
+        )
+    return checkpoint
+
+
+def _salvar_checkpoint(caminho: str, checkpoint: dict) -> None:
+    """Grava o checkpoint de forma atômica (arquivo temporário + os.replace)."""
+    temporario = caminho + ".tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporario, caminho)
+
+
+def gerar_com_checkpoints(
+    config: ConfiguracaoCSV,
+    caminho: str,
+    caminho_checkpoint: str,
+    a_cada: int = CHECKPOINT_A_CADA_PADRAO,
+    tamanho: int = TAMANHO_LOTE_PADRAO,
+    retomar: bool = False,
+    anexar: bool = False,
+) -> tuple[int, int]:
+    """
+    Gera um arquivo salvando, a cada 'a_cada' linhas, um checkpoint com o
+    estado dos geradores ('SistemaGerador.exportar_estado') e o tamanho
+    do arquivo até ali.
+
+    - retomar: continua uma geração interrompida. O arquivo é truncado no
+      último checkpoint e são geradas as linhas que faltam para 'numLinhas'
+      (sem checkpoint, a geração começa do zero).
+    - anexar: acrescenta 'numLinhas' linhas ao arquivo do checkpoint,
+      continuando as sequências (ex: a linear) e os fluxos aleatórios.
+
+    Ao retomar, o arquivo final é idêntico ao de uma única geração com a
+    mesma semente (os checkpoints caem entre lotes). Ao anexar, isso só vale
+    se a execução anterior terminou em um lote completo: os valores de
+    regex de comprimento variável, por exemplo, dependem de onde os lotes
+    são divididos. Senão, só as colunas posicionais (ex: a linear)
+    continuam exatamente; as demais seguem seus fluxos aleatórios, com a
+    mesma distribuição. Retorna as linhas e os bytes escritos nesta execução.
+    """
+    if config.formato not in FORMATOS_CONTINUAVEIS or config.compressao is not None:
+        raise ValueError(
+            "Checkpoints exigem um formato de linhas "
+            f"({', '.join(FORMATOS_CONTINUAVEIS)}) sem compressão."
+        )
+    anterior = None
+    if anexar or (retomar and os.path.exists(caminho_checkpoint)):
+        anterior = _ler_checkpoint(caminho_checkpoint, config)
+
+    if anterior is None:
+        sistema = SistemaGerador(config)
+        arquivo = open(caminho, "wb")
+        posicao = 0
+    else:
+        # Os valores sorteados dependem do tamanho do lote: usa o da execução
+        # anterior
+        tamanho = anterior["tamanhoLote"]
+        quantidade = config.numLinhas
+        if not anexar:
+            quantidade -= anterior["linhas"]
+        estado = anterior["estado"]
+        sistema = SistemaGerador(
+            config.model_copy(update={"numLinhas": max(quantidade, 0)}),
+            semente=np.random.SeedSequence(estado["entropia"]),
+        )
+        sistema.restaurar_estado(estado)
+        posicao = anterior["bytes"]
+        if not os.path.exists(caminho) or os.path.getsize(caminho) < posicao:
+            raise ValueError(
+                f"O arquivo '{caminho}' é menor que o registrado no checkpoint."
+            )
+        # Descarta o que foi escrito depois do último checkpoint
+        arquivo = open(caminho, "r+b")
+        arquivo.truncate(posicao)
+        arquivo.seek(posicao)
+
+    def salvar() -> None:
+        arquivo.flush()
+        os.fsync(arquivo.fileno())
+        _salvar_checkpoint(caminho_checkpoint, {
+            "versao": VERSAO_CHECKPOINT,
+            "configuracao": _chave_continuacao(config),
+            "tamanhoLote": tamanho,
+            "linhas": sistema.linha,
+            "bytes": posicao,
+            "estado": sistema.exportar_estado(),
+        })
+
+    linhas_iniciais, bytes_iniciais = sistema.linha, posicao
+    ultimo = sistema.linha
+    with arquivo:
+        blocos = gerar_em_formato(sistema, tamanho, continuacao=anterior is not None)
+        for bloco in blocos:
+            arquivo.write(bloco)
+            posicao += len(bloco)
+            # Cada bloco codifica um lote inteiro, e o lote seguinte só é
+            # gerado quando o próximo bloco é pedido: aqui o estado do
+            # sistema corresponde exatamente ao que já foi escrito
+            if sistema.linha - ultimo >= a_cada:
+                salvar()
+                ultimo = sistema.linha
+        salvar()
+    return sistema.linha - linhas_iniciais, posicao - bytes_iniciais
+
+
+def _carregar_configuracao(args: argparse.Namespace) -> ConfiguracaoCSV:
+    """Lê o JSON de configuração e aplica as opções da linha de comando."""
+    with open(args.config, encoding="utf-8") as f:
+        dados = json.load(f)
+    sobrescritas = {
+        "numLinhas": args.linhas,
+        "semente": args.semente,
+        "formato": args.formato,
+        "compressao": args.compressao,
+    }
+    dados.update(
+        {chave: valor for chave, valor in sobrescritas.items() if valor is not None}
+    )
+    return ConfiguracaoCSV.model_validate(dados)
+
+
+def _criar_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="gerador-dados",
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        "config", help="arquivo JSON de configuração (ex: config/exemplo.json)"
+    )
+    parser.add_argument(
+        "-o", "--saida", default="-",
+        help="arquivo de saída ('-' para stdout); com --linhas-por-parte, um diretório",
+    )
+    parser.add_argument("--linhas", type=int, help="sobrescreve 'numLinhas'")
+    parser.add_argument("--semente", type=int, help="sobrescreve 'semente'")
+    parser.add_argument(
+        "--formato", choices=get_args(FormatoSaida),
+        help="sobrescreve 'formato'",
+    )
+    parser.add_argument(
+        "--compressao",
+        choices=get_args(CompressaoSaida),
+        help="sobrescreve 'compressao'",
+    )
+    parser.add_argument(
+        "--linhas-por-parte", type=int,
+        help="divide a saída em arquivos com este número de linhas",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="processos usados na geração (partes, shards ou faixas do .npy)",
+    )
+    parser.add_argument("--tamanho-lote", type=int, default=TAMANHO_LOTE_PADRAO)
+    parser.add_argument(
+        "--sem-mmap", action="store_true",
+        help="não usa mmap para .npy (escreve em streaming)",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        help="salva periodicamente o estado da geração neste arquivo (JSON), "
+             "para retomá-la (--retomar) ou continuá-la (--anexar)",
+    )
+    parser.add_argument(
+        "--checkpoint-a-cada", type=int, default=CHECKPOINT_A_CADA_PADRAO,
+        help="linhas geradas entre dois checkpoints",
+    )
+    continuacao = parser.add_mutually_exclusive_group()
+    continuacao.add_argument(
+        "--retomar", action="store_true",
+        help="retoma uma geração interrompida a partir do --checkpoint "
+             "(começa do zero se ele ainda não existir)",
+    )
+    continuacao.add_argument(
+        "--anexar", action="store_true",
+        help="acrescenta --linhas linhas ao arquivo do --checkpoint, "
+        "continuando a geração",
+    )
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = _criar_parser()
+    args = parser.parse_args(argv)
+    if args.tamanho_lote <= 0 or args.workers <= 0:
+        parser.error("--tamanho-lote e --workers devem ser maiores que zero.")
+
+    try:
+        config = _carregar_configuracao(args)
+    except (OSError, json.JSONDecodeError) as e:
+        parser.exit(2, f"erro: não foi possível ler a configuração: {e}\n")
+    except ValidationError as e:
+        parser.exit(2, f"erro: configuração inválida:\n{e}\n")
+
+    if args.checkpoint is None and (args.retomar or args.anexar):
+        parser.error("--retomar e --anexar exigem --checkpoint.")
+    if args.checkpoint is not None:
+        if args.checkpoint_a_cada <= 0:
+            parser.error("--checkpoint-a-cada deve ser maior que zero.")
+        if args.saida == "-" or args.linhas_por_parte is not None or args.workers > 1:
+            parser.error(
+                "--checkpoint exige um arquivo em --saida e não pode ser usado "
+                "com --linhas-por-parte nem --workers > 1."
+            )
+
+    inicio = time.perf_counter()
+    num_linhas = config.numLinhas
+    try:
+        if args.checkpoint is not None:
+            num_linhas, total_bytes = gerar_com_checkpoints(
+                config, args.saida, args.checkpoint, args.checkpoint_a_cada,
+                args.tamanho_lote, retomar=args.retomar, anexar=args.anexar,
+            )
+        elif args.linhas_por_parte is not None:
+            if args.linhas_por_parte <= 0:
+                parser.error("--linhas-por-parte deve ser maior que zero.")
+            if args.saida == "-":
+                parser.error("--linhas-por-parte exige um diretório em --saida.")
+            caminhos = gerar_partes(
+                config,
+                args.saida,
+                args.linhas_por_parte,
+                args.workers,
+                args.tamanho_lote,
+            )
+            total_bytes = sum(os.path.getsize(caminho) for caminho in caminhos)
+        else:
+            sistema = SistemaGerador(config, processos=args.workers)
+            usar_mmap = (
+                config.formato == "npy" and config.compressao is None
+                and args.saida != "-" and not args.sem_mmap
+            )
+            if usar_mmap:
+                gerar_npy_mmap(sistema, args.saida, args.workers, args.tamanho_lote)
+                total_bytes = os.path.getsize(args.saida)
+            elif args.saida == "-":
+                total_bytes = _escrever(
+                    gerar_em_formato(sistema, args.tamanho_lote), sys.stdout.buffer
+                )
+                sys.stdout.buffer.flush()
+            else:
+                with open(args.saida, "wb") as arquivo:
+                    total_bytes = _escrever(
+                        gerar_em_formato(sistema, args.tamanho_lote), arquivo
+                    )
+    except ValueError as e:
+        parser.exit(1, f"erro: {e}\n")
+
+    decorrido = time.perf_counter() - inicio
+    print(
+        f"{num_linhas:,} linhas, {total_bytes / 1e6:,.1f} MB em {decorrido:.2f} s "
+        f"({num_linhas / decorrido:,.0f} linhas/s, "
+        f"{total_bytes / 1e6 / decorrido:,.1f} MB/s)",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
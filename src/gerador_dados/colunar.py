@@ -0,0 +1,209 @@
+"""
+Contêiner colunar para os dados gerados em memória ('gerar_dados').
+
+Em vez de um dicionário por linha (com as chaves repetidas em cada um),
+os valores ficam em um array por coluna: arrays NumPy para os números e
+buffers contíguos de bytes UTF-8 de largura fixa (dtype 'S') para os
+textos. As linhas são montadas sob demanda, só quando acessadas.
+"""
+from collections.abc import Iterable, Iterator, Sequence
+from typing import Any
+
+import numpy as np
+
+# Linhas convertidas para objetos Python de uma vez ao iterar
+TAMANHO_BLOCO_ITERACAO = 10_000
+
+
+def compactar_coluna(valores: np.ndarray | Sequence[Any]) -> np.ndarray:
+    """
+    Converte o lote de uma coluna para a representação compacta: números
+    continuam arrays NumPy; textos viram bytes UTF-8 de largura fixa.
+    """
+    if isinstance(valores, np.ndarray):
+        if valores.dtype.kind != "U":
+            return valores
+        valores = valores.tolist()
+    elif not all(type(valor) is str for valor in valores):
+        return np.asarray(valores)
+    try:
+        # Texto ASCII (o caso comum) é convertido direto pelo NumPy
+        return np.array(valores, dtype="S")
+    except UnicodeEncodeError:
+        return np.array([valor.encode("utf-8") for valor in valores], dtype="S")
+
+
+def decodificar_textos(valores: np.ndarray) -> list[str]:
+    """Textos de uma coluna compacta (bytes UTF-8) como strings Python."""
+    return [valor.decode("utf-8") for valor in valores.tolist()]
+
+
+def _expandir(valores: np.ndarray) -> list:
+    """Valores de uma fatia da coluna como objetos Python (str, float, int)."""
+    if valores.dtype.kind == "S":
+        return decodificar_textos(valores)
+    return valores.tolist()
+
+
+class DadosColunares:
+    """
+    Dados gerados, guardados por coluna.
+
+    Também se comporta como a antiga lista de dicionários (uma visão
+    preguiçosa das linhas): 'len', índices, fatias, iteração e comparação
+    com listas funcionam como antes, mas cada dicionário é criado apenas
+    quando a linha é lida.
+    """
+    __hash__ = None
+
+    def __init__(self, nomes_colunas: list[str], colunas: list[np.ndarray]):
+        if len({len(coluna) for coluna in colunas}) > 1:
+            raise ValueError("Todas as colunas devem ter o mesmo número de linhas.")
+        self.nomes_colunas = nomes_colunas
+        self.colunas = colunas
+        self._num_linhas = len(colunas[0]) if colunas else 0
+
+    @classmethod
+    def de_lotes(
+        cls,
+        nomes_colunas: list[str],
+        lotes: Iterable[Sequence[np.ndarray | Sequence[Any]]],
+        num_linhas: int,
+    ) -> "DadosColunares":
+        """
+        Junta os lotes colunares de 'SistemaGerador.gerar_lotes_colunares'.
+
+        Cada coluna é escrita em um array pré-alocado com as 'num_linhas'
+        linhas, com o dtype do primeiro lote; uma coluna textual só é
+        copiada se um lote posterior trouxer um texto mais largo.
+        """
+        colunas: list[np.ndarray | None] = [None] * len(nomes_colunas)
+        inicio = 0
+        for lote in lotes:
+            quantidade = len(lote[0]) if lote else 0
+            for indice, valores in enumerate(lote):
+                valores = compactar_coluna(valores)
+                destino = colunas[indice]
+                if destino is None:
+                    destino = np.empty(num_linhas, dtype=valores.dtype)
+                    colunas[indice] = destino
+                elif valores.dtype.kind == "S" and valores.itemsize > destino.itemsize:
+                    # Texto mais longo que os anteriores: alarga a coluna (raro)
+                    destino = colunas[indice] = destino.astype(valores.dtype)
+                destino[inicio:inicio + quantidade] = valores
+            inicio += quantidade
+
+        if inicio != num_linhas:
+            raise ValueError(
+                f"Os lotes têm {inicio} linhas; eram esperadas {num_linhas}."
+            )
+        if not inicio:
+            colunas = [np.empty(0) for _ in nomes_colunas]
+        return cls(nomes_colunas, colunas)
+
+    def coluna(self, nome: str) -> np.ndarray:
+        """Array (compacto) de uma coluna; textos em bytes UTF-8 (ver 'valores')."""
+        return self.colunas[self.nomes_colunas.index(nome)]
+
+    def valores(self, nome: str) -> list:
+        """Valores de uma coluna como objetos Python (str, float, int)."""
+        return _expandir(self.coluna(nome))
+
+    @property
+    def nbytes(self) -> int:
+        """Memória ocupada pelos valores (sem o contêiner)."""
+        return sum(coluna.nbytes for coluna in self.colunas)
+
+    def __len__(self) -> int:
+        return self._num_linhas
+
+    def _linhas(self, inicio: int, fim: int) -> list[dict]:
+        fatias = [_expandir(coluna[inicio:fim]) for coluna in self.colunas]
+        return [dict(zip(self.nomes_colunas, valores)) for valores in zip(*fatias)]
+
+    def __getitem__(self, indice: int | slice) -> dict | list[dict]:
+        if isinstance(indice, slice):
+            inicio, fim, passo = indice.indices(self._num_linhas)
+            if passo == 1:
+                return self._linhas(inicio, max(inicio, fim))
+            return [self[i] for i in range(inicio, fim, passo)]
+        if indice < 0:
+            indice += self._num_linhas
+        if not 0 <= indice < self._num_linhas:
+            raise IndexError("Índice de linha fora do intervalo.")
+        return self._linhas(indice, indice + 1)[0]
+
+    def __iter__(self) -> Iterator[dict]:
+        for inicio in range(0, self._num_linhas, TAMANHO_BLOCO_ITERACAO):
+            yield from self._linhas(inicio, inicio + TAMANHO_BLOCO_ITERACAO)
+
+    def __eq__(self, outro: object) -> bool:
+        if isinstance(outro, DadosColunares):
+            return (
+                self.nomes_colunas == outro.nomes_colunas
+                and len(self) == len(outro)
+                and all(
+                    np.array_equal(a, b) for a, b in zip(self.colunas, outro.colunas)
+                )
+            )
+        if isinstance(outro, list):
+            return len(self) == len(outro) and list(self) == outro
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"DadosColunares({len(self)} linhas, colunas={self.nomes_colunas!r})"
+
+
+class IndiceChaves:
+    """
+    Chaves de uma tabela já gerada, consultadas por posição (linha).
+
+    Usado pelas chaves estrangeiras de um esquema relacional: as chaves
+    ficam em um único array compacto (ver 'compactar_coluna'), e não em
+    listas Python, e cada lote de chaves estrangeiras é uma indexação
+    vetorizada. Chaves lineares nem são guardadas: a chave da linha 'i'
+    é calculada como 'valor_inicial + i * incremento'.
+    """
+    def __init__(
+        self,
+        valores: np.ndarray | None = None,
+        tamanho: int | None = None,
+        valor_inicial: float = 0.0,
+        incremento: float = 1.0,
+    ):
+        if valores is None and tamanho is None:
+            raise ValueError(
+                "Informe os valores das chaves ou o tamanho da sequência linear."
+            )
+        self._valores = valores
+        self.tamanho = len(valores) if valores is not None else tamanho
+        self.valor_inicial = valor_inicial
+        self.incremento = incremento
+
+    @classmethod
+    def linear(
+        cls, valor_inicial: float, incremento: float, tamanho: int
+    ) -> "IndiceChaves":
+        """Índice de uma sequência linear, sem nenhum valor em memória."""
+        return cls(tamanho=tamanho, valor_inicial=valor_inicial, incremento=incremento)
+
+    @classmethod
+    def de_lotes(cls, lotes: Iterable[np.ndarray]) -> "IndiceChaves":
+        """
+        Junta os lotes de uma coluna-chave, já compactados à medida que foram
+        gerados ('compactar_coluna'), em um único array.
+        """
+        partes = list(lotes)
+        return cls(np.concatenate(partes) if partes else np.empty(0))
+
+    @property
+    def nbytes(self) -> int:
+        """Memória ocupada pelas chaves."""
+        return self._valores.nbytes if self._valores is not None else 0
+
+    def valores(self, posicoes: np.ndarray) -> np.ndarray:
+        """Chaves das linhas 'posicoes' (mesma representação das colunas geradas)."""
+        if self._valores is None:
+            # Mesma aritmética do GeradorLinear: valores idênticos aos do arquivo
+            return self.valor_inicial + posicoes.astype(np.float64) * self.incremento
+        return self._valores[posicoes]
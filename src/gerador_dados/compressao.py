@@ -0,0 +1,155 @@
+import threading
+import time
+import zlib
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+
+from .metricas import Cronometro
+
+
+@dataclass(frozen=True)
+class Algoritmo:
+    """Metadados de um algoritmo de compressão."""
+    extensao: str
+    media_type: str
+    nivel_padrao: int
+
+
+ALGORITMOS = {
+    "gzip": Algoritmo("gz", "application/gzip", 6),
+    "zstd": Algoritmo("zst", "application/zstd", 3),
+}
+
+# Ordem de preferência na negociação via 'Accept-Encoding'
+PREFERENCIA = ("zstd", "gzip")
+
+
+class EstatisticasCompressao:
+    """Totais acumulados de compressão: bytes de entrada/saída e tempo gasto."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.fluxos = 0
+        self.bytes_entrada = 0
+        self.bytes_saida = 0
+        self.segundos = 0.0
+
+    def registrar(self, bytes_entrada: int, bytes_saida: int, segundos: float) -> None:
+        with self._lock:
+            self.fluxos += 1
+            self.bytes_entrada += bytes_entrada
+            self.bytes_saida += bytes_saida
+            self.segundos += segundos
+
+    def resumo(self) -> dict:
+        with self._lock:
+            return {
+                "fluxos": self.fluxos,
+                "bytesEntrada": self.bytes_entrada,
+                "bytesSaida": self.bytes_saida,
+                "razao": (
+                    self.bytes_entrada / self.bytes_saida if self.bytes_saida else None
+                ),
+                "megabytesPorSegundo": (
+                    self.bytes_entrada / self.segundos / 1e6 if self.segundos else None
+                ),
+            }
+
+
+estatisticas_compressao = EstatisticasCompressao()
+
+
+def zstd_disponivel() -> bool:
+    """Verifica se o pacote opcional 'zstandard' está instalado."""
+    try:
+        import zstandard  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _criar_compressor(algoritmo: str, nivel: int | None):
+    """Cria um compressor incremental (com 'compress' e 'flush')."""
+    nivel = ALGORITMOS[algoritmo].nivel_padrao if nivel is None else nivel
+    if algoritmo == "gzip":
+        # wbits=31: formato gzip (cabeçalho e CRC), compatível com 'gunzip'
+        return zlib.compressobj(nivel, zlib.DEFLATED, 31)
+    try:
+        import zstandard
+    except ImportError:
+        raise ValueError(
+            "A compressão 'zstd' requer o pacote opcional 'zstandard' "
+            "(instale com: pip install 'syntheticdata-generator[zstd]')."
+        )
+    return zstandard.ZstdCompressor(level=nivel).compressobj()
+
+
+def comprimir_fluxo(
+    blocos: Iterable[bytes],
+    algoritmo: str,
+    nivel: int | None = None,
+    cronometro: Cronometro | None = None,
+) -> Iterator[bytes]:
+    """
+    Comprime um fluxo de blocos de forma incremental.
+
+    Cada bloco é comprimido assim que chega, então a memória continua
+    limitada ao tamanho de um lote. Ao final, registra a razão de
+    compressão e o tempo gasto em 'estatisticas_compressao' (e, por bloco,
+    no 'cronometro' da resposta, se informado).
+    Dependências opcionais são verificadas antes do primeiro bloco.
+    """
+    compressor = _criar_compressor(algoritmo, nivel)
+    return _comprimir(blocos, compressor, cronometro or Cronometro())
+
+
+def _comprimir(
+    blocos: Iterable[bytes], compressor, cronometro: Cronometro
+) -> Iterator[bytes]:
+    bytes_entrada = bytes_saida = 0
+    segundos = 0.0
+    for bloco in blocos:
+        inicio = time.perf_counter()
+        comprimido = compressor.compress(bloco)
+        decorrido = time.perf_counter() - inicio
+        segundos += decorrido
+        cronometro.adicionar("compressao", decorrido)
+        bytes_entrada += len(bloco)
+        if comprimido:
+            bytes_saida += len(comprimido)
+            yield comprimido
+    inicio = time.perf_counter()
+    final = compressor.flush()
+    cronometro.adicionar("compressao", time.perf_counter() - inicio)
+    bytes_saida += len(final)
+    estatisticas_compressao.registrar(bytes_entrada, bytes_saida, segundos)
+    yield final
+
+
+def negociar_codificacao(accept_encoding: str | None) -> str | None:
+    """
+    Escolhe a codificação de transporte a partir do 'Accept-Encoding'.
+
+    Respeita os valores 'q' do cliente e, em empate, prefere zstd (se
+    instalado) a gzip. Retorna None para enviar sem compressão.
+    """
+    if not accept_encoding:
+        return None
+    aceitos: dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        nome, _, parametros = item.strip().partition(";")
+        qualidade = 1.0
+        parametros = parametros.strip()
+        if parametros.startswith("q="):
+            try:
+                qualidade = float(parametros[2:])
+            except ValueError:
+                qualidade = 0.0
+        aceitos[nome.strip().lower()] = qualidade
+
+    candidatos = [
+        (aceitos.get(nome, aceitos.get("*", 0.0)), -ordem, nome)
+        for ordem, nome in enumerate(PREFERENCIA)
+        if nome != "zstd" or zstd_disponivel()
+    ]
+    qualidade, _, escolhido = max(candidatos)
+    return escolhido if qualidade > 0 else None
@@ -0,0 +1,437 @@
+"""
+Fórmulas de colunas derivadas (gerador 'expressao').
+
+Uma fórmula é uma expressão Python restrita que referencia outras colunas
+pelo nome (ex: 'PRECO * QTD', '"PED-" + preencher(texto(inteiro(SEQ)), 6)').
+Ela é analisada uma única vez: a árvore sintática é validada contra uma
+lista de construções permitidas (sem 'eval', atributos, índices ou funções
+arbitrárias) e convertida em funções que operam sobre lotes NumPy inteiros.
+"""
+import ast
+import functools
+from collections.abc import Callable, Iterable
+from typing import Any
+
+import numpy as np
+
+# Limite de tamanho da fórmula (evita árvores sintáticas gigantes)
+TAMANHO_MAXIMO_FORMULA = 2_000
+# Limite de aninhamento da árvore sintática: compilação, inferência de tipos
+# e avaliação são recursivas e não podem estourar a pilha durante a geração
+PROFUNDIDADE_MAXIMA_FORMULA = 100
+# Maior largura aceita por 'preencher' (cada valor ocupa 'largura' caracteres)
+LARGURA_MAXIMA_PREENCHER = 1_000
+
+# Tipos dos valores de uma coluna
+NUMERO = "numero"
+INTEIRO = "inteiro"
+TEXTO = "texto"
+LOGICO = "logico"
+
+_NUMERICOS = {NUMERO, INTEIRO}
+
+_OPERADORES_ARITMETICOS = {
+    ast.Add: np.add,
+    ast.Sub: np.subtract,
+    ast.Mult: np.multiply,
+    ast.Div: np.true_divide,
+    ast.FloorDiv: np.floor_divide,
+    ast.Mod: np.mod,
+    ast.Pow: lambda a, b: np.power(np.asarray(a, dtype=np.float64), b),
+}
+
+_COMPARACOES = {
+    ast.Lt: np.less,
+    ast.LtE: np.less_equal,
+    ast.Gt: np.greater,
+    ast.GtE: np.greater_equal,
+    ast.Eq: np.equal,
+    ast.NotEq: np.not_equal,
+}
+
+
+class ErroExpressao(ValueError):
+    """Fórmula inválida: sintaxe, construção não permitida, tipos ou dependências."""
+
+
+# --- Funções disponíveis nas fórmulas ---
+# nome -> (função NumPy, número mínimo e máximo de argumentos, tipo do resultado)
+# O tipo do resultado é uma função dos tipos dos argumentos.
+
+def _arredondar(valores, casas=0):
+    return np.round(valores, casas)
+
+
+def _inteiro(valores):
+    return np.rint(valores).astype(np.int64)
+
+
+def _texto(valores):
+    return np.asarray(valores).astype(str)
+
+
+def _preencher(valores, largura):
+    """Completa com zeros à esquerda até 'largura' caracteres."""
+    return np.strings.zfill(np.asarray(valores).astype(str), largura)
+
+
+def _exigir(tipos: list[str], esperados: set[str], funcao: str) -> None:
+    if any(tipo not in esperados for tipo in tipos):
+        raise ErroExpressao(f"Tipos inválidos para '{funcao}': {', '.join(tipos)}.")
+
+
+def _tipo_numerico(funcao: str, resultado: str | None = None):
+    def tipo(tipos: list[str]) -> str:
+        _exigir(tipos, _NUMERICOS, funcao)
+        if resultado is not None:
+            return resultado
+        return INTEIRO if all(t == INTEIRO for t in tipos) else NUMERO
+    return tipo
+
+
+def _tipo_preencher(tipos: list[str]) -> str:
+    _exigir(tipos[1:], {INTEIRO}, "preencher")
+    return TEXTO
+
+
+def _largura_preencher(largura: int) -> None:
+    if not 0 <= largura <= LARGURA_MAXIMA_PREENCHER:
+        raise ErroExpressao(
+            f"A largura de 'preencher' deve estar entre 0 e {LARGURA_MAXIMA_PREENCHER}."
+        )
+
+
+FUNCOES: dict[str, tuple[Callable, int, int, Callable[[list[str]], str]]] = {
+    "abs": (np.abs, 1, 1, _tipo_numerico("abs")),
+    "raiz": (np.sqrt, 1, 1, _tipo_numerico("raiz", NUMERO)),
+    "log": (np.log, 1, 1, _tipo_numerico("log", NUMERO)),
+    "exp": (np.exp, 1, 1, _tipo_numerico("exp", NUMERO)),
+    "piso": (np.floor, 1, 1, _tipo_numerico("piso", NUMERO)),
+    "teto": (np.ceil, 1, 1, _tipo_numerico("teto", NUMERO)),
+    "arredondar": (_arredondar, 1, 2, _tipo_numerico("arredondar", NUMERO)),
+    "min": (lambda *v: functools.reduce(np.minimum, v), 2, 16, _tipo_numerico("min")),
+    "max": (lambda *v: functools.reduce(np.maximum, v), 2, 16, _tipo_numerico("max")),
+    "inteiro": (_inteiro, 1, 1, _tipo_numerico("inteiro", INTEIRO)),
+    "texto": (_texto, 1, 1, lambda tipos: TEXTO),
+    "preencher": (_preencher, 2, 2, _tipo_preencher),
+}
+
+# Argumentos que precisam ser inteiros literais, e não colunas: eles são
+# parâmetros da função (não um valor por linha). funcao -> (posição, validação)
+ARGUMENTOS_LITERAIS: dict[str, tuple[int, Callable[[int], None] | None]] = {
+    "arredondar": (1, None),
+    "preencher": (1, _largura_preencher),
+}
+
+
+# --- Compilação (AST -> funções sobre lotes) ---
+
+Avaliador = Callable[[dict[str, Any]], Any]
+
+
+def _inteiro_literal(no: ast.AST) -> int | None:
+    """Valor de um inteiro literal (ex: '4', '-2'), ou None se 'no' não for um."""
+    if isinstance(no, ast.UnaryOp) and isinstance(no.op, (ast.USub, ast.UAdd)):
+        valor = _inteiro_literal(no.operand)
+        if valor is None or isinstance(no.op, ast.UAdd):
+            return valor
+        return -valor
+    if isinstance(no, ast.Constant) and type(no.value) is int:
+        return no.value
+    return None
+
+
+def _profundidade(arvore: ast.AST) -> int:
+    """Profundidade da árvore, calculada sem recursão."""
+    maxima = 0
+    pendentes = [(arvore, 1)]
+    while pendentes:
+        no, profundidade = pendentes.pop()
+        maxima = max(maxima, profundidade)
+        pendentes.extend(
+            (filho, profundidade + 1) for filho in ast.iter_child_nodes(no)
+        )
+    return maxima
+
+
+def _constante(valor) -> Any:
+    if isinstance(valor, bool):
+        return np.bool_(valor)
+    if isinstance(valor, int):
+        # Inteiros fora de 64 bits viram float, como fariam no NumPy
+        return np.int64(valor) if -(2**63) <= valor < 2**63 else np.float64(valor)
+    return valor
+
+
+class Formula:
+    """
+    Fórmula compilada: validada uma vez, avaliada a cada lote.
+
+    'dependencias' são os nomes das colunas referenciadas. 'avaliar'
+    recebe os lotes dessas colunas (por nome) e devolve o lote da coluna.
+    """
+    def __init__(self, formula: str):
+        if len(formula) > TAMANHO_MAXIMO_FORMULA:
+            raise ErroExpressao(
+                "A fórmula excede o tamanho máximo "
+                f"({TAMANHO_MAXIMO_FORMULA} caracteres)."
+            )
+        try:
+            self._arvore = ast.parse(formula.strip(), mode="eval").body
+        except SyntaxError as e:
+            raise ErroExpressao(f"Fórmula com sintaxe inválida: {e.msg}.") from None
+        except (RecursionError, MemoryError):
+            raise ErroExpressao("Fórmula aninhada demais.") from None
+        if _profundidade(self._arvore) > PROFUNDIDADE_MAXIMA_FORMULA:
+            raise ErroExpressao(
+                "Fórmula aninhada demais "
+                f"(máximo de {PROFUNDIDADE_MAXIMA_FORMULA} níveis)."
+            )
+        self.formula = formula
+        self.dependencias: set[str] = set()
+        try:
+            self._avaliador = self._compilar(self._arvore)
+        except RecursionError:
+            raise ErroExpressao("Fórmula aninhada demais.") from None
+
+    def _compilar(self, no: ast.AST) -> Avaliador:
+        if isinstance(no, ast.Constant):
+            if not isinstance(no.value, (int, float, str, bool)):
+                raise ErroExpressao(f"Constante não permitida: {no.value!r}.")
+            valor = _constante(no.value)
+            return lambda contexto: valor
+
+        if isinstance(no, ast.Name):
+            nome = no.id
+            self.dependencias.add(nome)
+            return lambda contexto: _como_array(contexto[nome])
+
+        if isinstance(no, ast.BinOp) and type(no.op) in _OPERADORES_ARITMETICOS:
+            operacao = _OPERADORES_ARITMETICOS[type(no.op)]
+            if isinstance(no.op, ast.Add):
+                # '+' também concatena textos; o tipo já foi verificado em 'tipo'
+                operacao = _somar
+            esquerda, direita = self._compilar(no.left), self._compilar(no.right)
+            return lambda contexto: operacao(esquerda(contexto), direita(contexto))
+
+        if isinstance(no, ast.UnaryOp) and isinstance(
+            no.op, (ast.USub, ast.UAdd, ast.Not)
+        ):
+            operando = self._compilar(no.operand)
+            operacao = {
+                ast.USub: np.negative,
+                ast.UAdd: np.positive,
+                ast.Not: np.logical_not,
+            }[type(no.op)]
+            return lambda contexto: operacao(operando(contexto))
+
+        if isinstance(no, ast.Compare) and all(
+            type(op) in _COMPARACOES for op in no.ops
+        ):
+            # Comparações encadeadas (a < b < c) viram 'a < b and b < c'
+            termos = [self._compilar(termo) for termo in [no.left, *no.comparators]]
+            operacoes = [_COMPARACOES[type(op)] for op in no.ops]
+
+            def comparar(contexto):
+                valores = [termo(contexto) for termo in termos]
+                resultados = [
+                    operacao(a, b)
+                    for operacao, a, b in zip(operacoes, valores, valores[1:])
+                ]
+                return functools.reduce(np.logical_and, resultados)
+            return comparar
+
+        if isinstance(no, ast.BoolOp):
+            termos = [self._compilar(termo) for termo in no.values]
+            operacao = np.logical_and if isinstance(no.op, ast.And) else np.logical_or
+            return lambda contexto: functools.reduce(
+                operacao, (t(contexto) for t in termos)
+            )
+
+        if isinstance(no, ast.IfExp):
+            condicao = self._compilar(no.test)
+            se_verdadeiro, se_falso = self._compilar(no.body), self._compilar(no.orelse)
+            return lambda contexto: np.where(
+                condicao(contexto), se_verdadeiro(contexto), se_falso(contexto)
+            )
+
+        if (
+            isinstance(no, ast.Call)
+            and isinstance(no.func, ast.Name)
+            and not no.keywords
+        ):
+            if no.func.id not in FUNCOES:
+                raise ErroExpressao(f"Função não permitida: '{no.func.id}'.")
+            funcao, minimo, maximo, _ = FUNCOES[no.func.id]
+            if not minimo <= len(no.args) <= maximo:
+                raise ErroExpressao(
+                    f"Número de argumentos inválido para '{no.func.id}'."
+                )
+            if no.func.id in ARGUMENTOS_LITERAIS:
+                posicao, validar = ARGUMENTOS_LITERAIS[no.func.id]
+                if posicao < len(no.args):
+                    valor = _inteiro_literal(no.args[posicao])
+                    if valor is None:
+                        raise ErroExpressao(
+                            f"O argumento {posicao + 1} de '{no.func.id}' deve ser "
+                            f"um número inteiro (não uma coluna): {ast.unparse(no)!r}."
+                        )
+                    if validar is not None:
+                        validar(valor)
+            argumentos = [self._compilar(argumento) for argumento in no.args]
+            return lambda contexto: funcao(
+                *(argumento(contexto) for argumento in argumentos)
+            )
+
+        raise ErroExpressao(
+            f"Construção não permitida na fórmula: {ast.unparse(no)!r}."
+        )
+
+    def tipo(self, tipos_colunas: dict[str, str]) -> str:
+        """
+        Infere o tipo do resultado a partir dos tipos das colunas referenciadas.
+
+        Levanta ErroExpressao para operações entre tipos incompatíveis
+        (ex: texto * número) e para resultados lógicos fora de condições.
+        """
+        tipo = _inferir(self._arvore, tipos_colunas)
+        if tipo == LOGICO:
+            raise ErroExpressao(
+                "O resultado da fórmula não pode ser lógico; "
+                "use 'a if condicao else b'."
+            )
+        return tipo
+
+    def avaliar(self, contexto: dict[str, Any], n: int) -> np.ndarray:
+        """Avalia a fórmula sobre os lotes das colunas (arrays de 'n' valores)."""
+        with np.errstate(all="ignore"):
+            resultado = np.asarray(self._avaliador(contexto))
+        if resultado.ndim == 0:
+            # Fórmula sem colunas (constante)
+            resultado = np.full(n, resultado)
+        return resultado
+
+
+def _como_array(valores) -> np.ndarray:
+    """Lote de uma coluna como array: listas de textos e bytes ('S') viram 'U'."""
+    valores = np.asarray(valores)
+    if valores.dtype.kind == "S":
+        # Bytes de largura fixa vêm de regex ASCII (ver 'ProgramaRegex.gerar_bytes')
+        return valores.astype("U")
+    return valores
+
+
+def _somar(a, b):
+    a, b = np.asarray(a), np.asarray(b)
+    if a.dtype.kind == "U" or b.dtype.kind == "U":
+        return np.strings.add(a, b)
+    return np.add(a, b)
+
+
+def _inferir(no: ast.AST, tipos: dict[str, str]) -> str:
+    """Percorre a árvore (já validada por 'Formula._compilar') calculando os tipos."""
+    if isinstance(no, ast.Constant):
+        if isinstance(no.value, bool):
+            return LOGICO
+        if isinstance(no.value, str):
+            return TEXTO
+        return INTEIRO if isinstance(no.value, int) else NUMERO
+
+    if isinstance(no, ast.Name):
+        if no.id not in tipos:
+            raise ErroExpressao(f"Coluna desconhecida na fórmula: '{no.id}'.")
+        return tipos[no.id]
+
+    if isinstance(no, ast.BinOp):
+        esquerda, direita = _inferir(no.left, tipos), _inferir(no.right, tipos)
+        if isinstance(no.op, ast.Add) and esquerda == direita == TEXTO:
+            return TEXTO
+        if esquerda not in _NUMERICOS or direita not in _NUMERICOS:
+            raise ErroExpressao(
+                f"Operação inválida entre {esquerda} e {direita}: {ast.unparse(no)!r}."
+            )
+        if isinstance(no.op, (ast.Div, ast.Pow)):
+            return NUMERO
+        return INTEIRO if esquerda == direita == INTEIRO else NUMERO
+
+    if isinstance(no, ast.UnaryOp):
+        operando = _inferir(no.operand, tipos)
+        if isinstance(no.op, ast.Not):
+            if operando != LOGICO:
+                raise ErroExpressao(f"'not' exige uma condição: {ast.unparse(no)!r}.")
+            return LOGICO
+        if operando not in _NUMERICOS:
+            raise ErroExpressao(f"Sinal aplicado a {operando}: {ast.unparse(no)!r}.")
+        return operando
+
+    if isinstance(no, ast.Compare):
+        termos = [_inferir(termo, tipos) for termo in [no.left, *no.comparators]]
+        for a, b in zip(termos, termos[1:]):
+            if (a in _NUMERICOS) != (b in _NUMERICOS) or LOGICO in (a, b):
+                raise ErroExpressao(f"Comparação entre {a} e {b}: {ast.unparse(no)!r}.")
+        return LOGICO
+
+    if isinstance(no, ast.BoolOp):
+        if any(_inferir(termo, tipos) != LOGICO for termo in no.values):
+            raise ErroExpressao(f"'and'/'or' exigem condições: {ast.unparse(no)!r}.")
+        return LOGICO
+
+    if isinstance(no, ast.IfExp):
+        if _inferir(no.test, tipos) != LOGICO:
+            raise ErroExpressao(
+                f"A condição deve ser uma comparação: {ast.unparse(no.test)!r}."
+            )
+        se_verdadeiro, se_falso = _inferir(no.body, tipos), _inferir(no.orelse, tipos)
+        if se_verdadeiro == se_falso:
+            return se_verdadeiro
+        if se_verdadeiro in _NUMERICOS and se_falso in _NUMERICOS:
+            return NUMERO
+        raise ErroExpressao(
+            f"Os dois ramos devem ter o mesmo tipo ({se_verdadeiro}, {se_falso})."
+        )
+
+    # ast.Call (as demais construções já foram rejeitadas na compilação)
+    _, _, _, tipo_resultado = FUNCOES[no.func.id]
+    return tipo_resultado([_inferir(argumento, tipos) for argumento in no.args])
+
+
+@functools.lru_cache(maxsize=1024)
+def compilar_formula(formula: str) -> Formula:
+    """Compila a fórmula uma única vez por processo (a fórmula não guarda estado)."""
+    return Formula(formula)
+
+
+def ordem_topologica(
+    dependencias: dict[str, Iterable[str]], entidades: str = "colunas"
+) -> list[str]:
+    """
+    Ordena os nomes de forma que cada um venha depois de suas dependências.
+
+    Dependências fora do dicionário (colunas comuns) são ignoradas.
+    Levanta ErroExpressao com o ciclo encontrado (ex: 'A -> B -> A');
+    'entidades' nomeia o que está sendo ordenado na mensagem.
+    """
+    ordem: list[str] = []
+    estado: dict[str, int] = {}  # 1 = em visita, 2 = concluído
+    caminho: list[str] = []
+
+    def visitar(nome: str) -> None:
+        if estado.get(nome) == 2:
+            return
+        if estado.get(nome) == 1:
+            ciclo = caminho[caminho.index(nome):] + [nome]
+            raise ErroExpressao(
+                f"Dependência circular entre {entidades}: {' -> '.join(ciclo)}."
+            )
+        estado[nome] = 1
+        caminho.append(nome)
+        for dependencia in sorted(dependencias[nome]):
+            if dependencia in dependencias:
+                visitar(dependencia)
+        caminho.pop()
+        estado[nome] = 2
+        ordem.append(nome)
+
+    for nome in dependencias:
+        visitar(nome)
+    return ordem
@@ -0,0 +1,301 @@
+import io
+import json
+import zipfile
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass
+from json.encoder import encode_basestring
+
+import numpy as np
+
+from .colunar import decodificar_textos
+from .compressao import ALGORITMOS, comprimir_fluxo
+from .expressoes import INTEIRO, NUMERO
+from .metricas import registro_metricas
+from .modelos import ConfiguracaoCSV
+from .servicos import TAMANHO_LOTE_PADRAO, SistemaGerador
+from .utils_csv import gerar_csv_em_blocos
+
+
+@dataclass(frozen=True)
+class Formato:
+    """Metadados HTTP de um formato de saída."""
+    media_type: str
+    extensao: str
+
+
+FORMATOS = {
+    "csv": Formato("text/csv", "csv"),
+    "ndjson": Formato("application/x-ndjson", "ndjson"),
+    "parquet": Formato("application/vnd.apache.parquet", "parquet"),
+    "arrow": Formato("application/vnd.apache.arrow.stream", "arrows"),
+    "npy": Formato("application/octet-stream", "npy"),
+    "npz": Formato("application/zip", "npz"),
+}
+
+# Formatos em que um arquivo pode ser continuado com mais linhas (sem cabeçalho)
+FORMATOS_CONTINUAVEIS = ("csv", "ndjson")
+
+
+def extensao_arquivo(config: ConfiguracaoCSV) -> str:
+    """Extensão do arquivo gerado, incluindo a da compressão (ex: 'csv.gz')."""
+    extensao = FORMATOS[config.formato].extensao
+    if config.compressao is not None:
+        extensao += "." + ALGORITMOS[config.compressao].extensao
+    return extensao
+
+
+def nome_arquivo(config: ConfiguracaoCSV) -> str:
+    """Nome do arquivo para o 'Content-Disposition', com a extensão do formato."""
+    return f"dados_sinteticos.{extensao_arquivo(config)}"
+
+
+def tipo_midia(config: ConfiguracaoCSV) -> str:
+    """Media type da resposta: o do formato ou, se comprimido, o da compressão."""
+    if config.compressao is not None:
+        return ALGORITMOS[config.compressao].media_type
+    return FORMATOS[config.formato].media_type
+
+
+class _BufferDrenavel(io.RawIOBase):
+    """
+    Destino de escrita em memória que é esvaziado a cada lote.
+
+    Os escritores (pyarrow, zipfile) escrevem nele como em um arquivo não
+    posicionável; após cada lote, 'drenar' devolve e descarta o que foi escrito.
+    """
+    def __init__(self):
+        super().__init__()
+        self._partes: list[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, dados) -> int:
+        self._partes.append(bytes(dados))
+        return len(dados)
+
+    def drenar(self) -> bytes:
+        dados = b"".join(self._partes)
+        self._partes.clear()
+        return dados
+
+
+# Função chamada após cada lote com o número de linhas geradas (ex: progresso de jobs)
+AoGerarLote = Callable[[float], None] | None
+
+
+def _lotes(
+    sistema: SistemaGerador, tamanho: int, ao_gerar: AoGerarLote
+) -> Iterator[list]:
+    for colunas in sistema.gerar_lotes_colunares(tamanho):
+        yield colunas
+        if ao_gerar is not None:
+            ao_gerar(len(colunas[0]))
+
+
+def _importar_pyarrow(formato: str):
+    """Importa o pyarrow sob demanda (dependência opcional)."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError(
+            f"O formato '{formato}' requer o pacote opcional 'pyarrow' "
+            "(instale com: pip install 'syntheticdata-generator[arrow]')."
+        )
+    return pa, pq
+
+
+def esquema_arrow(config: ConfiguracaoCSV):
+    """
+    Deriva o esquema Arrow dos tipos das colunas, sem inspecionar valores:
+    int64 para contagens, float64 para os demais valores numéricos e
+    string para os textuais (colunas derivadas usam o tipo da fórmula).
+    """
+    pa, _ = _importar_pyarrow(config.formato)
+    tipos_arrow = {INTEIRO: pa.int64(), NUMERO: pa.float64()}
+    return pa.schema([
+        pa.field(coluna.nome, tipos_arrow.get(tipo, pa.string()), nullable=False)
+        for coluna, tipo in zip(config.colunas, config.tipos_valores())
+    ])
+
+
+def _lote_arrow(pa, esquema, colunas):
+    return pa.record_batch(
+        [
+            pa.array(valores, type=campo.type)
+            for valores, campo in zip(colunas, esquema)
+        ],
+        schema=esquema,
+    )
+
+
+def _gerar_arrow(lotes: Iterator[list], pa, esquema) -> Iterator[bytes]:
+    """Arrow IPC (streaming format): um record batch por lote."""
+    destino = _BufferDrenavel()
+    with pa.ipc.new_stream(destino, esquema) as escritor:
+        for colunas in lotes:
+            escritor.write_batch(_lote_arrow(pa, esquema, colunas))
+            yield destino.drenar()
+    yield destino.drenar()
+
+
+def _gerar_parquet(lotes: Iterator[list], pa, pq, esquema) -> Iterator[bytes]:
+    """Parquet: cada lote vira um row group, limitando a memória do escritor."""
+    destino = _BufferDrenavel()
+    with pq.ParquetWriter(destino, esquema) as escritor:
+        for colunas in lotes:
+            lote = _lote_arrow(pa, esquema, colunas)
+            escritor.write_batch(lote, row_group_size=lote.num_rows)
+            yield destino.drenar()
+    yield destino.drenar()
+
+
+def _literais_json(valores) -> list[str]:
+    """Valores de uma coluna como literais JSON (NaN e infinitos viram null)."""
+    if isinstance(valores, np.ndarray):
+        if valores.dtype.kind == "f":
+            textos = list(map(repr, valores.tolist()))
+            finitos = np.isfinite(valores)
+            if not finitos.all():
+                textos = [t if f else "null" for t, f in zip(textos, finitos.tolist())]
+            return textos
+        if valores.dtype.kind in "iu":
+            return list(map(str, valores.tolist()))
+        if valores.dtype.kind == "S":
+            valores = decodificar_textos(valores)
+        else:
+            valores = valores.tolist()
+    return [
+        encode_basestring(valor) if type(valor) is str else json.dumps(valor)
+        for valor in valores
+    ]
+
+
+def _gerar_ndjson(lotes: Iterator[list], nomes_colunas: list[str]) -> Iterator[bytes]:
+    """
+    NDJSON: um objeto JSON por linha, um bloco por lote.
+
+    Como no CSV, cada coluna é formatada inteira de uma vez (com a chave
+    já codificada na frente) e as linhas são montadas com 'join'.
+    """
+    prefixos = [encode_basestring(nome) + ":" for nome in nomes_colunas]
+    for colunas in lotes:
+        campos = [
+            [prefixo + texto for texto in _literais_json(valores)]
+            for prefixo, valores in zip(prefixos, colunas)
+        ]
+        linhas = map(",".join, zip(*campos))
+        yield "".join(["{" + linha + "}\n" for linha in linhas]).encode("utf-8")
+
+
+def _cabecalho_npy(formato: tuple[int, ...]) -> bytes:
+    cabecalho = io.BytesIO()
+    np.lib.format.write_array_header_1_0(
+        cabecalho, {"descr": "<f8", "fortran_order": False, "shape": formato}
+    )
+    return cabecalho.getvalue()
+
+
+def _gerar_npy(sistema: SistemaGerador, lotes: Iterator[list]) -> Iterator[bytes]:
+    """
+    .npy: matriz float64 (numLinhas, numColunas) em ordem C.
+
+    O formato é conhecido de antemão, então o cabeçalho é enviado primeiro
+    e cada lote vira um bloco de linhas da matriz.
+    """
+    yield _cabecalho_npy((sistema.config.numLinhas, len(sistema.nomes_colunas)))
+    for colunas in lotes:
+        yield np.column_stack(colunas).astype("<f8", copy=False).tobytes()
+
+
+def _gerar_npz(
+    sistema: SistemaGerador, tamanho: int, ao_gerar: AoGerarLote
+) -> Iterator[bytes]:
+    """
+    .npz: um arquivo .npy (float64) por coluna, dentro de um zip.
+
+    As colunas são geradas uma de cada vez, em lotes; como cada coluna tem
+    seu próprio fluxo aleatório, os valores são os mesmos da geração por linhas.
+    """
+    destino = _BufferDrenavel()
+    with zipfile.ZipFile(
+        destino, mode="w", compression=zipfile.ZIP_STORED
+    ) as arquivo_zip:
+        for indice, nome in enumerate(sistema.nomes_colunas):
+            with arquivo_zip.open(f"{nome}.npy", mode="w", force_zip64=True) as entrada:
+                entrada.write(_cabecalho_npy((sistema.config.numLinhas,)))
+                for valores in sistema.gerar_lotes_da_coluna(indice, tamanho):
+                    entrada.write(np.asarray(valores, dtype="<f8").tobytes())
+                    if ao_gerar is not None:
+                        # Cada coluna representa uma fração das linhas do arquivo
+                        ao_gerar(len(valores) / len(sistema.nomes_colunas))
+                    yield destino.drenar()
+            yield destino.drenar()
+    yield destino.drenar()
+
+
+def gerar_em_formato(
+    sistema: SistemaGerador,
+    tamanho: int = TAMANHO_LOTE_PADRAO,
+    ao_gerar: AoGerarLote = None,
+    continuacao: bool = False,
+) -> Iterator[bytes]:
+    """
+    Codifica a saída do sistema no formato pedido em 'config.formato',
+    comprimindo-a de forma incremental se 'config.compressao' for definido.
+
+    Com 'continuacao', a saída é anexada a um arquivo já existente: o
+    cabeçalho do CSV é omitido (ver 'FORMATOS_CONTINUAVEIS').
+
+    Dependências opcionais são verificadas aqui, antes do primeiro byte,
+    para que a falta delas vire um erro 400 e não uma resposta truncada.
+    """
+    if continuacao and sistema.config.formato not in FORMATOS_CONTINUAVEIS:
+        raise ValueError(
+            f"O formato '{sistema.config.formato}' não pode ser continuado; "
+            f"use um de: {', '.join(FORMATOS_CONTINUAVEIS)}."
+        )
+
+    def contar_linhas(linhas: float) -> None:
+        registro_metricas.incrementar("gerador_linhas_total", linhas)
+        if ao_gerar is not None:
+            ao_gerar(linhas)
+
+    blocos = _codificar(sistema, tamanho, contar_linhas, continuacao)
+    if sistema.config.compressao is not None:
+        blocos = comprimir_fluxo(
+            blocos, sistema.config.compressao, cronometro=sistema.cronometro
+        )
+    return blocos
+
+
+def _codificar(
+    sistema: SistemaGerador,
+    tamanho: int,
+    ao_gerar: AoGerarLote,
+    continuacao: bool = False,
+) -> Iterator[bytes]:
+    config = sistema.config
+    if config.formato == "npz":
+        return _gerar_npz(sistema, tamanho, ao_gerar)
+
+    lotes = _lotes(sistema, tamanho, ao_gerar)
+    if config.formato in ("arrow", "parquet"):
+        pa, pq = _importar_pyarrow(config.formato)
+        esquema = esquema_arrow(config)
+        if config.formato == "arrow":
+            return _gerar_arrow(lotes, pa, esquema)
+        return _gerar_parquet(lotes, pa, pq, esquema)
+    if config.formato == "npy":
+        return _gerar_npy(sistema, lotes)
+    if config.formato == "ndjson":
+        return _gerar_ndjson(lotes, sistema.nomes_colunas)
+    return gerar_csv_em_blocos(
+        lotes,
+        sistema.nomes_colunas,
+        delimitador=config.delimitador,
+        separadorDecimal=config.separadorDecimal,
+        precisao=config.precisaoDecimal,
+        cabecalho=b"" if continuacao else sistema.plano.cabecalho_csv,
+    )
@@ -1,10 +1,36 @@
-import rstr
-import numpy as np
+import random
 from abc import ABC, abstractmethod
 from typing import Any
 
+import numpy as np
+
+from .colunar import IndiceChaves
+from .expressoes import compilar_formula
+
 # Importa nossos modelos de configuração da Fase 1
-from .modelos import ConfigGeradorRegex, ConfigGeradorGaussiano, ConfigGeradorLinear
+from .modelos import (
+    ConfigGeradorCategorico,
+    ConfigGeradorExponencial,
+    ConfigGeradorExpressao,
+    ConfigGeradorGaussiano,
+    ConfigGeradorLinear,
+    ConfigGeradorLogNormal,
+    ConfigGeradorPoisson,
+    ConfigGeradorReferencia,
+    ConfigGeradorRegex,
+    ConfigGeradorUniforme,
+)
+from .regex_compilado import EnumeracaoRegex, ProgramaRegex, compilar_regex
+from .unicidade import PermutacaoFeistel, criar_registro
+
+# Lotes seguidos sem nenhum valor inédito antes de desistir (linguagem esgotada)
+MAX_TENTATIVAS_SEM_NOVOS = 100
+
+# Um lote de valores de uma coluna: array NumPy para dados numéricos,
+# array de bytes de largura fixa (dtype 'S') para regex ASCII de
+# comprimento fixo, ou lista Python para os demais dados textuais.
+LoteValores = np.ndarray | list
+
 
 class GeradorDados(ABC):
     """Classe base abstrata (Interface) para todos os geradores."""
@@ -13,36 +39,504 @@ class GeradorDados(ABC):
         """Gera um único valor sintético."""
         pass
 
+    def gerarLote(self, n: int) -> LoteValores:
+        """
+        Gera 'n' valores de uma só vez (geração colunar).
+
+        A implementação padrão apenas repete 'gerarValor'; geradores que
+        podem vetorizar a geração devem sobrescrever este método.
+        """
+        return [self.gerarValor() for _ in range(n)]
+
+    def avancar(self, n: int) -> None:
+        """
+        Avança o gerador 'n' posições, como se 'n' valores tivessem sido gerados.
+
+        Usado pela geração em shards: cada shard começa na linha correta.
+        Geradores cujos valores não dependem da posição não fazem nada.
+        """
+        pass
+
+    def exportar_estado(self) -> dict:
+        """
+        Estado posicional do gerador, serializável em JSON (checkpoints).
+
+        O fluxo aleatório da coluna ('rng') é salvo pelo SistemaGerador;
+        aqui fica apenas o que o gerador guarda além dele (ex: a posição
+        da sequência linear). A implementação padrão não guarda nada.
+        """
+        return {}
+
+    def restaurar_estado(self, estado: dict) -> None:
+        """Restaura um estado de 'exportar_estado'."""
+        pass
+
 
 class GeradorRegex(GeradorDados):
     """Gera dados textuais com base em uma Expressão Regular (RF02)."""
-    def __init__(self, config: ConfigGeradorRegex):
+    def __init__(
+        self, config: ConfigGeradorRegex, rng: np.random.Generator | None = None
+    ):
         self.expressao = config.expressao
+        self.rng = rng if rng is not None else np.random.default_rng()
+        # A expressão é compilada uma única vez em um plano de geração,
+        # compartilhado por todos os geradores com a mesma expressão.
+        # Construções não cobertas pelo plano (ex: referências a grupos)
+        # continuam sendo geradas pelo rstr.
+        self.programa: ProgramaRegex | None = compilar_regex(self.expressao)
+        if self.programa is None:
+            import rstr
+
+            # O rstr recebe um 'random.Random' próprio, semeado pelo 'rng' da
+            # coluna, em vez de usar o estado global do módulo 'random'
+            self._aleatorio = random.Random(int(self.rng.integers(2**63)))
+            self._rstr = rstr.Rstr(self._aleatorio)
 
     def gerarValor(self) -> str:
         """Gera uma string que corresponde à regex."""
-        return rstr.xeger(self.expressao)
+        if self.programa is None:
+            return self._rstr.xeger(self.expressao)
+        return self.programa.gerar_lote(1, self.rng)[0]
+
+    def gerarLote(self, n: int) -> LoteValores:
+        """
+        Gera 'n' strings de uma vez a partir do plano compilado.
+
+        Expressões ASCII de comprimento fixo (CPF, CEP, telefone...) saem
+        como um array de bytes de largura fixa, sem um objeto por string.
+        """
+        if self.programa is None:
+            return super().gerarLote(n)
+        if self.programa.bytes_fixos:
+            return self.programa.gerar_bytes(n, self.rng)
+        return self.programa.gerar_lote(n, self.rng)
+
+    def exportar_estado(self) -> dict:
+        if self.programa is not None:
+            return {}
+        # Expressões geradas pelo rstr usam o 'random.Random' próprio
+        versao, internos, gauss = self._aleatorio.getstate()
+        return {"random": [versao, list(internos), gauss]}
+
+    def restaurar_estado(self, estado: dict) -> None:
+        if self.programa is None:
+            versao, internos, gauss = estado["random"]
+            self._aleatorio.setstate((versao, tuple(internos), gauss))
+
+
+class GeradorRegexUnico(GeradorRegex):
+    """
+    Gera strings distintas de uma regex de comprimento fixo ('unico').
+
+    A linha 'i' recebe a string de índice permutacao(i) na enumeração da
+    linguagem: não há registro dos valores já gerados (memória constante)
+    e, como o valor depende só da posição, os shards continuam distintos
+    entre si desde que compartilhem a 'semente' da permutação.
+    """
+    def __init__(
+        self,
+        config: ConfigGeradorRegex,
+        rng: np.random.Generator | None = None,
+        semente: np.random.SeedSequence | None = None,
+    ):
+        super().__init__(config, rng)
+        self.enumeracao = EnumeracaoRegex(self.programa)
+        if semente is None:
+            semente = np.random.SeedSequence()
+        self.permutacao = PermutacaoFeistel(
+            self.enumeracao.tamanho,
+            semente.generate_state(PermutacaoFeistel.RODADAS, np.uint64),
+        )
+        # Posição (índice da linha) do próximo valor
+        self.indice = 0
+
+    def gerarValor(self) -> str:
+        return self.gerarLote(1)[0]
+
+    def gerarLote(self, n: int) -> list[str]:
+        """Gera as strings das próximas 'n' posições da permutação."""
+        if self.indice + n > self.enumeracao.tamanho:
+            raise ValueError(
+                f"A expressão '{self.expressao}' não tem valores distintos suficientes "
+                f"({self.enumeracao.tamanho})."
+            )
+        indices = np.arange(self.indice, self.indice + n, dtype=np.uint64)
+        self.indice += n
+        return self.enumeracao.gerar_lote(self.permutacao.aplicar(indices), self.rng)
+
+    def avancar(self, n: int) -> None:
+        self.indice += n
+
+    def exportar_estado(self) -> dict:
+        return {"indice": self.indice}
+
+    def restaurar_estado(self, estado: dict) -> None:
+        self.indice = estado["indice"]
+
+
+class GeradorUnicoFiltrado(GeradorDados):
+    """
+    Garante valores distintos descartando os já emitidos ('unico').
+
+    Usado quando a linguagem não é enumerável (comprimento variável ou
+    construções tratadas pelo rstr). Os valores emitidos ficam em um set
+    (poucos valores) ou em um filtro de Bloom (muitos), e os descartados
+    são sorteados de novo. O registro é local ao gerador, então a coluna
+    não pode ser dividida em shards independentes.
+    """
+    def __init__(self, gerador: GeradorDados, capacidade: int):
+        self.gerador = gerador
+        self.vistos = criar_registro(capacidade)
+
+    def gerarValor(self) -> Any:
+        return self.gerarLote(1)[0]
+
+    def gerarLote(self, n: int) -> list:
+        valores: list = []
+        tentativas = 0
+        while len(valores) < n:
+            novos = self.vistos.registrar(self.gerador.gerarLote(n - len(valores)))
+            tentativas = 0 if novos else tentativas + 1
+            if tentativas >= MAX_TENTATIVAS_SEM_NOVOS:
+                raise ValueError(
+                    "Não foi possível gerar valores distintos suficientes: "
+                    "a linguagem da expressão parece esgotada."
+                )
+            valores.extend(novos)
+        return valores
+
+    def exportar_estado(self) -> dict:
+        # O registro dos valores emitidos pode ter o tamanho da coluna inteira
+        raise ValueError(
+            "Colunas únicas de comprimento variável não podem ser salvas em "
+            "checkpoints."
+        )
 
 
 class GeradorGaussiano(GeradorDados):
     """Gera dados numéricos seguindo uma Distribuição Gaussiana (RF03)."""
-    def __init__(self, config: ConfigGeradorGaussiano):
+    def __init__(
+        self, config: ConfigGeradorGaussiano, rng: np.random.Generator | None = None
+    ):
         self.media = config.media
         self.desvio = config.desvioPadrao
+        self.rng = rng if rng is not None else np.random.default_rng()
 
     def gerarValor(self) -> float:
         """Gera um número float da distribuição normal."""
-        return float(np.random.normal(self.media, self.desvio))
+        return float(self.rng.normal(self.media, self.desvio))
+
+    def gerarLote(self, n: int) -> np.ndarray:
+        """Sorteia 'n' amostras da distribuição normal em uma única chamada."""
+        return self.rng.normal(self.media, self.desvio, size=n)
+
+
+class GeradorUniforme(GeradorDados):
+    """Gera dados numéricos com distribuição uniforme em [minimo, maximo) (RF08)."""
+    def __init__(
+        self, config: ConfigGeradorUniforme, rng: np.random.Generator | None = None
+    ):
+        self.minimo = config.minimo
+        self.maximo = config.maximo
+        self.rng = rng if rng is not None else np.random.default_rng()
+
+    def gerarValor(self) -> float:
+        return float(self.rng.uniform(self.minimo, self.maximo))
+
+    def gerarLote(self, n: int) -> np.ndarray:
+        return self.rng.uniform(self.minimo, self.maximo, size=n)
+
+
+class GeradorExponencial(GeradorDados):
+    """Gera dados numéricos com distribuição exponencial de taxa 'taxa' (RF08)."""
+    def __init__(
+        self, config: ConfigGeradorExponencial, rng: np.random.Generator | None = None
+    ):
+        # O NumPy parametriza pela escala (a média), que é 1 / taxa
+        self.escala = 1.0 / config.taxa
+        self.rng = rng if rng is not None else np.random.default_rng()
+
+    def gerarValor(self) -> float:
+        return float(self.rng.exponential(self.escala))
+
+    def gerarLote(self, n: int) -> np.ndarray:
+        return self.rng.exponential(self.escala, size=n)
+
+
+class GeradorLogNormal(GeradorDados):
+    """Gera dados numéricos com distribuição log-normal (RF08)."""
+    def __init__(
+        self, config: ConfigGeradorLogNormal, rng: np.random.Generator | None = None
+    ):
+        self.media = config.media
+        self.desvio = config.desvioPadrao
+        self.rng = rng if rng is not None else np.random.default_rng()
+
+    def gerarValor(self) -> float:
+        return float(self.rng.lognormal(self.media, self.desvio))
+
+    def gerarLote(self, n: int) -> np.ndarray:
+        return self.rng.lognormal(self.media, self.desvio, size=n)
+
+
+class GeradorPoisson(GeradorDados):
+    """Gera contagens (inteiros) com distribuição de Poisson (RF08)."""
+    def __init__(
+        self, config: ConfigGeradorPoisson, rng: np.random.Generator | None = None
+    ):
+        self.media = config.media
+        self.rng = rng if rng is not None else np.random.default_rng()
+
+    def gerarValor(self) -> int:
+        return int(self.rng.poisson(self.media))
+
+    def gerarLote(self, n: int) -> np.ndarray:
+        return self.rng.poisson(self.media, size=n)
+
+
+class GeradorCategorico(GeradorDados):
+    """
+    Sorteia valores de uma lista de categorias, com pesos opcionais (RF08).
+
+    Os pesos viram uma tabela de probabilidades acumuladas, calculada uma
+    única vez; cada lote é um único sorteio uniforme seguido de uma busca
+    binária vetorizada ('searchsorted'), em vez de uma alternância de regex.
+    """
+    def __init__(
+        self, config: ConfigGeradorCategorico, rng: np.random.Generator | None = None
+    ):
+        self.categorias = np.array(config.categorias, dtype=str)
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.acumulado: np.ndarray | None = None
+        if config.pesos is not None:
+            acumulado = np.cumsum(config.pesos, dtype=np.float64)
+            self.acumulado = acumulado / acumulado[-1]
+            # Garante que todo sorteio em [0, 1) caia em alguma categoria
+            self.acumulado[-1] = 1.0
+
+    def gerarValor(self) -> str:
+        return self.gerarLote(1)[0]
+
+    def gerarLote(self, n: int) -> list[str]:
+        if self.acumulado is None:
+            indices = self.rng.integers(0, len(self.categorias), size=n)
+        else:
+            # 'right': categorias com peso zero (intervalo vazio) nunca são sorteadas
+            indices = np.searchsorted(self.acumulado, self.rng.random(n), side="right")
+        return self.categorias[indices].tolist()
 
 
 class GeradorLinear(GeradorDados):
-    """Gera dados com incremento linear a cada chamada (RF06)."""
-    def __init__(self, config: ConfigGeradorLinear):
-        self.valor_atual = config.valorInicial
+    """
+    Gera dados com incremento linear a cada chamada (RF06), opcionalmente
+    com um ruído gaussiano de desvio 'ruido' somado a cada valor.
+    """
+    def __init__(
+        self, config: ConfigGeradorLinear, rng: np.random.Generator | None = None
+    ):
+        # Sem ruído, a sequência é determinística e 'rng' não é usado
+        self.valor_inicial = config.valorInicial
         self.incremento = config.incremento
+        self.ruido = config.ruido
+        self.rng = rng if rng is not None else np.random.default_rng()
+        # Posição (índice da linha) do próximo valor da sequência
+        self.indice = 0
+
+    @property
+    def valor_atual(self) -> float:
+        """Próximo valor da sequência: valorInicial + indice * incremento."""
+        return self.valor_inicial + self.indice * self.incremento
 
     def gerarValor(self) -> float:
         """Gera o próximo valor na sequência linear."""
         valor = self.valor_atual
-        self.valor_atual += self.incremento
+        self.indice += 1
+        if self.ruido:
+            valor += float(self.rng.normal(0.0, self.ruido))
         return valor
+
+    def gerarLote(self, n: int) -> np.ndarray:
+        """Gera os próximos 'n' valores da sequência com aritmética vetorizada."""
+        indices = np.arange(self.indice, self.indice + n, dtype=np.float64)
+        self.indice += n
+        valores = self.valor_inicial + indices * self.incremento
+        if self.ruido:
+            valores += self.rng.normal(0.0, self.ruido, size=n)
+        return valores
+
+    def avancar(self, n: int) -> None:
+        """
+        Pula 'n' posições: o próximo valor será
+        valorInicial + (indice + n) * incremento.
+        """
+        self.indice += n
+
+    def exportar_estado(self) -> dict:
+        """A posição da sequência (o 'valor_atual' é derivado dela)."""
+        return {"indice": self.indice}
+
+    def restaurar_estado(self, estado: dict) -> None:
+        self.indice = estado["indice"]
+
+
+class GeradorExpressao(GeradorDados):
+    """
+    Coluna derivada: avalia uma fórmula sobre os lotes das colunas de que
+    depende, todos de uma vez (RF05).
+
+    Os lotes das dependências são lidos de 'contexto' (nome -> lote), que o
+    SistemaGerador preenche antes de pedir o lote desta coluna.
+    """
+    def __init__(
+        self, config: ConfigGeradorExpressao, contexto: dict[str, LoteValores]
+    ):
+        self.formula = compilar_formula(config.formula)
+        self.contexto = contexto
+
+    def gerarValor(self) -> Any:
+        return self.gerarLote(1)[0]
+
+    def gerarLote(self, n: int) -> LoteValores:
+        valores = self.formula.avaliar(self.contexto, n)
+        # Textos seguem a convenção dos geradores textuais (listas)
+        return valores.tolist() if valores.dtype.kind == "U" else valores
+
+
+class GeradorReferencia(GeradorDados):
+    """
+    Chave estrangeira: sorteia linhas da tabela referenciada e devolve as
+    suas chaves, lidas do 'IndiceChaves' dela (uma indexação por lote).
+
+    Com 'zipf', cada linha recebe um peso 1 / posição^expoente em uma
+    ordem sorteada uma vez (para que os pais com mais filhos não sejam
+    sempre os primeiros), e o sorteio é uma busca binária vetorizada nas
+    probabilidades acumuladas, como no GeradorCategorico.
+    """
+    def __init__(
+        self,
+        config: ConfigGeradorReferencia,
+        indice: IndiceChaves,
+        rng: np.random.Generator | None = None,
+    ):
+        if indice.tamanho == 0:
+            raise ValueError(f"A tabela referenciada '{config.tabela}' não tem linhas.")
+        self.indice = indice
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.acumulado: np.ndarray | None = None
+        if config.distribuicao == "zipf":
+            pesos = (
+                np.arange(1, indice.tamanho + 1, dtype=np.float64) ** -config.expoente
+            )
+            acumulado = np.cumsum(pesos)
+            self.acumulado = acumulado / acumulado[-1]
+            self.acumulado[-1] = 1.0
+            self.ordem = self.rng.permutation(indice.tamanho)
+
+    def gerarValor(self) -> Any:
+        valor = self.gerarLote(1)[0]
+        return valor.decode("utf-8") if isinstance(valor, bytes) else valor.item()
+
+    def gerarLote(self, n: int) -> np.ndarray:
+        if self.acumulado is None:
+            posicoes = self.rng.integers(0, self.indice.tamanho, size=n)
+        else:
+            posicoes = self.ordem[
+                np.searchsorted(self.acumulado, self.rng.random(n), side="right")
+            ]
+        return self.indice.valores(posicoes)
+
+
+def fator_covariancia(
+    desvios: list[float], correlacao: list[list[float]]
+) -> np.ndarray:
+    """
+    Calcula uma matriz A com A @ A.T = covariância, onde a covariância é
+    diag(desvios) @ correlacao @ diag(desvios).
+
+    Usa a decomposição de Cholesky; se a matriz for apenas semidefinida
+    (ex: correlação 1 entre duas colunas), usa a decomposição espectral.
+    """
+    desvios = np.asarray(desvios, dtype=np.float64)
+    covariancia = np.asarray(correlacao, dtype=np.float64) * np.outer(desvios, desvios)
+    try:
+        return np.linalg.cholesky(covariancia)
+    except np.linalg.LinAlgError:
+        autovalores, autovetores = np.linalg.eigh(covariancia)
+        return autovetores * np.sqrt(np.clip(autovalores, 0.0, None))
+
+
+class GeradorMultivariado:
+    """
+    Gera várias colunas gaussianas correlacionadas de uma vez.
+
+    Cada lote é uma matriz (k, n) de normais padrão transformada por um
+    único produto de matrizes com o fator da covariância (calculado uma
+    vez, no plano). As colunas são entregues pelos 'ComponenteMultivariado',
+    um por coluna, que leem as linhas da mesma matriz.
+
+    Só a matriz do lote atual fica em memória: não há fila entre lotes.
+    Gerada coluna a coluna, uma componente do grupo é lida em uma réplica
+    que gera o grupo inteiro a cada lote (ver 'SistemaGerador.gerar_lotes_da_coluna').
+    """
+    def __init__(
+        self,
+        medias: list[float],
+        fator: np.ndarray,
+        rng: np.random.Generator | None = None,
+    ):
+        self.medias = np.asarray(medias, dtype=np.float64)[:, None]
+        self.fator = fator
+        self.rng = rng if rng is not None else np.random.default_rng()
+        # Matriz do lote atual e componentes que já leram a sua linha
+        self._lote: np.ndarray | None = None
+        self._entregues: set[int] = set()
+
+    @property
+    def pendente(self) -> bool:
+        """Se alguma componente ainda não leu o lote atual."""
+        return self._lote is not None
+
+    def gerarLote(self, n: int) -> np.ndarray:
+        """Gera 'n' linhas: uma matriz (k, n), uma coluna do arquivo por linha."""
+        normais = self.rng.standard_normal((len(self.medias), n))
+        return self.medias + self.fator @ normais
+
+    def componente(self, indice: int, n: int) -> np.ndarray:
+        """
+        Entrega os próximos 'n' valores da componente 'indice'.
+
+        A primeira componente a pedir um lote gera a matriz e as demais
+        leem a sua linha; quando todas leram, a matriz é liberada. Se uma
+        componente pede um novo lote antes das outras lerem o atual, os
+        valores não lidos são descartados.
+        """
+        if self._lote is None or indice in self._entregues or self._lote.shape[1] != n:
+            self._lote = self.gerarLote(n)
+            self._entregues = set()
+        self._entregues.add(indice)
+        valores = self._lote[indice]
+        if len(self._entregues) == len(self.medias):
+            self._lote = None
+        return valores
+
+
+class ComponenteMultivariado(GeradorDados):
+    """Uma coluna de um 'GeradorMultivariado' (Strategy de coluna correlacionada)."""
+    def __init__(self, grupo: GeradorMultivariado, indice: int):
+        self.grupo = grupo
+        self.indice = indice
+
+    def gerarValor(self) -> float:
+        return float(self.grupo.componente(self.indice, 1)[0])
+
+    def gerarLote(self, n: int) -> np.ndarray:
+        return self.grupo.componente(self.indice, n)
+
+    def exportar_estado(self) -> dict:
+        # O fluxo do grupo é o 'rng' da sua primeira coluna; entre lotes da
+        # geração por linhas, não há valores pendentes
+        if self.grupo.pendente:
+            raise ValueError(
+                "O grupo correlacionado tem valores gerados e ainda não entregues."
+            )
+        return {}
@@ -0,0 +1,224 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from .formatos import extensao_arquivo, gerar_em_formato
+from .metricas import medir_fluxo
+from .modelos import ConfiguracaoCSV
+from .servicos import SistemaGerador
+
+# Estados possíveis de um job
+NA_FILA = "na_fila"
+EXECUTANDO = "executando"
+CONCLUIDO = "concluido"
+CANCELADO = "cancelado"
+FALHOU = "falhou"
+
+ESTADOS_ATIVOS = (NA_FILA, EXECUTANDO)
+
+# Por quanto tempo (s) um job finalizado e seu arquivo ficam disponíveis
+RETENCAO_PADRAO = 3600
+# Máximo de jobs finalizados guardados; os mais antigos são removidos antes
+MAX_FINALIZADOS_PADRAO = 100
+
+
+class FilaCheia(Exception):
+    """Todos os trabalhadores estão ocupados e a fila de espera está cheia."""
+
+
+class _Cancelamento(Exception):
+    """Interrompe a geração de um job cancelado."""
+
+
+@dataclass
+class Job:
+    """Uma geração assíncrona e seu progresso."""
+    id: str
+    config: ConfiguracaoCSV
+    caminho: str
+    estado: str = NA_FILA
+    linhas_geradas: float = 0
+    criado_em: float = field(default_factory=time.time)
+    inicio: float | None = None
+    fim: float | None = None
+    erro: str | None = None
+    cancelamento: threading.Event = field(default_factory=threading.Event)
+
+    def progresso(self) -> dict:
+        """Resumo do job: linhas geradas, taxa (linhas/s) e tempo restante estimado."""
+        total = self.config.numLinhas
+        linhas_por_segundo = None
+        eta_segundos = None
+        if self.inicio is not None:
+            decorrido = (self.fim or time.time()) - self.inicio
+            if decorrido > 0 and self.linhas_geradas > 0:
+                linhas_por_segundo = self.linhas_geradas / decorrido
+                if self.estado == EXECUTANDO:
+                    eta_segundos = (total - self.linhas_geradas) / linhas_por_segundo
+        return {
+            "id": self.id,
+            "estado": self.estado,
+            "linhasGeradas": int(self.linhas_geradas),
+            "numLinhas": total,
+            "percentual": round(100 * self.linhas_geradas / total, 2),
+            "linhasPorSegundo": linhas_por_segundo,
+            "etaSegundos": eta_segundos,
+            "erro": self.erro,
+        }
+
+
+class GerenciadorJobs:
+    """
+    Executa gerações grandes fora do event loop, em um pool limitado de threads.
+
+    Até 'max_trabalhadores' jobs rodam ao mesmo tempo e até 'max_fila'
+    aguardam na fila; além disso, novos jobs são recusados (FilaCheia)
+    em vez de degradar os que já estão em andamento.
+
+    Jobs finalizados (concluídos, cancelados ou com falha) são removidos,
+    com seus arquivos, 'retencao' segundos depois do fim ou quando passam
+    de 'max_finalizados'; a limpeza acontece nas chamadas seguintes.
+    """
+    def __init__(
+        self,
+        diretorio: str,
+        max_trabalhadores: int = 2,
+        max_fila: int = 8,
+        processos: int = 1,
+        retencao: float = RETENCAO_PADRAO,
+        max_finalizados: int = MAX_FINALIZADOS_PADRAO,
+    ):
+        self.diretorio = diretorio
+        self.max_trabalhadores = max_trabalhadores
+        self.max_fila = max_fila
+        self.processos = processos
+        self.retencao = retencao
+        self.max_finalizados = max_finalizados
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_trabalhadores, thread_name_prefix="gerador-job"
+        )
+        self._jobs: dict[str, Job] = {}
+        self._lock = threading.Lock()
+        os.makedirs(diretorio, exist_ok=True)
+
+    def submeter(self, config: ConfiguracaoCSV) -> Job:
+        """Enfileira uma nova geração (controle de admissão)."""
+        self._expurgar()
+        with self._lock:
+            ativos = sum(
+                1 for job in self._jobs.values() if job.estado in ESTADOS_ATIVOS
+            )
+            limite = self.max_trabalhadores + self.max_fila
+            if ativos >= limite:
+                raise FilaCheia(f"Limite de {limite} jobs ativos atingido.")
+            id_job = uuid.uuid4().hex
+            job = Job(
+                id=id_job,
+                config=config,
+                caminho=os.path.join(
+                    self.diretorio, f"{id_job}.{extensao_arquivo(config)}"
+                ),
+            )
+            self._jobs[id_job] = job
+        self._executor.submit(self._executar, job)
+        return job
+
+    def obter(self, id_job: str) -> Job | None:
+        self._expurgar()
+        with self._lock:
+            return self._jobs.get(id_job)
+
+    def cancelar(self, id_job: str) -> Job | None:
+        """
+        Cancela um job ativo. Um job já finalizado é removido, junto com
+        seu arquivo de resultado.
+        """
+        with self._lock:
+            job = self._jobs.get(id_job)
+            if job is None:
+                return None
+            if job.estado in ESTADOS_ATIVOS:
+                job.cancelamento.set()
+                if job.estado == NA_FILA:
+                    job.estado = CANCELADO
+                    job.fim = time.time()
+                return job
+            del self._jobs[id_job]
+        if os.path.exists(job.caminho):
+            os.remove(job.caminho)
+        return job
+
+    def _expurgar(self) -> None:
+        """
+        Remove os jobs finalizados há mais de 'retencao' segundos ou além de
+        'max_finalizados'.
+        """
+        limite = time.time() - self.retencao
+        with self._lock:
+            finalizados = sorted(
+                (job for job in self._jobs.values()
+                 if job.estado not in ESTADOS_ATIVOS and job.fim is not None),
+                key=lambda job: job.fim,
+            )
+            excedentes = len(finalizados) - self.max_finalizados
+            removidos = [
+                job for posicao, job in enumerate(finalizados)
+                if posicao < excedentes or job.fim <= limite
+            ]
+            for job in removidos:
+                del self._jobs[job.id]
+        for job in removidos:
+            try:
+                os.remove(job.caminho)
+            except FileNotFoundError:
+                pass
+
+    def encerrar(self) -> None:
+        """Cancela os jobs ativos e encerra o pool de trabalhadores."""
+        with self._lock:
+            for job in self._jobs.values():
+                job.cancelamento.set()
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def _contar_linhas(self, job: Job, linhas: float) -> None:
+        """Atualiza o progresso a cada lote e interrompe se o job for cancelado."""
+        job.linhas_geradas += linhas
+        if job.cancelamento.is_set():
+            raise _Cancelamento()
+
+    def _executar(self, job: Job) -> None:
+        # Sob o lock de 'cancelar': um job cancelado na fila não volta a rodar
+        with self._lock:
+            if job.cancelamento.is_set():
+                job.estado = CANCELADO
+                job.fim = job.fim or time.time()
+                return
+            job.estado = EXECUTANDO
+            job.inicio = time.time()
+        parcial = job.caminho + ".parcial"
+        try:
+            sistema = SistemaGerador(job.config, processos=self.processos)
+            blocos = medir_fluxo(
+                gerar_em_formato(
+                    sistema, ao_gerar=lambda linhas: self._contar_linhas(job, linhas)
+                ),
+                sistema.cronometro,
+                job.config.formato,
+            )
+            with open(parcial, "wb") as arquivo:
+                for bloco in blocos:
+                    arquivo.write(bloco)
+            os.replace(parcial, job.caminho)
+            job.estado = CONCLUIDO
+        except _Cancelamento:
+            job.estado = CANCELADO
+        except Exception as e:
+            job.estado = FALHOU
+            job.erro = str(e)
+        finally:
+            job.fim = time.time()
+            if os.path.exists(parcial):
+                os.remove(parcial)
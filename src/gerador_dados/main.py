@@ -1,16 +1,40 @@
-from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import StreamingResponse, HTMLResponse
-from fastapi.templating import Jinja2Templates
-from fastapi.staticfiles import StaticFiles
-import io
+import functools
 import os
+import tempfile
+import time
+from typing import BinaryIO
+
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import (
+    FileResponse,
+    HTMLResponse,
+    PlainTextResponse,
+    Response,
+    StreamingResponse,
+)
+from fastapi.staticfiles import StaticFiles
+from pydantic import ValidationError
+
+from .cache import CacheResultados, ler_em_blocos
+from .compressao import comprimir_fluxo, estatisticas_compressao, negociar_codificacao
+from .formatos import gerar_em_formato, nome_arquivo, tipo_midia
+from .jobs import (
+    CONCLUIDO,
+    MAX_FINALIZADOS_PADRAO,
+    RETENCAO_PADRAO,
+    FilaCheia,
+    GerenciadorJobs,
+)
+from .metricas import MiddlewareMetricas, medir_fluxo, registro_metricas
 
 # Importa nossos modelos da Fase 1
-from .modelos import ConfiguracaoCSV
+from .modelos import ConfiguracaoCSV, EsquemaRelacional
+from .relacional import GeradorEsquema
 
 # Importa nossos serviços das Fases 3 e 4
-from .servicos import SistemaGerador
-from .utils_csv import converter_para_csv_string
+from .servicos import TAMANHO_LOTE_PADRAO, CachePlanos, SistemaGerador
 
 # Cria a instância principal da aplicação
 app = FastAPI(
@@ -18,11 +42,90 @@ app = FastAPI(
     description="API para geração de dados sintéticos baseada na especificação de requisitos.",
     version="0.1.0 (MVP)"
 )
+# Requisições em andamento e duração até o último byte (GET /metrics)
+app.add_middleware(MiddlewareMetricas)
+
+# Número de processos usados na geração (modo paralelo opt-in).
+# Ex: GERADOR_PROCESSOS=32 distribui os lotes entre 32 processos.
+PROCESSOS_GERACAO = int(os.environ.get("GERADOR_PROCESSOS", "1"))
+
+# Cache em disco das configurações com semente (saída determinística).
+# GERADOR_CACHE_DIR define a pasta e GERADOR_CACHE_MAX_BYTES o tamanho máximo.
+cache_resultados = CacheResultados(
+    diretorio=os.environ.get(
+        "GERADOR_CACHE_DIR", os.path.join(tempfile.gettempdir(), "gerador_dados_cache")
+    ),
+    tamanho_maximo=int(os.environ.get("GERADOR_CACHE_MAX_BYTES", 1024**3)),
+)
+
+# Planos de geração compilados, para que requisições repetidas (ex: muitas
+# requisições pequenas com a mesma configuração) não sejam validadas e
+# compiladas de novo. GERADOR_PLANOS_MAX limita o número de planos em memória.
+cache_planos = CachePlanos(int(os.environ.get("GERADOR_PLANOS_MAX", "256")))
+
+# Máximo de linhas devolvidas por /pre-visualizar
+MAX_LINHAS_PRE_VISUALIZACAO = 1_000
+
+# Jobs assíncronos para gerações grandes (POST /jobs).
+# GERADOR_JOBS_TRABALHADORES jobs rodam em paralelo e até GERADOR_JOBS_FILA aguardam.
+# Jobs finalizados (e seus arquivos) são removidos GERADOR_JOBS_RETENCAO segundos
+# depois do fim, ou quando passam de GERADOR_JOBS_MAX_FINALIZADOS.
+gerenciador_jobs = GerenciadorJobs(
+    diretorio=os.environ.get(
+        "GERADOR_JOBS_DIR", os.path.join(tempfile.gettempdir(), "gerador_dados_jobs")
+    ),
+    max_trabalhadores=int(os.environ.get("GERADOR_JOBS_TRABALHADORES", "2")),
+    max_fila=int(os.environ.get("GERADOR_JOBS_FILA", "8")),
+    processos=PROCESSOS_GERACAO,
+    retencao=float(os.environ.get("GERADOR_JOBS_RETENCAO", RETENCAO_PADRAO)),
+    max_finalizados=int(
+        os.environ.get("GERADOR_JOBS_MAX_FINALIZADOS", MAX_FINALIZADOS_PADRAO)
+    ),
+)
+
+
+def _metricas_cache_e_compressao():
+    """Amostras do cache e da compressão, lidas no momento da coleta."""
+    cache = cache_resultados.estatisticas()
+    compressao = estatisticas_compressao.resumo()
+    planos = cache_planos.estatisticas()
+    return [
+        ("gerador_planos_acertos_total", "counter",
+         "Acertos do cache de planos de geração.", planos["acertos"]),
+        ("gerador_planos_falhas_total", "counter",
+         "Falhas do cache de planos de geração.", planos["falhas"]),
+        ("gerador_cache_acertos_total", "counter", "Acertos do cache de resultados.",
+         cache["acertos"]),
+        ("gerador_cache_falhas_total", "counter", "Falhas do cache de resultados.",
+         cache["falhas"]),
+        ("gerador_cache_despejos_total", "counter", "Entradas despejadas do cache.",
+         cache["despejos"]),
+        ("gerador_cache_bytes", "gauge", "Bytes ocupados pelo cache de resultados.",
+         cache["bytes"]),
+        ("gerador_compressao_entrada_bytes_total", "counter",
+         "Bytes recebidos pelos compressores.", compressao["bytesEntrada"]),
+        ("gerador_compressao_saida_bytes_total", "counter",
+         "Bytes produzidos pelos compressores.", compressao["bytesSaida"]),
+    ]
+
+
+registro_metricas.registrar_coletor(_metricas_cache_e_compressao)
 
 # Configura a pasta de templates
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 templates_dir = os.path.join(BASE_DIR, "..", "templates")
-templates = Jinja2Templates(directory=templates_dir)
+
+
+@functools.cache
+def _templates():
+    """
+    Templates da interface web, carregados na primeira visita à página:
+    o Jinja2 não pesa na inicialização de quem só usa a API.
+    """
+    from fastapi.templating import Jinja2Templates
+
+    return Jinja2Templates(directory=templates_dir)
+
 
 # Monta a pasta estática apenas se ela existir, para evitar erros na inicialização
 static_dir = os.path.join(BASE_DIR, "..", "static")
@@ -33,41 +136,204 @@ if os.path.isdir(static_dir):
 async def read_root(request: Request):
     """Serve a página HTML principal."""
     # Passa o 'request' para o template, necessário pelo Jinja2Templates
-    return templates.TemplateResponse("index.html", {"request": request})
+    return _templates().TemplateResponse("index.html", {"request": request})
+
+def _server_timing(etapas: dict[str, float]) -> str:
+    """Monta o cabeçalho 'Server-Timing' (durações em milissegundos)."""
+    return ", ".join(
+        f"{etapa};dur={segundos * 1000:.2f}" for etapa, segundos in etapas.items()
+    )
+
+
+def _etag_corresponde(if_none_match: str | None, etag: str) -> bool:
+    """Verifica se o cabeçalho 'If-None-Match' do cliente inclui o ETag atual."""
+    if not if_none_match:
+        return False
+    candidatos = [
+        valor.strip().removeprefix("W/") for valor in if_none_match.split(",")
+    ]
+    return "*" in candidatos or etag in candidatos
 
-@app.post("/gerar-csv")
-async def gerar_csv(config: ConfiguracaoCSV):
+
+class RespostaArquivoAberto(Response):
+    """
+    Envia um arquivo já aberto (ex: uma entrada do cache de resultados).
+
+    O arquivo continua aberto até o fim do envio, então um despejo
+    concorrente não o remove no meio do caminho (ao contrário da
+    FileResponse, que reabre o arquivo pelo caminho). Servidores ASGI com a
+    extensão 'http.response.zerocopysend' o enviam com sendfile, sem cópia;
+    nos demais, ele é lido em blocos em uma thread.
+    """
+    TAMANHO_BLOCO = 1024 * 1024
+
+    def __init__(self, arquivo: BinaryIO, media_type: str, headers: dict[str, str]):
+        self.arquivo = arquivo
+        self.tamanho = os.fstat(arquivo.fileno()).st_size
+        super().__init__(
+            media_type=media_type,
+            headers={**headers, "Content-Length": str(self.tamanho)},
+        )
+
+    async def __call__(self, scope, receive, send) -> None:
+        with self.arquivo:
+            await send({
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": self.raw_headers,
+            })
+            if "http.response.zerocopysend" in scope.get("extensions", {}):
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": self.arquivo,
+                    "count": self.tamanho,
+                })
+                return
+            while bloco := await run_in_threadpool(
+                self.arquivo.read, self.TAMANHO_BLOCO
+            ):
+                await send(
+                    {"type": "http.response.body", "body": bloco, "more_body": True}
+                )
+            await send({"type": "http.response.body", "body": b""})
+
+
+async def _obter_plano(request: Request):
+    """
+    Lê o corpo da requisição e devolve o plano de geração do cache.
+
+    A validação Pydantic só acontece para corpos ainda não vistos; os erros
+    são devolvidos no mesmo formato (422) da validação automática do FastAPI.
+    """
+    corpo = await request.body()
+    try:
+        return cache_planos.obter(corpo)
+    except ValidationError as e:
+        raise RequestValidationError(
+            [
+                {**erro, "loc": ("body", *erro["loc"])}
+                for erro in e.errors(include_url=False)
+            ],
+            body=corpo,
+        )
+
+
+# O corpo é lido e validado por '_obter_plano'; o esquema continua documentado
+_CORPO_CONFIGURACAO = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {
+                "schema": {"$ref": "#/components/schemas/ConfiguracaoCSV"}
+            }
+        },
+    }
+}
+
+
+@app.post("/gerar-csv", openapi_extra=_CORPO_CONFIGURACAO)
+async def gerar_csv(request: Request):
     """
     Endpoint principal para gerar dados sintéticos.
     
-    Recebe uma configuração JSON (validada pelo Pydantic 'config: ConfiguracaoCSV')
-    e retorna um arquivo CSV (text/csv).
+    Recebe uma configuração JSON (ConfiguracaoCSV, validada pelo Pydantic)
+    e retorna um arquivo CSV (text/csv), ou Parquet, Arrow IPC, .npy ou
+    .npz conforme o campo 'formato'.
+
+    Configurações repetidas reaproveitam o plano de geração compilado
+    (cache de planos): não são validadas nem compiladas de novo.
+
+    O arquivo é gerado e enviado em lotes: cada lote é codificado e transmitido
+    assim que fica pronto, sem montar o arquivo completo em memória.
+
+    Configurações com 'semente' são determinísticas: a resposta tem um ETag
+    (hash da configuração), responde 304 a 'If-None-Match' e é servida
+    direto do cache em disco quando já foi gerada antes.
+
+    A compressão pode vir da configuração ('compressao', que muda a extensão
+    do arquivo) ou, para CSV, ser negociada pelo 'Accept-Encoding' do
+    cliente (Content-Encoding); nos dois casos ela é aplicada em streaming.
+
+    O cabeçalho 'Server-Timing' traz as etapas anteriores ao primeiro byte
+    (validação, cache e construção); as etapas do streaming (geração,
+    codificação, compressão e envio) são agregadas por lote em /metrics.
     """
+    # Leitura do corpo e obtenção do plano (validação só em caso de falha no cache)
+    inicio = time.perf_counter()
+    plano = await _obter_plano(request)
+    config = plano.config
+    etapas = {"validacao": time.perf_counter() - inicio}
+    registro_metricas.observar(
+        "gerador_etapa_segundos", etapas["validacao"], etapa="validacao"
+    )
+
+    media_type = tipo_midia(config)
+    cabecalhos = {"Content-Disposition": f"attachment; filename={nome_arquivo(config)}"}
+    chave = None
+
+    # Compressão de transporte negociada (somente CSV sem 'compressao' própria)
+    codificacao = None
+    if config.formato == "csv" and config.compressao is None:
+        cabecalhos["Vary"] = "Accept-Encoding"
+        codificacao = negociar_codificacao(request.headers.get("accept-encoding"))
+        if codificacao is not None:
+            cabecalhos["Content-Encoding"] = codificacao
+    if config.compressao or codificacao:
+        cabecalhos["X-Compressao"] = config.compressao or codificacao
+
+    if config.semente is not None:
+        # O modo paralelo e o tamanho do lote também definem a saída
+        chave = plano.chave_resultado(
+            paralelo=PROCESSOS_GERACAO > 1, tamanhoLote=TAMANHO_LOTE_PADRAO
+        )
+        # Cada codificação de transporte é uma representação diferente
+        etag = f'"{chave}"' if codificacao is None else f'"{chave}-{codificacao}"'
+        cabecalhos["ETag"] = etag
+        if _etag_corresponde(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers={"ETag": etag})
+
+        inicio = time.perf_counter()
+        arquivo = cache_resultados.abrir(chave)
+        etapas["cache"] = time.perf_counter() - inicio
+        cabecalhos["Server-Timing"] = _server_timing(etapas)
+        if arquivo is not None:
+            cabecalhos["X-Cache"] = "HIT"
+            # O arquivo já está aberto: um despejo concorrente não o remove
+            # antes do envio. O cache guarda a versão sem codificação de transporte
+            if codificacao is None:
+                return RespostaArquivoAberto(arquivo, media_type, cabecalhos)
+            blocos = comprimir_fluxo(ler_em_blocos(arquivo), codificacao)
+            return StreamingResponse(blocos, media_type=media_type, headers=cabecalhos)
+        cabecalhos["X-Cache"] = "MISS"
+
     try:
         # 1. Instancia o serviço orquestrador (Fase 3)
-        gerador = SistemaGerador(config)
-        
-        # 2. Gera os dados em memória (Fase 3)
-        dados_gerados = gerador.gerar_dados()
-        
-        # 3. Converte os dados para uma string CSV (Fase 4)
-        csv_string = converter_para_csv_string(
-            dados_gerados,
-            gerador.nomes_colunas,
-            delimitador=config.delimitador,
-            separadorDecimal=config.separadorDecimal
-        )        
-        # 4. Cria um buffer de 'bytes' para a resposta
-        buffer = io.BytesIO(csv_string.encode("utf-8"))
-        
-        # 5. Retorna uma StreamingResponse
-        # Isso permite ao navegador/cliente baixar o arquivo
+        inicio = time.perf_counter()
+        gerador = SistemaGerador(config, processos=PROCESSOS_GERACAO, plano=plano)
+        etapas["construcao"] = time.perf_counter() - inicio
+        registro_metricas.observar(
+            "gerador_etapa_segundos", etapas["construcao"], etapa="construcao"
+        )
+        cabecalhos["Server-Timing"] = _server_timing(etapas)
+
+        # 2. Encadeia a geração lazy em lotes colunares (Fase 3) no
+        #    codificador incremental do formato pedido (Fase 4)
+        blocos = gerar_em_formato(gerador)
+        if chave is not None:
+            # Grava no cache enquanto envia ao cliente
+            blocos = cache_resultados.gravar_em_fluxo(chave, blocos)
+        if codificacao is not None:
+            blocos = comprimir_fluxo(blocos, codificacao, cronometro=gerador.cronometro)
+        # Mede geração, codificação, compressão e envio a cada bloco
+        blocos = medir_fluxo(blocos, gerador.cronometro, config.formato)
+
+        # 3. Retorna uma StreamingResponse
+        # O Starlette consome o iterador síncrono em uma thread separada,
+        # enviando cada bloco ao cliente assim que ele é produzido.
         return StreamingResponse(
-            iter([buffer.getvalue()]),
-            media_type="text/csv",
-            headers={
-                "Content-Disposition": "attachment; filename=dados_sinteticos.csv"
-            }
+            blocos,
+            media_type=media_type,
+            headers=cabecalhos
         )
 
     except ValueError as ve:
@@ -76,3 +342,130 @@ async def gerar_csv(config: ConfiguracaoCSV):
     except Exception as e:
         # Captura quaisquer outros erros inesperados
         raise HTTPException(status_code=500, detail=f"Erro interno no servidor: {e}")
+
+
+@app.post("/pre-visualizar", openapi_extra=_CORPO_CONFIGURACAO)
+async def pre_visualizar(
+    request: Request,
+    linhas: int = Query(20, ge=1, le=MAX_LINHAS_PRE_VISUALIZACAO),
+):
+    """
+    Gera apenas as primeiras 'linhas' linhas da configuração, em JSON,
+    para a interface mostrar uma amostra enquanto o usuário configura.
+
+    Usa o mesmo cache de planos de /gerar-csv e não passa pelo cache de
+    resultados; o tempo de resposta não depende de 'numLinhas'.
+    """
+    plano = await _obter_plano(request)
+    try:
+        sistema = SistemaGerador(plano.config, plano=plano)
+        return {
+            "colunas": sistema.nomes_colunas,
+            "numLinhas": plano.config.numLinhas,
+            "linhas": sistema.pre_visualizar(linhas),
+        }
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+
+
+@app.post("/gerar-esquema")
+async def gerar_esquema(esquema: EsquemaRelacional):
+    """
+    Gera várias tabelas relacionadas (ex: usuários -> pedidos) e retorna
+    um zip com um CSV por tabela.
+
+    Colunas 'referencia' sorteiam a chave ('unico') de outra tabela; as
+    tabelas são geradas em ordem topológica, e o zip é enviado em
+    streaming, lote a lote, como em /gerar-csv.
+    """
+    try:
+        gerador = GeradorEsquema(esquema)
+        blocos = medir_fluxo(gerador.gerar_zip(), gerador.cronometro, "zip")
+        return StreamingResponse(
+            blocos,
+            media_type="application/zip",
+            headers={
+                "Content-Disposition": "attachment; filename=dados_sinteticos.zip"
+            },
+        )
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metricas():
+    """Métricas no formato de texto do Prometheus (etapas, colunas, bytes, memória)."""
+    return PlainTextResponse(
+        registro_metricas.exportar(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
+@app.get("/cache/estatisticas")
+async def estatisticas_cache():
+    """Contadores do cache de resultados (acertos, falhas e despejos)."""
+    return cache_resultados.estatisticas()
+
+
+@app.get("/planos/estatisticas")
+async def estatisticas_planos():
+    """Contadores do cache de planos de geração (acertos e falhas)."""
+    return cache_planos.estatisticas()
+
+
+@app.get("/compressao/estatisticas")
+async def estatisticas_de_compressao():
+    """Totais de compressão: bytes de entrada/saída, razão e throughput (MB/s)."""
+    return estatisticas_compressao.resumo()
+
+
+@app.post("/jobs", status_code=202)
+async def criar_job(config: ConfiguracaoCSV):
+    """
+    Agenda uma geração grande em segundo plano.
+
+    Retorna imediatamente (202) com o id do job. Se o pool de trabalhadores
+    e a fila estiverem cheios, o job é recusado com 503.
+    """
+    try:
+        job = gerenciador_jobs.submeter(config)
+    except FilaCheia as e:
+        raise HTTPException(
+            status_code=503, detail=str(e), headers={"Retry-After": "30"}
+        )
+    return job.progresso()
+
+
+@app.get("/jobs/{id_job}")
+async def consultar_job(id_job: str):
+    """Retorna o estado e o progresso do job (linhas geradas, linhas/s e ETA)."""
+    job = gerenciador_jobs.obter(id_job)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado.")
+    return job.progresso()
+
+
+@app.get("/jobs/{id_job}/resultado")
+async def baixar_resultado_job(id_job: str):
+    """Baixa o arquivo de um job concluído, direto do disco."""
+    job = gerenciador_jobs.obter(id_job)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado.")
+    if job.estado != CONCLUIDO:
+        raise HTTPException(status_code=409, detail=f"O job está '{job.estado}'.")
+    return FileResponse(
+        job.caminho,
+        media_type=tipo_midia(job.config),
+        headers={
+            "Content-Disposition": f"attachment; filename={nome_arquivo(job.config)}"
+        },
+    )
+
+
+@app.delete("/jobs/{id_job}")
+async def cancelar_job(id_job: str):
+    """Cancela um job ativo ou remove um job finalizado e seu arquivo."""
+    job = gerenciador_jobs.cancelar(id_job)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado.")
+    return job.progresso()
@@ -0,0 +1,287 @@
+import sys
+import threading
+import time
+from collections import defaultdict
+from collections.abc import Callable, Iterable, Iterator
+
+try:
+    import resource
+except ImportError:  # Windows: sem getrusage, o pico de memória não é exportado
+    resource = None
+
+# Nome -> (tipo Prometheus, descrição) das métricas exportadas em /metrics
+METRICAS = {
+    "gerador_etapa_segundos": (
+        "summary",
+        "Tempo gasto em cada etapa da geração (validacao, construcao, geracao, "
+        "codificacao, compressao, envio).",
+    ),
+    "gerador_coluna_segundos": (
+        "summary",
+        "Tempo de geração dos lotes de cada coluna, por tipo de gerador.",
+    ),
+    "gerador_valores_total": ("counter", "Valores gerados, por tipo de gerador."),
+    "gerador_linhas_total": ("counter", "Linhas geradas."),
+    "gerador_bytes_total": (
+        "counter",
+        "Bytes produzidos pelos codificadores, por formato.",
+    ),
+    "gerador_requisicoes_total": ("counter", "Requisições HTTP atendidas."),
+    "gerador_requisicao_segundos": (
+        "summary",
+        "Duração das requisições HTTP (até o último byte).",
+    ),
+    "gerador_requisicoes_em_andamento": ("gauge", "Requisições HTTP em andamento."),
+    "gerador_memoria_pico_bytes": (
+        "gauge",
+        "Pico de memória residente (RSS) do processo.",
+    ),
+}
+
+
+def _pico_memoria_bytes() -> int | None:
+    """Pico de memória residente do processo, em bytes (None sem getrusage)."""
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS informa ru_maxrss em bytes; Linux e os demais Unix, em KiB
+    return pico if sys.platform == "darwin" else pico * 1024
+
+
+# Função que devolve amostras extras no momento da coleta:
+# (nome, tipo, descrição, valor)
+Coletor = Callable[[], Iterable[tuple[str, str, str, float]]]
+
+
+def _rotulos(rotulos: tuple[tuple[str, str], ...]) -> str:
+    if not rotulos:
+        return ""
+    pares = []
+    for nome, valor in rotulos:
+        # Escapa '\', '"' e quebras de linha, como exige o formato de texto
+        valor = (
+            str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        )
+        pares.append(f'{nome}="{valor}"')
+    return "{" + ",".join(pares) + "}"
+
+
+def chave_metrica(nome: str, **rotulos) -> tuple:
+    """
+    Identificador de uma série (nome e rótulos ordenados), reutilizável em
+    'atualizar'.
+    """
+    return (nome, tuple(sorted(rotulos.items())))
+
+
+class RegistroMetricas:
+    """
+    Registro de métricas agregadas, exportadas no formato de texto do Prometheus.
+
+    As observações são feitas por lote (e não por célula), então o custo
+    é de algumas operações por lote de milhares de linhas.
+    É seguro para uso entre threads.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (nome, rótulos) -> valor; resumos guardam [soma, contagem]
+        self._valores: dict[tuple[str, tuple], float] = defaultdict(float)
+        self._resumos: dict[tuple[str, tuple], list[float]] = {}
+        self._coletores: list[Coletor] = []
+
+    def incrementar(self, nome: str, valor: float = 1, **rotulos) -> None:
+        """Soma 'valor' a um contador ou gauge."""
+        self.atualizar(incrementos=[(chave_metrica(nome, **rotulos), valor)])
+
+    def observar(self, nome: str, segundos: float, **rotulos) -> None:
+        """Registra uma duração em um resumo (soma e contagem)."""
+        self.atualizar(observacoes=[(chave_metrica(nome, **rotulos), segundos)])
+
+    def atualizar(
+        self,
+        observacoes: Iterable[tuple[tuple, float]] = (),
+        incrementos: Iterable[tuple[tuple, float]] = (),
+    ) -> None:
+        """
+        Aplica várias observações e incrementos (chaves de 'chave_metrica')
+        com uma única aquisição do lock, como as de um lote inteiro.
+        """
+        with self._lock:
+            for chave, segundos in observacoes:
+                resumo = self._resumos.get(chave)
+                if resumo is None:
+                    resumo = self._resumos[chave] = [0.0, 0]
+                resumo[0] += segundos
+                resumo[1] += 1
+            for chave, valor in incrementos:
+                self._valores[chave] += valor
+
+    def registrar_coletor(self, coletor: Coletor) -> None:
+        """Adiciona uma fonte de métricas calculadas na hora da coleta."""
+        self._coletores.append(coletor)
+
+    def valor(self, nome: str, **rotulos) -> float:
+        """Valor atual de um contador ou gauge (0 se nunca registrado)."""
+        with self._lock:
+            return self._valores.get((nome, tuple(sorted(rotulos.items()))), 0.0)
+
+    def exportar(self) -> str:
+        """Gera o texto do formato de exposição do Prometheus (versão 0.0.4)."""
+        por_nome: dict[str, list[str]] = defaultdict(list)
+        with self._lock:
+            for (nome, rotulos), valor in sorted(self._valores.items()):
+                por_nome[nome].append(f"{nome}{_rotulos(rotulos)} {valor!r}")
+            for (nome, rotulos), (soma, contagem) in sorted(self._resumos.items()):
+                por_nome[nome].append(f"{nome}_sum{_rotulos(rotulos)} {soma!r}")
+                por_nome[nome].append(f"{nome}_count{_rotulos(rotulos)} {contagem}")
+
+        pico = _pico_memoria_bytes()
+        if pico is not None:
+            por_nome["gerador_memoria_pico_bytes"].append(
+                f"gerador_memoria_pico_bytes {pico}"
+            )
+
+        tipos = {nome: tipo for nome, (tipo, _) in METRICAS.items()}
+        descricoes = {nome: descricao for nome, (_, descricao) in METRICAS.items()}
+        for coletor in self._coletores:
+            for nome, tipo, descricao, valor in coletor():
+                tipos[nome], descricoes[nome] = tipo, descricao
+                por_nome[nome].append(f"{nome} {float(valor)!r}")
+
+        linhas = []
+        for nome, amostras in por_nome.items():
+            linhas.append(f"# HELP {nome} {descricoes.get(nome, nome)}")
+            linhas.append(f"# TYPE {nome} {tipos.get(nome, 'untyped')}")
+            linhas.extend(amostras)
+        return "\n".join(linhas) + "\n"
+
+
+registro_metricas = RegistroMetricas()
+
+
+class Cronometro:
+    """
+    Acumula o tempo gasto em etapas internas de um fluxo (ex: 'geracao',
+    'compressao') até que 'medir_fluxo' o recolha, a cada bloco.
+    """
+    def __init__(self):
+        self.segundos: dict[str, float] = defaultdict(float)
+
+    def adicionar(self, etapa: str, segundos: float) -> None:
+        self.segundos[etapa] += segundos
+
+    def recolher(self) -> dict[str, float]:
+        """Devolve o tempo acumulado por etapa e zera os acumuladores."""
+        segundos, self.segundos = self.segundos, defaultdict(float)
+        return segundos
+
+
+def medir_fluxo(
+    blocos: Iterable[bytes], cronometro: Cronometro, formato: str
+) -> Iterator[bytes]:
+    """
+    Repassa os blocos de uma resposta medindo suas etapas, bloco a bloco.
+
+    O tempo para produzir cada bloco é dividido entre as etapas internas
+    registradas no 'cronometro' (geração, compressão) e a codificação (o
+    restante); o tempo até o consumidor pedir o próximo bloco é o envio.
+    """
+    iterador = iter(blocos)
+    chave_bytes = chave_metrica("gerador_bytes_total", formato=formato)
+    envio = 0.0
+    try:
+        while True:
+            inicio = time.perf_counter()
+            try:
+                bloco = next(iterador)
+            except StopIteration:
+                _registrar_etapas(cronometro, time.perf_counter() - inicio, envio)
+                return
+            _registrar_etapas(
+                cronometro,
+                time.perf_counter() - inicio,
+                envio,
+                (chave_bytes, len(bloco)),
+            )
+
+            inicio = time.perf_counter()
+            yield bloco
+            # Registrado junto com as etapas do próximo bloco
+            envio = time.perf_counter() - inicio
+    finally:
+        # Propaga o encerramento antecipado (ex: cliente desconectado)
+        fechar = getattr(iterador, "close", None)
+        if fechar is not None:
+            fechar()
+
+
+_CHAVES_ETAPAS: dict[str, tuple] = {}
+
+
+def _chave_etapa(etapa: str) -> tuple:
+    chave = _CHAVES_ETAPAS.get(etapa)
+    if chave is None:
+        chave = _CHAVES_ETAPAS[etapa] = chave_metrica(
+            "gerador_etapa_segundos", etapa=etapa
+        )
+    return chave
+
+
+def _registrar_etapas(
+    cronometro: Cronometro,
+    decorrido: float,
+    envio: float,
+    bytes_bloco: tuple | None = None,
+) -> None:
+    """Registra as etapas de um bloco (e o envio do anterior) de uma só vez."""
+    internas = cronometro.recolher()
+    observacoes = [
+        (_chave_etapa(etapa), segundos) for etapa, segundos in internas.items()
+    ]
+    observacoes.append(
+        (_chave_etapa("codificacao"), max(decorrido - sum(internas.values()), 0.0))
+    )
+    if envio:
+        observacoes.append((_chave_etapa("envio"), envio))
+    registro_metricas.atualizar(observacoes, [bytes_bloco] if bytes_bloco else ())
+
+
+class MiddlewareMetricas:
+    """
+    Middleware ASGI que conta as requisições em andamento e mede a duração
+    de cada uma até o último byte enviado (inclusive respostas em streaming).
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        inicio = time.perf_counter()
+        status = 500
+
+        async def enviar(mensagem):
+            nonlocal status
+            if mensagem["type"] == "http.response.start":
+                status = mensagem["status"]
+            await send(mensagem)
+
+        registro_metricas.incrementar("gerador_requisicoes_em_andamento", 1)
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            registro_metricas.incrementar("gerador_requisicoes_em_andamento", -1)
+            # Rótulo pelo padrão da rota (ex: '/jobs/{id_job}'), não pelo caminho
+            rota = getattr(scope.get("route"), "path", "desconhecida")
+            registro_metricas.incrementar(
+                "gerador_requisicoes_total",
+                metodo=scope["method"],
+                rota=rota,
+                status=str(status),
+            )
+            registro_metricas.observar(
+                "gerador_requisicao_segundos", time.perf_counter() - inicio,
+                metodo=scope["method"], rota=rota,
+            )
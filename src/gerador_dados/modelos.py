@@ -1,15 +1,28 @@
 import re # Para validar a sintaxe da Expressão Regular
-from typing import Literal, Union, Annotated
+from typing import Annotated, ClassVar, Literal
+
+import numpy as np
 
 from pydantic import (
     BaseModel,
     Field,
+    NonNegativeFloat,
+    NonNegativeInt,
     PositiveFloat,
     PositiveInt,
-    field_validator
+    field_validator,
+    model_validator
 )
 
-print("Módulo 'modelos.py' carregado.")
+from .expressoes import (
+    INTEIRO,
+    NUMERO,
+    TEXTO,
+    ErroExpressao,
+    compilar_formula,
+    ordem_topologica,
+)
+from .regex_compilado import compilar_regex
 
 class ConfigGeradorRegex(BaseModel):
     """Configuração para dados baseados em Expressão Regular (RF02)."""
@@ -41,21 +54,199 @@ class ConfigGeradorLinear(BaseModel):
     tipoGerador: Literal["linear"] = "linear"
     valorInicial: float
     incremento: float
+    # Desvio padrão de um ruído gaussiano somado à tendência (0 = sem ruído)
+    ruido: NonNegativeFloat = 0.0
+
+
+class ConfigGeradorUniforme(BaseModel):
+    """Configuração para dados de distribuição uniforme em [minimo, maximo) (RF08)."""
+    tipoGerador: Literal["uniforme"] = "uniforme"
+    minimo: float
+    maximo: float
+
+    @model_validator(mode="after")
+    def intervalo_valido(self) -> "ConfigGeradorUniforme":
+        """O intervalo não pode ser vazio (RF05)."""
+        if self.maximo <= self.minimo:
+            raise ValueError("'maximo' deve ser maior que 'minimo'.")
+        return self
+
+
+class ConfigGeradorExponencial(BaseModel):
+    """Configuração para dados de distribuição exponencial (RF08)."""
+    tipoGerador: Literal["exponencial"] = "exponencial"
+    # Taxa (lambda) > 0; a média da distribuição é 1 / taxa
+    taxa: PositiveFloat
+
+
+class ConfigGeradorLogNormal(BaseModel):
+    """
+    Configuração para dados de distribuição log-normal (RF08).
+    'media' e 'desvioPadrao' são os da normal subjacente (do logaritmo dos valores).
+    """
+    tipoGerador: Literal["lognormal"] = "lognormal"
+    media: float
+    desvioPadrao: PositiveFloat
+
+
+class ConfigGeradorPoisson(BaseModel):
+    """Configuração para contagens com distribuição de Poisson (RF08)."""
+    tipoGerador: Literal["poisson"] = "poisson"
+    # Número médio de ocorrências (lambda) > 0
+    media: PositiveFloat
+
+
+class ConfigGeradorCategorico(BaseModel):
+    """
+    Configuração para valores sorteados de uma lista de categorias, com pesos
+    opcionais (RF08).
+    """
+    tipoGerador: Literal["categorico"] = "categorico"
+    categorias: list[str] = Field(min_length=1)
+    # Pesos relativos (não precisam somar 1); sem eles, as categorias são equiprováveis
+    pesos: list[NonNegativeFloat] | None = None
+
+    @model_validator(mode="after")
+    def pesos_validos(self) -> "ConfigGeradorCategorico":
+        """Um peso por categoria, com soma positiva (RF05)."""
+        if self.pesos is not None:
+            if len(self.pesos) != len(self.categorias):
+                raise ValueError(
+                    f"'pesos' deve ter um valor por categoria "
+                    f"({len(self.pesos)} pesos para {len(self.categorias)} categorias)."
+                )
+            if sum(self.pesos) <= 0:
+                raise ValueError("A soma dos 'pesos' deve ser maior que zero.")
+        return self
+
+
+class ConfigGeradorExpressao(BaseModel):
+    """
+    Configuração para colunas derivadas de outras colunas por uma fórmula
+    (ex: 'PRECO * QTD'). As colunas são referenciadas pelo nome.
+    """
+    tipoGerador: Literal["expressao"] = "expressao"
+    formula: str
+
+    @field_validator("formula")
+    @classmethod
+    def validar_formula(cls, v: str) -> str:
+        """Valida a sintaxe e as construções permitidas da fórmula (RF05)."""
+        try:
+            compilar_formula(v)
+        except ErroExpressao as e:
+            raise ValueError(str(e))
+        return v
+
+
+class ConfigGeradorReferencia(BaseModel):
+    """
+    Chave estrangeira: sorteia valores da coluna-chave ('unico') de outra
+    tabela de um esquema relacional.
+
+    'distribuicao' define quantas linhas apontam para cada linha da tabela
+    referenciada: 'uniforme' (todas com a mesma probabilidade; o número de
+    filhos por pai fica próximo de uma Poisson) ou 'zipf' (poucos pais
+    concentram os filhos, com peso 1 / posição^expoente).
+    """
+    tipoGerador: Literal["referencia"] = "referencia"
+    tabela: str
+    coluna: str
+    distribuicao: Literal["uniforme", "zipf"] = "uniforme"
+    expoente: PositiveFloat = 1.0
 
 
 # Este tipo especial usa o campo 'tipoGerador' para decidir
-# qual modelo (Regex ou Gaussiano) deve ser usado para validar.
+# qual modelo (Regex, Gaussiano, ...) deve ser usado para validar.
 TipoGeradorConfig = Annotated[
-    Union[ConfigGeradorRegex, ConfigGeradorGaussiano, ConfigGeradorLinear],
+    ConfigGeradorRegex
+    | ConfigGeradorGaussiano
+    | ConfigGeradorLinear
+    | ConfigGeradorUniforme
+    | ConfigGeradorExponencial
+    | ConfigGeradorLogNormal
+    | ConfigGeradorPoisson
+    | ConfigGeradorCategorico
+    | ConfigGeradorExpressao
+    | ConfigGeradorReferencia,
     Field(discriminator="tipoGerador")
 ]
 
+# Geradores que produzem valores numéricos (float64 nos formatos binários)
+TIPOS_NUMERICOS = {
+    "gaussiano", "linear", "uniforme", "exponencial", "lognormal", "poisson"
+}
+
+# Geradores numéricos de valores inteiros (int64 no Arrow/Parquet)
+TIPOS_INTEIROS = {"poisson"}
+
+# Geradores que aceitam a restrição de valores distintos ('unico')
+TIPOS_UNICOS = {"regex", "linear"}
+
+# Formatos de saída suportados
+FormatoSaida = Literal["csv", "ndjson", "parquet", "arrow", "npy", "npz"]
+# Compressões do arquivo gerado
+CompressaoSaida = Literal["gzip", "zstd"]
+
+
 class ConfiguracaoColuna(BaseModel):
     """Define uma única coluna no CSV."""
     nome: str
     # 'configGerador' usa nossa Union para validar os parâmetros
     # corretos baseado no 'tipoGerador' interno.
     configGerador: TipoGeradorConfig
+    # Garante valores distintos na coluna (ex: chaves primárias)
+    unico: bool = False
+
+    @model_validator(mode="after")
+    def unico_suportado(self) -> "ConfiguracaoColuna":
+        """Apenas regex e linear aceitam 'unico' (RF05)."""
+        if self.unico and self.configGerador.tipoGerador not in TIPOS_UNICOS:
+            raise ValueError(
+                "'unico' não é suportado pelo gerador "
+                f"'{self.configGerador.tipoGerador}'."
+            )
+        return self
+
+
+class GrupoCorrelacao(BaseModel):
+    """
+    Colunas gaussianas geradas em conjunto, por uma normal multivariada.
+
+    Cada coluna mantém sua 'media' e seu 'desvioPadrao'; 'correlacao' é a
+    matriz de correlação entre elas, na ordem de 'colunas'.
+    """
+    colunas: list[str] = Field(min_length=2)
+    correlacao: list[list[float]]
+
+    @model_validator(mode="after")
+    def matriz_valida(self) -> "GrupoCorrelacao":
+        """
+        A matriz deve ser uma correlação válida: simétrica, diagonal 1 e
+        semidefinida positiva (RF05).
+        """
+        tamanho = len(self.colunas)
+        if len(set(self.colunas)) != tamanho:
+            raise ValueError(
+                "Uma coluna aparece mais de uma vez no grupo de correlação."
+            )
+        if len(self.correlacao) != tamanho or any(
+            len(linha) != tamanho for linha in self.correlacao
+        ):
+            raise ValueError(f"'correlacao' deve ser uma matriz {tamanho}x{tamanho}.")
+        matriz = np.array(self.correlacao, dtype=np.float64)
+        if not np.allclose(matriz, matriz.T) or not np.allclose(np.diag(matriz), 1.0):
+            raise ValueError(
+                "'correlacao' deve ser simétrica e ter diagonal igual a 1."
+            )
+        if np.abs(matriz).max() > 1:
+            raise ValueError("As correlações devem estar entre -1 e 1.")
+        if np.linalg.eigvalsh(matriz).min() < -1e-10:
+            raise ValueError(
+                "'correlacao' não é semidefinida positiva "
+                "(correlações inconsistentes)."
+            )
+        return self
 
 
 class ConfiguracaoCSV(BaseModel):
@@ -65,6 +256,19 @@ class ConfiguracaoCSV(BaseModel):
     colunas: list[ConfiguracaoColuna]
     delimitador: str = ","
     separadorDecimal: str = "."
+    # Casas decimais fixas para floats (None = representação mais curta e exata)
+    precisaoDecimal: int | None = Field(default=None, ge=0, le=17)
+    # Semente opcional: com ela, a mesma configuração gera sempre os mesmos dados
+    semente: NonNegativeInt | None = None
+    # Formato do arquivo gerado: texto (csv, ndjson) ou colunar/binário
+    formato: FormatoSaida = "csv"
+    # Compressão do arquivo gerado (ex: 'gzip' gera 'dados_sinteticos.csv.gz')
+    compressao: CompressaoSaida | None = None
+    # Grupos de colunas gaussianas correlacionadas
+    correlacoes: list[GrupoCorrelacao] = []
+
+    # Colunas 'referencia' só fazem sentido em tabelas de um esquema
+    aceita_referencias: ClassVar[bool] = False
 
     @field_validator("colunas")
     @classmethod
@@ -74,6 +278,275 @@ class ConfiguracaoCSV(BaseModel):
             raise ValueError("O arquivo CSV deve ter pelo menos uma coluna.")
         return v
 
+    def tipos_valores(self) -> list[str]:
+        """
+        Tipo dos valores de cada coluna ('numero', 'inteiro' ou 'texto'),
+        inclusive das colunas derivadas, inferido das fórmulas.
+        """
+        tipos = []
+        formulas = {}
+        for col in self.colunas:
+            tipo_gerador = col.configGerador.tipoGerador
+            if tipo_gerador == "expressao":
+                formulas[col.nome] = compilar_formula(col.configGerador.formula)
+                tipos.append(None)
+            elif tipo_gerador in TIPOS_INTEIROS:
+                tipos.append(INTEIRO)
+            else:
+                tipos.append(NUMERO if tipo_gerador in TIPOS_NUMERICOS else TEXTO)
+
+        por_nome = {
+            col.nome: tipo for col, tipo in zip(self.colunas, tipos) if tipo is not None
+        }
+        for nome in ordem_topologica({n: f.dependencias for n, f in formulas.items()}):
+            por_nome[nome] = formulas[nome].tipo(por_nome)
+        return [
+            tipo if tipo is not None else por_nome[col.nome]
+            for col, tipo in zip(self.colunas, tipos)
+        ]
+
+    @model_validator(mode="after")
+    def referencias_em_esquemas(self) -> "ConfiguracaoCSV":
+        """Chaves estrangeiras exigem as outras tabelas de um esquema (RF05)."""
+        if not self.aceita_referencias:
+            referencias = [
+                col.nome
+                for col in self.colunas
+                if col.configGerador.tipoGerador == "referencia"
+            ]
+            if referencias:
+                raise ValueError(
+                    "Colunas 'referencia' só podem ser usadas nas tabelas de um "
+                    f"esquema (POST /gerar-esquema): {', '.join(referencias)}."
+                )
+        return self
+
+    @model_validator(mode="after")
+    def expressoes_validas(self) -> "ConfiguracaoCSV":
+        """
+        Fórmulas referenciam colunas existentes e não ambíguas, sem
+        dependências circulares e com tipos compatíveis (RF05).
+        """
+        formulas = {
+            col.nome: compilar_formula(col.configGerador.formula)
+            for col in self.colunas if col.configGerador.tipoGerador == "expressao"
+        }
+        if not formulas:
+            return self
+        contagem: dict[str, int] = {}
+        tipos: dict[str, str] = {}
+        for col in self.colunas:
+            contagem[col.nome] = contagem.get(col.nome, 0) + 1
+            tipos[col.nome] = col.configGerador.tipoGerador
+        referenciadas = set(formulas).union(
+            *(f.dependencias for f in formulas.values())
+        )
+        for nome in sorted(referenciadas):
+            if nome not in contagem:
+                raise ValueError(f"Coluna desconhecida na fórmula: '{nome}'.")
+            if contagem[nome] > 1:
+                raise ValueError(
+                    f"Coluna referenciada por fórmula com nome repetido: '{nome}'."
+                )
+            if tipos[nome] == "referencia":
+                # O tipo dos valores depende da chave de outra tabela
+                raise ValueError(
+                    f"Fórmulas não podem usar colunas 'referencia': '{nome}'."
+                )
+        try:
+            self.tipos_valores()  # ordem topológica (ciclos) e tipos
+        except ErroExpressao as e:
+            raise ValueError(str(e))
+        return self
+
+    @model_validator(mode="after")
+    def formato_compativel_com_colunas(self) -> "ConfiguracaoCSV":
+        """Os formatos NumPy (.npy/.npz) aceitam apenas colunas numéricas (RF05)."""
+        if self.formato in ("npy", "npz"):
+            textuais = [
+                col.nome for col, tipo in zip(self.colunas, self.tipos_valores())
+                if tipo == TEXTO
+            ]
+            if textuais:
+                raise ValueError(
+                    f"O formato '{self.formato}' aceita apenas colunas numéricas; "
+                    f"colunas textuais: {', '.join(textuais)}."
+                )
+        return self
+
+    @model_validator(mode="after")
+    def correlacoes_validas(self) -> "ConfiguracaoCSV":
+        """
+        Grupos de correlação referenciam colunas gaussianas existentes, cada
+        uma em um só grupo (RF05).
+        """
+        tipos: dict[str, list[str]] = {}
+        for col in self.colunas:
+            tipos.setdefault(col.nome, []).append(col.configGerador.tipoGerador)
+        agrupadas: set[str] = set()
+        for grupo in self.correlacoes:
+            for nome in grupo.colunas:
+                if nome not in tipos:
+                    raise ValueError(f"Coluna de correlação inexistente: '{nome}'.")
+                if len(tipos[nome]) > 1:
+                    raise ValueError(
+                        f"Coluna de correlação ambígua (nome repetido): '{nome}'."
+                    )
+                if tipos[nome][0] != "gaussiano":
+                    raise ValueError(
+                        "Apenas colunas gaussianas podem ser correlacionadas: "
+                        f"'{nome}'."
+                    )
+                if nome in agrupadas:
+                    raise ValueError(
+                        f"A coluna '{nome}' está em mais de um grupo de correlação."
+                    )
+                agrupadas.add(nome)
+        return self
+
+    @model_validator(mode="after")
+    def colunas_unicas_viaveis(self) -> "ConfiguracaoCSV":
+        """
+        Colunas 'unico' precisam de pelo menos 'numLinhas' valores distintos (RF05).
+
+        Para regex, compara com o tamanho da linguagem da expressão (um limite
+        superior com alternâncias e repetições; expressões tratadas pelo rstr
+        não são verificadas). Para linear, o incremento não pode ser nulo nem
+        menor que a resolução dos valores gerados ou das casas decimais.
+        """
+        for col in self.colunas:
+            if not col.unico:
+                continue
+            gerador = col.configGerador
+            if gerador.tipoGerador == "regex":
+                programa = compilar_regex(gerador.expressao)
+                if programa is None:
+                    continue
+                tamanho = programa.tamanho_linguagem(limite=self.numLinhas)
+                if tamanho < self.numLinhas:
+                    raise ValueError(
+                        f"A coluna '{col.nome}' é única, mas a expressão "
+                        f"'{gerador.expressao}' "
+                        f"gera no máximo {tamanho} valores distintos "
+                        f"(numLinhas = {self.numLinhas})."
+                    )
+            elif gerador.tipoGerador == "linear" and gerador.ruido > 0:
+                raise ValueError(
+                    f"A coluna '{col.nome}' é única, mas tem 'ruido' "
+                    "(valores aleatórios)."
+                )
+            elif gerador.tipoGerador == "linear" and self.numLinhas > 1:
+                ultimo = (
+                    gerador.valorInicial + (self.numLinhas - 1) * gerador.incremento
+                )
+                resolucao = np.spacing(max(abs(gerador.valorInicial), abs(ultimo)))
+                if self.precisaoDecimal is not None:
+                    resolucao = max(resolucao, 10.0 ** -self.precisaoDecimal)
+                if abs(gerador.incremento) < resolucao:
+                    raise ValueError(
+                        f"A coluna '{col.nome}' é única, mas o incremento "
+                        f"{gerador.incremento} "
+                        f"gera valores repetidos (resolução {resolucao:g})."
+                    )
+        return self
+
+class ConfiguracaoTabela(ConfiguracaoCSV):
+    """
+    Uma tabela de um esquema relacional: um CSV com nome, que pode ter chaves
+    estrangeiras.
+    """
+    # Também é o nome do arquivo no zip ('<nome>.csv')
+    nome: str = Field(min_length=1, pattern=r"^[^/\\]+$")
+
+    aceita_referencias: ClassVar[bool] = True
+
+    @model_validator(mode="after")
+    def gerada_em_csv(self) -> "ConfiguracaoTabela":
+        """As tabelas saem como CSVs dentro do zip do esquema (RF05)."""
+        if self.formato != "csv" or self.compressao is not None:
+            raise ValueError(
+                f"A tabela '{self.nome}' deve usar o formato 'csv' sem 'compressao' "
+                "(o esquema é enviado como um zip de CSVs)."
+            )
+        return self
+
+
+class EsquemaRelacional(BaseModel):
+    """
+    Várias tabelas geradas juntas, em que colunas 'referencia' apontam para
+    a coluna-chave de outra tabela (ex: pedidos -> usuários).
+    """
+    tabelas: list[ConfiguracaoTabela] = Field(min_length=1)
+    # Semente do esquema: cada tabela recebe um fluxo derivado dela e do seu nome
+    # (a 'semente' de uma tabela, se definida, tem precedência)
+    semente: NonNegativeInt | None = None
+    # Compressão das entradas do zip (None = armazenadas sem compressão)
+    compressao: Literal["deflate"] | None = None
+
+    def referencias(self, tabela: ConfiguracaoTabela) -> list[ConfigGeradorReferencia]:
+        """Chaves estrangeiras de uma tabela."""
+        return [
+            col.configGerador for col in tabela.colunas
+            if col.configGerador.tipoGerador == "referencia"
+        ]
+
+    def ordem_tabelas(self) -> list[ConfiguracaoTabela]:
+        """
+        Tabelas em ordem de geração: cada uma depois das tabelas que ela
+        referencia.
+        """
+        por_nome = {tabela.nome: tabela for tabela in self.tabelas}
+        ordem = ordem_topologica(
+            {
+                tabela.nome: {
+                    referencia.tabela for referencia in self.referencias(tabela)
+                }
+                for tabela in self.tabelas
+            },
+            entidades="tabelas",
+        )
+        return [por_nome[nome] for nome in ordem]
+
+    @model_validator(mode="after")
+    def referencias_validas(self) -> "EsquemaRelacional":
+        """
+        Nomes de tabela distintos; cada referência aponta para uma coluna
+        'unico' (chave) existente de outra tabela, sem ciclos (RF05).
+        """
+        por_nome: dict[str, ConfiguracaoTabela] = {}
+        for tabela in self.tabelas:
+            if tabela.nome in por_nome:
+                raise ValueError(f"Nome de tabela repetido: '{tabela.nome}'.")
+            por_nome[tabela.nome] = tabela
+        for tabela in self.tabelas:
+            for referencia in self.referencias(tabela):
+                destino = por_nome.get(referencia.tabela)
+                if destino is None:
+                    raise ValueError(
+                        f"A tabela '{tabela.nome}' referencia a tabela inexistente "
+                        f"'{referencia.tabela}'."
+                    )
+                chaves = [
+                    col for col in destino.colunas if col.nome == referencia.coluna
+                ]
+                if len(chaves) != 1:
+                    raise ValueError(
+                        f"A tabela '{tabela.nome}' referencia a coluna inexistente "
+                        f"ou ambígua '{referencia.tabela}.{referencia.coluna}'."
+                    )
+                if not chaves[0].unico:
+                    raise ValueError(
+                        "A coluna referenciada "
+                        f"'{referencia.tabela}.{referencia.coluna}' "
+                        "deve ser uma chave ('unico': true)."
+                    )
+        try:
+            self.ordem_tabelas()
+        except ErroExpressao as e:
+            raise ValueError(str(e))
+        return self
+
+
 # --- Bloco de Teste Manual ---
 # Este código só executa quando você roda: python src/gerador_dados/modelos.py
 if __name__ == "__main__":
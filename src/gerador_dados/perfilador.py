@@ -0,0 +1,419 @@
+"""
+Perfilador de CSVs: infere uma configuração ('ConfiguracaoCSV') a partir de
+um arquivo existente, para gerar cópias sintéticas dele.
+
+O arquivo é lido uma única vez, em blocos de linhas, com memória limitada
+independentemente do seu tamanho. Para cada coluna são mantidos:
+- média e desvio padrão acumulados (Welford, combinando bloco a bloco);
+- o primeiro valor e o incremento, enquanto a coluna for uma sequência linear;
+- as contagens dos valores distintos, até 'LIMITE_CATEGORIAS' valores;
+- uma amostra uniforme dos textos (reservoir sampling), da qual sai a regex.
+
+Exemplo:
+    gerador-dados-perfil extracao.csv.gz --delimitador ';' -o config.json
+    gerador-dados config.json --linhas 1000000 -o copia.csv
+"""
+import argparse
+import csv
+import gzip
+import io
+import json
+import math
+import sys
+from collections import Counter
+from itertools import islice
+from typing import TextIO
+
+import numpy as np
+from pydantic import ValidationError
+
+from .modelos import ConfiguracaoCSV
+
+# Linhas lidas do CSV por bloco
+TAMANHO_BLOCO_PERFIL = 50_000
+
+# Textos guardados na amostra de cada coluna (usada para inferir a regex)
+TAMANHO_AMOSTRA = 1_000
+
+# Acima deste número de valores distintos, a coluna não é categórica
+LIMITE_CATEGORIAS = 100
+
+# Ocorrências médias por valor distinto para uma coluna ser categórica
+# (evita tratar como categorias os identificadores de um arquivo pequeno)
+MIN_REPETICOES = 5
+
+# Amostra mínima para que uma letra ou dígito igual em todos os textos seja
+# mantido literalmente (ex: o prefixo 'USER_'); em amostras menores, ele
+# pode ser igual só por acaso e vira uma classe ('[A-Z]', '\d')
+MIN_AMOSTRA_LITERAL = 30
+
+# Tolerância relativa para considerar constante o incremento de uma sequência
+TOLERANCIA_LINEAR = 1e-6
+
+
+def _tipo_caractere(caractere: str) -> str:
+    """Classe de um caractere na inferência da regex: 'd', 'A', 'a' ou ele mesmo."""
+    if caractere.isascii():
+        if caractere.isdigit():
+            return "d"
+        if caractere.isupper():
+            return "A"
+        if caractere.islower():
+            return "a"
+    return caractere
+
+
+_FAIXAS = {"A": "A-Z", "a": "a-z", "d": "0-9"}
+
+
+def _literal(caractere: str, em_classe: bool = False) -> str:
+    """Escapa um caractere apenas se ele for especial (fora ou dentro de '[...]')."""
+    especiais = "\\]^-[" if em_classe else ".^$*+?{}[]\\|()"
+    return "\\" + caractere if caractere in especiais else caractere
+
+
+def _classe_regex(tipos: set[str]) -> str:
+    """Menor classe de caracteres que cobre os tipos observados em uma posição."""
+    if len(tipos) == 1:
+        (tipo,) = tipos
+        if tipo == "d":
+            return r"\d"
+        if tipo not in _FAIXAS:
+            return _literal(tipo)
+    faixas = [_FAIXAS[tipo] for tipo in "Aad" if tipo in tipos]
+    literais = [
+        _literal(tipo, em_classe=True) for tipo in sorted(tipos) if tipo not in _FAIXAS
+    ]
+    return "[" + "".join(faixas + literais) + "]"
+
+
+def _repeticao(minimo: int, maximo: int) -> str:
+    if minimo == maximo:
+        return "" if minimo == 1 else f"{{{minimo}}}"
+    return f"{{{minimo},{maximo}}}"
+
+
+def _juntar_repeticoes(tokens: list[tuple[str, int, int]]) -> str:
+    """
+    Junta tokens (classe, mínimo, máximo) consecutivos iguais: '\\d\\d\\d'
+    vira '\\d{3}'.
+    """
+    partes: list[list] = []
+    for classe, minimo, maximo in tokens:
+        if partes and partes[-1][0] == classe:
+            partes[-1][1] += minimo
+            partes[-1][2] += maximo
+        else:
+            partes.append([classe, minimo, maximo])
+    return "".join(
+        classe + _repeticao(minimo, maximo) for classe, minimo, maximo in partes
+    )
+
+
+def _segmentos(texto: str) -> list[tuple[str, int]]:
+    """Divide o texto em sequências de caracteres do mesmo tipo: [(tipo, tamanho)]."""
+    segmentos: list[tuple[str, int]] = []
+    for caractere in texto:
+        tipo = _tipo_caractere(caractere)
+        if segmentos and segmentos[-1][0] == tipo:
+            segmentos[-1] = (tipo, segmentos[-1][1] + 1)
+        else:
+            segmentos.append((tipo, 1))
+    return segmentos
+
+
+def inferir_regex(
+    amostra: list[str], comprimento_minimo: int, comprimento_maximo: int
+) -> str:
+    """
+    Infere uma regex que gera textos parecidos com os da amostra.
+
+    - Mesmo comprimento: uma classe por posição, com os caracteres fixos
+      mantidos literalmente (ex: 'USER_[A-Z0-9]{8}', '\\d{3}\\.\\d{3}-\\d{2}').
+    - Mesma sequência de tipos de caractere com tamanhos variáveis: uma
+      classe por sequência, com o intervalo de tamanhos (ex: '[A-Z][a-z]{3,9}').
+    - Caso contrário: o alfabeto observado, com os comprimentos mínimo e
+      máximo do arquivo inteiro.
+    """
+    if not amostra:
+        return ""
+    comprimentos = {len(texto) for texto in amostra}
+    if len(comprimentos) == 1:
+        tokens = []
+        for caracteres in map(set, zip(*amostra)):
+            tipos = set(map(_tipo_caractere, caracteres))
+            fixo = len(caracteres) == 1 and (
+                len(amostra) >= MIN_AMOSTRA_LITERAL or next(iter(tipos)) not in _FAIXAS
+            )
+            classe = _literal(caracteres.pop()) if fixo else _classe_regex(tipos)
+            tokens.append((classe, 1, 1))
+        return _juntar_repeticoes(tokens)
+
+    segmentos = [_segmentos(texto) for texto in amostra]
+    estrutura = [tipo for tipo, _ in segmentos[0]]
+    if all([tipo for tipo, _ in s] == estrutura for s in segmentos):
+        por_segmento = zip(*[[n for _, n in s] for s in segmentos])
+        tokens = [
+            (_classe_regex({tipo}), min(tamanhos), max(tamanhos))
+            for tipo, tamanhos in zip(estrutura, por_segmento)
+        ]
+        return _juntar_repeticoes(tokens)
+
+    tipos = set().union(*(map(_tipo_caractere, texto) for texto in amostra))
+    return _classe_regex(tipos) + _repeticao(comprimento_minimo, comprimento_maximo)
+
+
+class PerfilColuna:
+    """Estatísticas de uma coluna, atualizadas bloco a bloco com memória limitada."""
+    def __init__(
+        self,
+        nome: str,
+        rng: np.random.Generator,
+        tamanho_amostra: int = TAMANHO_AMOSTRA,
+    ):
+        self.nome = nome
+        self.rng = rng
+        self.tamanho_amostra = tamanho_amostra
+        self.contagem = 0
+        self.vazios = 0
+        # Textos: amostra uniforme (reservoir sampling) e comprimentos
+        self.amostra: list[str] = []
+        self.comprimento_minimo = math.inf
+        self.comprimento_maximo = 0
+        # Contagem por valor distinto; None quando passa de LIMITE_CATEGORIAS
+        self.categorias: Counter[str] | None = Counter()
+        # Números: média e soma dos quadrados dos desvios (Welford)
+        self.numerica = True
+        self.media = 0.0
+        self.m2 = 0.0
+        # Sequência linear: primeiro e último valores e o incremento entre eles
+        self.linear = True
+        self.primeiro: float | None = None
+        self.ultimo: float | None = None
+        self.incremento: float | None = None
+
+    def atualizar(self, valores: list[str], separadorDecimal: str = ".") -> None:
+        """Acrescenta os valores (não vazios) de um bloco de linhas."""
+        preenchidos = valores
+        if "" in valores:
+            preenchidos = [valor for valor in valores if valor != ""]
+        self.vazios += len(valores) - len(preenchidos)
+        if not preenchidos:
+            return
+        self._amostrar(preenchidos)
+        comprimentos = list(map(len, preenchidos))
+        self.comprimento_minimo = min(self.comprimento_minimo, min(comprimentos))
+        self.comprimento_maximo = max(self.comprimento_maximo, max(comprimentos))
+        if self.categorias is not None:
+            self.categorias.update(preenchidos)
+            if len(self.categorias) > LIMITE_CATEGORIAS:
+                self.categorias = None
+        if self.numerica:
+            self._atualizar_numeros(preenchidos, separadorDecimal)
+        self.contagem += len(preenchidos)
+
+    def _amostrar(self, valores: list[str]) -> None:
+        """
+        Reservoir sampling (algoritmo R), com os sorteios do bloco vetorizados:
+        o i-ésimo valor visto substitui um item da amostra com probabilidade k/i.
+        """
+        faltam = self.tamanho_amostra - len(self.amostra)
+        self.amostra.extend(valores[:faltam])
+        if len(valores) <= faltam:
+            return
+        # Posição (a partir de 1) de cada valor restante entre todos os já vistos
+        posicoes = np.arange(
+            self.contagem + faltam + 1, self.contagem + len(valores) + 1
+        )
+        sorteios = self.rng.integers(0, posicoes)
+        for i in np.flatnonzero(sorteios < self.tamanho_amostra).tolist():
+            self.amostra[sorteios[i]] = valores[faltam + i]
+
+    def _atualizar_numeros(self, valores: list[str], separadorDecimal: str) -> None:
+        if separadorDecimal != ".":
+            valores = [valor.replace(separadorDecimal, ".") for valor in valores]
+        try:
+            numeros = np.array(valores, dtype=np.float64)
+        except ValueError:
+            self.numerica = self.linear = False
+            return
+        if not np.isfinite(numeros).all():
+            self.numerica = self.linear = False
+            return
+
+        # Combina a média e o M2 do bloco com os acumulados (Chan et al.)
+        n_bloco = len(numeros)
+        media_bloco = float(numeros.mean())
+        m2_bloco = float(((numeros - media_bloco) ** 2).sum())
+        total = self.contagem + n_bloco
+        delta = media_bloco - self.media
+        self.media += delta * n_bloco / total
+        self.m2 += m2_bloco + delta ** 2 * self.contagem * n_bloco / total
+
+        if self.linear:
+            sequencia = numeros
+            if self.ultimo is not None:
+                sequencia = np.concatenate(([self.ultimo], numeros))
+            diferencas = np.diff(sequencia)
+            if self.incremento is None and len(diferencas):
+                self.incremento = float(diferencas[0])
+            if len(diferencas):
+                tolerancia = TOLERANCIA_LINEAR * max(abs(self.incremento), 1e-12)
+                self.linear = bool(
+                    np.all(np.abs(diferencas - self.incremento) <= tolerancia)
+                )
+        if self.primeiro is None:
+            self.primeiro = float(numeros[0])
+        self.ultimo = float(numeros[-1])
+
+    @property
+    def desvio_padrao(self) -> float:
+        """Desvio padrão amostral dos valores numéricos."""
+        return math.sqrt(self.m2 / (self.contagem - 1)) if self.contagem > 1 else 0.0
+
+    def inferir(self) -> dict:
+        """Configuração do gerador ('configGerador') que melhor descreve a coluna."""
+        if self.contagem == 0:
+            return {"tipoGerador": "categorico", "categorias": [""]}
+        if self.numerica and self.linear and self.contagem > 2 and self.incremento:
+            return {
+                "tipoGerador": "linear",
+                "valorInicial": self.primeiro,
+                "incremento": self.incremento,
+            }
+        if self.categorias is not None and (
+            self.contagem >= MIN_REPETICOES * len(self.categorias)
+            or (self.numerica and self.desvio_padrao == 0)
+        ):
+            frequentes = self.categorias.most_common()
+            return {
+                "tipoGerador": "categorico",
+                "categorias": [valor for valor, _ in frequentes],
+                "pesos": [contagem for _, contagem in frequentes],
+            }
+        if self.numerica and self.desvio_padrao > 0:
+            return {
+                "tipoGerador": "gaussiano",
+                "media": self.media,
+                "desvioPadrao": self.desvio_padrao,
+            }
+        return {
+            "tipoGerador": "regex",
+            "expressao": inferir_regex(
+                self.amostra, int(self.comprimento_minimo), self.comprimento_maximo
+            ),
+        }
+
+
+def perfilar_csv(
+    arquivo: TextIO,
+    delimitador: str = ",",
+    separadorDecimal: str = ".",
+    tamanho_bloco: int = TAMANHO_BLOCO_PERFIL,
+    tamanho_amostra: int = TAMANHO_AMOSTRA,
+    semente: int | None = None,
+) -> ConfiguracaoCSV:
+    """
+    Lê o CSV (com cabeçalho) em uma única passada e infere a configuração
+    de cada coluna. 'numLinhas' é o número de linhas de dados do arquivo.
+
+    A memória usada depende de 'tamanho_bloco', 'tamanho_amostra' e do
+    número de colunas, e não do tamanho do arquivo. 'semente' torna a
+    amostragem (e portanto as regex inferidas) reprodutível.
+    """
+    leitor = csv.reader(arquivo, delimiter=delimitador)
+    nomes = next(leitor, None)
+    if not nomes:
+        raise ValueError("O CSV está vazio (é preciso uma linha de cabeçalho).")
+    rng = np.random.default_rng(semente)
+    perfis = [PerfilColuna(nome, rng, tamanho_amostra) for nome in nomes]
+
+    num_linhas = 0
+    while linhas := list(islice(leitor, tamanho_bloco)):
+        if set(map(len, linhas)) != {len(nomes)}:
+            numero, linha = next(
+                (numero, linha)
+                for numero, linha in enumerate(linhas, start=num_linhas + 2)
+                if len(linha) != len(nomes)
+            )
+            raise ValueError(
+                f"A linha {numero} tem {len(linha)} campos; "
+                f"o cabeçalho tem {len(nomes)}."
+            )
+        for perfil, valores in zip(perfis, zip(*linhas)):
+            perfil.atualizar(list(valores), separadorDecimal)
+        num_linhas += len(linhas)
+
+    if num_linhas == 0:
+        raise ValueError("O CSV não tem linhas de dados.")
+    return ConfiguracaoCSV.model_validate({
+        "numLinhas": num_linhas,
+        "colunas": [{"nome": p.nome, "configGerador": p.inferir()} for p in perfis],
+        "delimitador": delimitador,
+        "separadorDecimal": separadorDecimal,
+    })
+
+
+def _abrir(caminho: str) -> TextIO:
+    """
+    Abre o CSV como texto UTF-8 ('-' é o stdin; '.gz' é descomprimido em
+    streaming).
+    """
+    if caminho == "-":
+        return io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8", newline="")
+    if caminho.endswith(".gz"):
+        return gzip.open(caminho, "rt", encoding="utf-8", newline="")
+    return open(caminho, encoding="utf-8", newline="")
+
+
+def _criar_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="gerador-dados-perfil",
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        "entrada", help="CSV de entrada, com cabeçalho ('-' para stdin; aceita .gz)"
+    )
+    parser.add_argument(
+        "-o", "--saida", default="-", help="JSON de configuração ('-' para stdout)"
+    )
+    parser.add_argument("--delimitador", default=",")
+    parser.add_argument("--separador-decimal", default=".")
+    parser.add_argument("--tamanho-amostra", type=int, default=TAMANHO_AMOSTRA)
+    parser.add_argument("--semente", type=int, help="semente da amostragem")
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = _criar_parser()
+    args = parser.parse_args(argv)
+    if args.tamanho_amostra <= 0:
+        parser.error("--tamanho-amostra deve ser maior que zero.")
+    try:
+        with _abrir(args.entrada) as arquivo:
+            config = perfilar_csv(
+                arquivo, args.delimitador, args.separador_decimal,
+                tamanho_amostra=args.tamanho_amostra, semente=args.semente,
+            )
+    except (OSError, UnicodeDecodeError, csv.Error) as e:
+        parser.exit(1, f"erro: não foi possível ler o CSV: {e}\n")
+    except (ValueError, ValidationError) as e:
+        parser.exit(1, f"erro: {e}\n")
+
+    texto = json.dumps(
+        config.model_dump(mode="json", exclude_unset=True), indent=2, ensure_ascii=False
+    )
+    if args.saida == "-":
+        print(texto)
+    else:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            f.write(texto + "\n")
+    print(
+        f"{config.numLinhas:,} linhas, {len(config.colunas)} colunas", file=sys.stderr
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
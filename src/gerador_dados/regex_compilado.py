@@ -0,0 +1,447 @@
+import functools
+
+# Mesmo parser usado pelo 'rstr' e pelo próprio módulo 're' (Python 3.11+)
+import re._parser as sre_parse
+import string
+from abc import ABC, abstractmethod
+from collections.abc import Iterable
+
+import numpy as np
+
+# Limite superior de repetições para '*', '+' e '{n,}'.
+# É o mesmo limite usado pelo rstr (STAR_PLUS_LIMIT).
+LIMITE_REPETICAO = 100
+
+# Alfabetos equivalentes aos usados pelo rstr para cada construção
+_IMPRIMIVEIS = string.printable
+_PALAVRA = string.ascii_letters + string.digits + "_"
+_CATEGORIAS = {
+    sre_parse.CATEGORY_DIGIT: string.digits,
+    sre_parse.CATEGORY_NOT_DIGIT: string.ascii_letters + string.punctuation,
+    sre_parse.CATEGORY_SPACE: string.whitespace,
+    sre_parse.CATEGORY_NOT_SPACE: string.printable.strip(),
+    sre_parse.CATEGORY_WORD: _PALAVRA,
+    sre_parse.CATEGORY_NOT_WORD: "".join(sorted(set(_IMPRIMIVEIS) - set(_PALAVRA))),
+}
+
+
+class PadraoNaoSuportado(ValueError):
+    """
+    A regex usa uma construção que o plano compilado não cobre
+    (ex: referência a grupo).
+    """
+
+
+def _normalizar_alfabeto(caracteres) -> str:
+    """Remove repetições e ordena, garantindo sorteio uniforme e determinístico."""
+    alfabeto = "".join(sorted(set(caracteres)))
+    if not alfabeto:
+        raise PadraoNaoSuportado("Classe de caracteres vazia.")
+    if "\x00" in alfabeto:
+        # Arrays de texto do NumPy descartam '\x00' no fim das strings
+        raise PadraoNaoSuportado("Caractere nulo não é suportado.")
+    return alfabeto
+
+
+def _fatia_ou_lista(posicoes: list[int]) -> slice | list[int]:
+    """Converte posições contíguas em uma fatia."""
+    if posicoes == list(range(posicoes[0], posicoes[-1] + 1)):
+        return slice(posicoes[0], posicoes[-1] + 1)
+    return posicoes
+
+
+# --- Nós do plano de geração ---
+# Cada nó gera um lote inteiro de uma vez, como um array NumPy de texto (dtype 'U').
+
+class _No(ABC):
+    @abstractmethod
+    def gerar_lote(self, n: int, rng: np.random.Generator) -> np.ndarray:
+        """Gera 'n' strings para este trecho da expressão."""
+        pass
+
+    @abstractmethod
+    def tamanho_linguagem(self, limite: int) -> int:
+        """
+        Número de strings distintas que o trecho pode gerar (limite superior),
+        saturado em 'limite': a contagem para assim que o alcança.
+        """
+        pass
+
+
+class _Posicoes(_No):
+    """
+    Trecho de comprimento fixo: uma sequência de posições com um caractere cada.
+
+    Cada posição tem seu alfabeto (um literal é um alfabeto de 1 caractere).
+    Posições com o mesmo alfabeto são sorteadas juntas, em uma matriz de índices.
+    """
+    def __init__(self, alfabetos: list[str]):
+        self.alfabetos = alfabetos
+        posicoes_por_alfabeto: dict[str, list[int]] = {}
+        for posicao, alfabeto in enumerate(alfabetos):
+            if len(alfabeto) > 1:
+                posicoes_por_alfabeto.setdefault(alfabeto, []).append(posicao)
+        # Todos os literais são escritos de uma vez, a partir de uma linha-modelo
+        literais = [
+            posicao for posicao, alfabeto in enumerate(alfabetos) if len(alfabeto) == 1
+        ]
+        self._literais = _fatia_ou_lista(literais) if literais else None
+        self._modelo = np.array(
+            [alfabetos[posicao] for posicao in literais], dtype="U1"
+        )
+        # Tabelas de consulta (índice sorteado -> caractere) pré-computadas.
+        # Posições contíguas viram uma fatia (indexação simples, sem cópia de índices).
+        self._grupos = [
+            (
+                np.array(list(alfabeto), dtype="U1"),
+                len(posicoes),
+                _fatia_ou_lista(posicoes),
+            )
+            for alfabeto, posicoes in posicoes_por_alfabeto.items()
+        ]
+        # Caminho de bytes: com alfabetos só ASCII, cada caractere é um uint8
+        # e a matriz (n, comprimento) é vista como n strings de bytes ('S')
+        self.ascii = all(alfabeto.isascii() for alfabeto in alfabetos)
+        if self.ascii:
+            self._modelo_bytes = self._modelo.astype("S1").view(np.uint8)
+            self._grupos_bytes = [
+                (tabela.astype("S1").view(np.uint8), quantidade, posicoes)
+                for tabela, quantidade, posicoes in self._grupos
+            ]
+
+    def gerar_matriz(self, n: int, rng: np.random.Generator) -> np.ndarray:
+        """Gera uma matriz (n, comprimento) com um caractere por célula."""
+        matriz = np.empty((n, len(self.alfabetos)), dtype="U1")
+        if self._literais is not None:
+            matriz[:, self._literais] = self._modelo
+        for tabela, quantidade, posicoes in self._grupos:
+            indices = rng.integers(0, len(tabela), size=(n, quantidade))
+            matriz[:, posicoes] = tabela[indices]
+        return matriz
+
+    def gerar_bytes(self, n: int, rng: np.random.Generator) -> np.ndarray:
+        """
+        Gera 'n' strings ASCII como um array de bytes de largura fixa ('S'),
+        a partir de uma matriz uint8 (um byte por caractere, sem objetos
+        Python por string). Sorteia os mesmos índices que 'gerar_matriz'.
+        """
+        comprimento = len(self.alfabetos)
+        matriz = np.empty((n, comprimento), dtype=np.uint8)
+        if self._literais is not None:
+            matriz[:, self._literais] = self._modelo_bytes
+        for tabela, quantidade, posicoes in self._grupos_bytes:
+            indices = rng.integers(0, len(tabela), size=(n, quantidade))
+            matriz[:, posicoes] = tabela[indices]
+        return matriz.view(f"S{comprimento}").reshape(n)
+
+    def tamanho_linguagem(self, limite: int) -> int:
+        return _produto_saturado((len(alfabeto) for alfabeto in self.alfabetos), limite)
+
+    def gerar_lote(self, n: int, rng: np.random.Generator) -> np.ndarray:
+        matriz = self.gerar_matriz(n, rng)
+        # Reinterpreta cada linha da matriz como uma única string
+        return matriz.view(f"U{len(self.alfabetos)}").reshape(n)
+
+
+def _produto_saturado(fatores: Iterable[int], limite: int) -> int:
+    """Produto dos fatores, saturado em 'limite' (0 se algum fator for 0)."""
+    produto = 1
+    for fator in fatores:
+        if fator == 0:
+            return 0
+        produto = min(produto * fator, limite)
+    return produto
+
+
+class _Sequencia(_No):
+    """Concatenação de trechos de comprimento variável."""
+    def __init__(self, nos: list[_No]):
+        self.nos = nos
+
+    def tamanho_linguagem(self, limite: int) -> int:
+        return _produto_saturado(
+            (no.tamanho_linguagem(limite) for no in self.nos), limite
+        )
+
+    def gerar_lote(self, n: int, rng: np.random.Generator) -> np.ndarray:
+        resultado = np.zeros(n, dtype="U1")
+        for no in self.nos:
+            resultado = np.strings.add(resultado, no.gerar_lote(n, rng))
+        return resultado
+
+
+class _Repeticao(_No):
+    """Repetição com número de vezes sorteado entre 'minimo' e 'maximo'."""
+    def __init__(self, no: _No, minimo: int, maximo: int):
+        self.no = no
+        self.minimo = minimo
+        self.maximo = maximo
+
+    def tamanho_linguagem(self, limite: int) -> int:
+        tamanho = self.no.tamanho_linguagem(limite)
+        if tamanho <= 1:
+            return min(tamanho * (self.maximo - self.minimo + 1), limite)
+        potencia = 1
+        for _ in range(self.minimo):
+            potencia *= tamanho
+            if potencia >= limite:
+                return limite
+        total = 0
+        for _ in range(self.minimo, self.maximo + 1):
+            total += potencia
+            if total >= limite:
+                return limite
+            potencia *= tamanho
+        return total
+
+    def gerar_lote(self, n: int, rng: np.random.Generator) -> np.ndarray:
+        vezes = rng.integers(self.minimo, self.maximo + 1, size=n)
+
+        if isinstance(self.no, _Posicoes):
+            # Caminho rápido: sorteia todas as repetições possíveis em uma
+            # matriz e anula ('') as que excedem o número sorteado por linha.
+            # O dtype 'U' descarta os caracteres nulos do fim de cada string.
+            largura = len(self.no.alfabetos)
+            matriz = self.no.gerar_matriz(n * self.maximo, rng)
+            matriz = matriz.reshape(n, self.maximo, largura)
+            matriz[np.arange(self.maximo) >= vezes[:, None]] = ""
+            return matriz.reshape(n, self.maximo * largura).view(
+                f"U{self.maximo * largura}"
+            ).reshape(n)
+
+        resultado = np.zeros(n, dtype="U1")
+        for repeticao in range(self.maximo):
+            ativas = vezes > repeticao
+            parte = self.no.gerar_lote(int(ativas.sum()), rng)
+            completa = np.zeros(n, dtype=parte.dtype)
+            completa[ativas] = parte
+            resultado = np.strings.add(resultado, completa)
+        return resultado
+
+
+class _Alternancia(_No):
+    """Alternância 'a|b|c': sorteia uma opção por linha."""
+    def __init__(self, opcoes: list[_No]):
+        self.opcoes = opcoes
+
+    def tamanho_linguagem(self, limite: int) -> int:
+        total = 0
+        for opcao in self.opcoes:
+            total += opcao.tamanho_linguagem(limite)
+            if total >= limite:
+                return limite
+        return total
+
+    def gerar_lote(self, n: int, rng: np.random.Generator) -> np.ndarray:
+        escolhas = rng.integers(0, len(self.opcoes), size=n)
+        partes = []
+        for indice, opcao in enumerate(self.opcoes):
+            selecionadas = escolhas == indice
+            partes.append(
+                (selecionadas, opcao.gerar_lote(int(selecionadas.sum()), rng))
+            )
+
+        dtype = np.result_type(*(parte.dtype for _, parte in partes))
+        resultado = np.zeros(n, dtype=dtype)
+        for selecionadas, parte in partes:
+            resultado[selecionadas] = parte
+        return resultado
+
+
+# --- Compilação (parse -> plano) ---
+
+def _alfabeto_in(itens) -> str:
+    """Resolve uma classe '[...]' em seu alfabeto de caracteres."""
+    candidatos = []
+    negada = False
+    for opcode, valor in itens:
+        if opcode == sre_parse.NEGATE:
+            negada = True
+        elif opcode == sre_parse.LITERAL:
+            candidatos.append(chr(valor))
+        elif opcode == sre_parse.RANGE:
+            candidatos.extend(chr(c) for c in range(valor[0], valor[1] + 1))
+        elif opcode == sre_parse.CATEGORY:
+            candidatos.extend(_CATEGORIAS[valor])
+        else:
+            raise PadraoNaoSuportado(f"Construção não suportada em classe: {opcode}")
+    if negada:
+        return _normalizar_alfabeto(set(_IMPRIMIVEIS) - set(candidatos))
+    return _normalizar_alfabeto(candidatos)
+
+
+def _alfabeto_unitario(opcode, valor) -> str | None:
+    """Retorna o alfabeto se o item gera exatamente um caractere, senão None."""
+    if opcode == sre_parse.LITERAL:
+        return _normalizar_alfabeto(chr(valor))
+    if opcode == sre_parse.NOT_LITERAL:
+        return _normalizar_alfabeto(_IMPRIMIVEIS.replace(chr(valor), ""))
+    if opcode == sre_parse.ANY:
+        return _normalizar_alfabeto(_IMPRIMIVEIS.replace("\n", ""))
+    if opcode == sre_parse.IN:
+        return _alfabeto_in(valor)
+    if opcode == sre_parse.CATEGORY:
+        return _normalizar_alfabeto(_CATEGORIAS[valor])
+    return None
+
+
+def _compilar(itens) -> _No:
+    """Compila uma lista de itens do 'sre_parse' em um nó do plano."""
+    nos: list[_No] = []
+    posicoes: list[str] = []
+
+    def adicionar(no: _No):
+        # Trechos de comprimento fixo consecutivos são unidos em um só
+        if isinstance(no, _Posicoes):
+            posicoes.extend(no.alfabetos)
+            return
+        if posicoes:
+            nos.append(_Posicoes(list(posicoes)))
+            posicoes.clear()
+        nos.append(no)
+
+    for opcode, valor in itens:
+        alfabeto = _alfabeto_unitario(opcode, valor)
+        if alfabeto is not None:
+            posicoes.append(alfabeto)
+        elif opcode == sre_parse.AT:
+            # Âncoras (^, $, \b) não geram caracteres
+            continue
+        elif opcode in (sre_parse.SUBPATTERN, sre_parse.ATOMIC_GROUP):
+            # Grupos são transparentes (não há referências a grupos no plano)
+            subpadrao = valor[-1] if opcode == sre_parse.SUBPATTERN else valor
+            adicionar(_compilar(subpadrao))
+        elif opcode == sre_parse.BRANCH:
+            adicionar(_Alternancia([_compilar(opcao) for opcao in valor[1]]))
+        elif opcode in (
+            sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT, sre_parse.POSSESSIVE_REPEAT
+        ):
+            minimo, maximo, subpadrao = valor
+            maximo = max(minimo, min(maximo, LIMITE_REPETICAO))
+            interno = _compilar(subpadrao)
+            if minimo == maximo and isinstance(interno, _Posicoes):
+                # Repetição fixa de trecho fixo: apenas mais posições
+                adicionar(_Posicoes(interno.alfabetos * minimo))
+            elif maximo > 0:
+                adicionar(_Repeticao(interno, minimo, maximo))
+        else:
+            raise PadraoNaoSuportado(f"Construção de regex não suportada: {opcode}")
+
+    if posicoes:
+        nos.append(_Posicoes(list(posicoes)))
+    if len(nos) == 1:
+        return nos[0]
+    return _Sequencia(nos)
+
+
+class ProgramaRegex:
+    """
+    Plano de geração compilado a partir de uma Expressão Regular (RF02).
+
+    A expressão é analisada uma única vez; a geração apenas percorre o plano,
+    sorteando os índices de cada classe de caracteres em arrays NumPy.
+    O plano não guarda estado, então pode ser compartilhado entre geradores.
+    """
+    def __init__(self, expressao: str):
+        self.expressao = expressao
+        self._raiz = _compilar(sre_parse.parse(expressao))
+
+    def gerar_lote(self, n: int, rng: np.random.Generator) -> list[str]:
+        """Gera 'n' strings que correspondem à expressão."""
+        return self._raiz.gerar_lote(n, rng).tolist()
+
+    @property
+    def comprimento_fixo(self) -> bool:
+        """Se todas as strings têm o mesmo comprimento (linguagem enumerável)."""
+        return isinstance(self._raiz, _Posicoes)
+
+    @property
+    def bytes_fixos(self) -> bool:
+        """Se a expressão tem comprimento fixo e só caracteres ASCII ('gerar_bytes')."""
+        return self.comprimento_fixo and self._raiz.ascii
+
+    def gerar_bytes(self, n: int, rng: np.random.Generator) -> np.ndarray:
+        """
+        Gera 'n' strings como um array de bytes de largura fixa (dtype 'S').
+        Requer 'bytes_fixos'; os valores são os mesmos de 'gerar_lote'.
+        """
+        if not self.bytes_fixos:
+            raise PadraoNaoSuportado(
+                "Apenas expressões ASCII de comprimento fixo geram bytes."
+            )
+        return self._raiz.gerar_bytes(n, rng)
+
+    def tamanho_linguagem(self, limite: int) -> int:
+        """
+        Número de strings distintas que a expressão pode gerar, até 'limite'.
+
+        É exato para expressões de comprimento fixo; com alternâncias e
+        repetições é um limite superior (caminhos diferentes podem gerar a
+        mesma string, ex: 'a|a'). A contagem para em 'limite': repetições
+        aninhadas como '((\\w*)*)*' teriam linguagens astronômicas.
+        """
+        return self._raiz.tamanho_linguagem(limite)
+
+
+class EnumeracaoRegex:
+    """
+    Bijeção entre índices e as strings de uma expressão de comprimento fixo.
+
+    O índice é escrito em base mista, um dígito por posição variável (da
+    direita para a esquerda), e cada dígito escolhe o caractere do alfabeto
+    da posição. Se a linguagem passa de 'limite' strings (ex: UUID), apenas
+    as posições da direita que cabem no limite são enumeradas e as demais
+    são sorteadas: índices distintos continuam gerando strings distintas.
+    """
+    def __init__(self, programa: ProgramaRegex, limite: int = 1 << 62):
+        if not programa.comprimento_fixo:
+            raise PadraoNaoSuportado(
+                "Apenas expressões de comprimento fixo são enumeráveis."
+            )
+        self._posicoes: _Posicoes = programa._raiz
+        alfabetos = self._posicoes.alfabetos
+        self.tamanho = 1
+        self._enumeradas: list[tuple[int, np.ndarray]] = []
+        for posicao in reversed(range(len(alfabetos))):
+            base = len(alfabetos[posicao])
+            if base == 1:
+                continue
+            if self.tamanho * base > limite:
+                break
+            self.tamanho *= base
+            self._enumeradas.append(
+                (posicao, np.array(list(alfabetos[posicao]), dtype="U1"))
+            )
+        # Há posições variáveis fora da enumeração (sorteadas a cada lote)?
+        variaveis = sum(len(alfabeto) > 1 for alfabeto in alfabetos)
+        self._sorteia_restantes = len(self._enumeradas) < variaveis
+
+    def gerar_lote(self, indices: np.ndarray, rng: np.random.Generator) -> list[str]:
+        """Gera a string de cada índice (em [0, tamanho))."""
+        n = len(indices)
+        if self._sorteia_restantes:
+            matriz = self._posicoes.gerar_matriz(n, rng)
+        else:
+            matriz = np.empty((n, len(self._posicoes.alfabetos)), dtype="U1")
+            if self._posicoes._literais is not None:
+                matriz[:, self._posicoes._literais] = self._posicoes._modelo
+        restante = np.asarray(indices, dtype=np.uint64)
+        for posicao, tabela in self._enumeradas:
+            base = np.uint64(len(tabela))
+            matriz[:, posicao] = tabela[restante % base]
+            restante = restante // base
+        return matriz.view(f"U{len(self._posicoes.alfabetos)}").reshape(n).tolist()
+
+
+@functools.lru_cache(maxsize=1024)
+def compilar_regex(expressao: str) -> ProgramaRegex | None:
+    """
+    Compila a expressão uma única vez por processo e reaproveita o plano
+    entre requisições (o plano não guarda estado).
+
+    Retorna None se a expressão usa construções não suportadas.
+    """
+    try:
+        return ProgramaRegex(expressao)
+    except PadraoNaoSuportado:
+        return None
@@ -0,0 +1,136 @@
+"""
+Geração de esquemas relacionais: várias tabelas em que colunas
+'referencia' (chaves estrangeiras) apontam para a chave de outra tabela.
+
+As tabelas são geradas em ordem topológica (cada uma depois das que ela
+referencia) e enviadas como um zip de CSVs, em streaming. As chaves de
+uma tabela referenciada ficam em um 'IndiceChaves' enquanto alguma tabela
+seguinte ainda precisar delas, e as chaves estrangeiras de cada lote são
+sorteadas de uma vez a partir dele.
+"""
+import hashlib
+import zipfile
+from collections.abc import Iterator
+
+import numpy as np
+
+from .colunar import IndiceChaves, compactar_coluna
+from .formatos import _BufferDrenavel
+from .metricas import Cronometro, registro_metricas
+from .modelos import ConfiguracaoTabela, EsquemaRelacional
+from .servicos import TAMANHO_LOTE_PADRAO, SistemaGerador
+from .utils_csv import gerar_csv_em_blocos
+
+
+def _semente_tabela(
+    tabela: ConfiguracaoTabela, raiz: np.random.SeedSequence
+) -> np.random.SeedSequence:
+    """
+    Semente de uma tabela: a sua própria 'semente', se definida, ou um
+    fluxo derivado da semente do esquema e do nome da tabela (incluir ou
+    reordenar tabelas não altera as demais).
+    """
+    if tabela.semente is not None:
+        return np.random.SeedSequence(tabela.semente)
+    resumo = hashlib.blake2b(tabela.nome.encode("utf-8"), digest_size=8).digest()
+    return np.random.SeedSequence(
+        raiz.entropy, spawn_key=(int.from_bytes(resumo, "little"),)
+    )
+
+
+def _indice_linear(tabela: ConfiguracaoTabela, coluna: str) -> IndiceChaves | None:
+    """Índice aritmético para chaves lineares (sem ruído): nada é guardado."""
+    for col in tabela.colunas:
+        gerador = col.configGerador
+        if col.nome == coluna and gerador.tipoGerador == "linear" and not gerador.ruido:
+            return IndiceChaves.linear(
+                gerador.valorInicial, gerador.incremento, tabela.numLinhas
+            )
+    return None
+
+
+class GeradorEsquema:
+    """
+    Gera as tabelas de um 'EsquemaRelacional', uma de cada vez.
+
+    O tempo de geração de todas as tabelas é acumulado em um único
+    'cronometro' (ver 'metricas.medir_fluxo').
+    """
+    def __init__(self, esquema: EsquemaRelacional, tamanho: int = TAMANHO_LOTE_PADRAO):
+        self.esquema = esquema
+        self.tamanho = tamanho
+        self.ordem = esquema.ordem_tabelas()
+        self.raiz = np.random.SeedSequence(esquema.semente)
+        self.cronometro = Cronometro()
+        # Índices de chaves disponíveis, por (tabela, coluna)
+        self.chaves: dict[tuple[str, str], IndiceChaves] = {}
+        # Última tabela (posição na ordem) que lê cada chave, para liberá-la depois
+        self._ultimo_uso: dict[tuple[str, str], int] = {}
+        for posicao, tabela in enumerate(self.ordem):
+            for referencia in esquema.referencias(tabela):
+                self._ultimo_uso[(referencia.tabela, referencia.coluna)] = posicao
+
+    def _lotes(self, posicao: int, sistema: SistemaGerador) -> Iterator[list]:
+        """
+        Lotes colunares de uma tabela; as colunas-chave lidas por tabelas
+        seguintes são guardadas, já compactas, enquanto passam.
+        """
+        tabela = self.ordem[posicao]
+        guardar: dict[int, list] = {}
+        for chave in self._ultimo_uso:
+            if chave[0] == tabela.nome:
+                indice = _indice_linear(tabela, chave[1])
+                if indice is not None:
+                    self.chaves[chave] = indice
+                else:
+                    guardar[sistema.nomes_colunas.index(chave[1])] = []
+
+        for colunas in sistema.gerar_lotes_colunares(self.tamanho):
+            for indice, lotes in guardar.items():
+                lotes.append(compactar_coluna(colunas[indice]))
+            yield colunas
+            registro_metricas.incrementar("gerador_linhas_total", len(colunas[0]))
+
+        for indice, lotes in guardar.items():
+            coluna = sistema.nomes_colunas[indice]
+            self.chaves[(tabela.nome, coluna)] = IndiceChaves.de_lotes(lotes)
+        # Chaves que nenhuma tabela seguinte lê não precisam continuar em memória
+        for chave, ultima in self._ultimo_uso.items():
+            if ultima == posicao:
+                self.chaves.pop(chave, None)
+
+    def gerar_tabela(self, posicao: int) -> Iterator[bytes]:
+        """CSV (em blocos) da tabela 'posicao' da ordem de geração."""
+        tabela = self.ordem[posicao]
+        sistema = SistemaGerador(
+            tabela, semente=_semente_tabela(tabela, self.raiz), chaves=self.chaves
+        )
+        sistema.cronometro = self.cronometro
+        return gerar_csv_em_blocos(
+            self._lotes(posicao, sistema),
+            sistema.nomes_colunas,
+            delimitador=tabela.delimitador,
+            separadorDecimal=tabela.separadorDecimal,
+            precisao=tabela.precisaoDecimal,
+            cabecalho=sistema.plano.cabecalho_csv,
+        )
+
+    def gerar_zip(self) -> Iterator[bytes]:
+        """
+        Zip com um CSV por tabela ('<nome>.csv'), em streaming: cada lote é
+        escrito na entrada da sua tabela e enviado em seguida.
+        """
+        compressao = (
+            zipfile.ZIP_DEFLATED if self.esquema.compressao else zipfile.ZIP_STORED
+        )
+        destino = _BufferDrenavel()
+        with zipfile.ZipFile(destino, mode="w", compression=compressao) as arquivo_zip:
+            for posicao, tabela in enumerate(self.ordem):
+                with arquivo_zip.open(
+                    f"{tabela.nome}.csv", mode="w", force_zip64=True
+                ) as entrada:
+                    for bloco in self.gerar_tabela(posicao):
+                        entrada.write(bloco)
+                        yield destino.drenar()
+                yield destino.drenar()
+        yield destino.drenar()
@@ -1,53 +1,719 @@
-from .modelos import ConfiguracaoCSV, ConfiguracaoColuna, TipoGeradorConfig
-from .geradores import GeradorDados, GeradorRegex, GeradorGaussiano, GeradorLinear
+import hashlib
+import threading
+import time
+from collections import OrderedDict, deque
+from collections.abc import Iterator
+from functools import cached_property
 
+import numpy as np
 
-def get_gerador(config_gerador: TipoGeradorConfig) -> GeradorDados:
+from .cache import chave_configuracao
+from .colunar import DadosColunares, IndiceChaves, compactar_coluna, decodificar_textos
+from .expressoes import compilar_formula, ordem_topologica
+from .geradores import (
+    ComponenteMultivariado,
+    GeradorCategorico,
+    GeradorDados,
+    GeradorExponencial,
+    GeradorExpressao,
+    GeradorGaussiano,
+    GeradorLinear,
+    GeradorLogNormal,
+    GeradorMultivariado,
+    GeradorPoisson,
+    GeradorReferencia,
+    GeradorRegex,
+    GeradorRegexUnico,
+    GeradorUnicoFiltrado,
+    GeradorUniforme,
+    LoteValores,
+    fator_covariancia,
+)
+from .metricas import Cronometro, chave_metrica, registro_metricas
+from .modelos import ConfiguracaoColuna, ConfiguracaoCSV, TipoGeradorConfig
+from .regex_compilado import compilar_regex
+from .utils_csv import _cabecalho_csv
+
+# Quantidade de linhas geradas por lote no modo streaming.
+# Limita a memória usada por requisição independentemente de 'numLinhas'.
+TAMANHO_LOTE_PADRAO = 10_000
+
+# Versão da geração: entra na chave do cache de resultados (e no ETag) e na
+# dos checkpoints. Incrementar quando uma mudança em geradores, sementes ou
+# codificadores altera a saída de uma mesma configuração com semente.
+VERSAO_GERACAO = 1
+
+
+def get_gerador(
+    config_gerador: TipoGeradorConfig,
+    rng: np.random.Generator | None = None,
+    contexto: dict[str, LoteValores] | None = None,
+    chaves: dict[tuple[str, str], IndiceChaves] | None = None,
+) -> GeradorDados:
     """
     Factory Function.
     Recebe uma configuração de gerador e retorna a instância
     correta do gerador (Strategy).
+
+    'contexto' é onde as colunas derivadas ('expressao') leem os lotes
+    das colunas de que dependem, e 'chaves' é onde as chaves estrangeiras
+    ('referencia') encontram as chaves das tabelas já geradas, por
+    (tabela, coluna).
     """
     if config_gerador.tipoGerador == "regex":
-        return GeradorRegex(config_gerador)
+        return GeradorRegex(config_gerador, rng)
     elif config_gerador.tipoGerador == "gaussiano":
-        return GeradorGaussiano(config_gerador)
+        return GeradorGaussiano(config_gerador, rng)
     elif config_gerador.tipoGerador == "linear":
-        return GeradorLinear(config_gerador)
+        return GeradorLinear(config_gerador, rng)
+    elif config_gerador.tipoGerador == "uniforme":
+        return GeradorUniforme(config_gerador, rng)
+    elif config_gerador.tipoGerador == "exponencial":
+        return GeradorExponencial(config_gerador, rng)
+    elif config_gerador.tipoGerador == "lognormal":
+        return GeradorLogNormal(config_gerador, rng)
+    elif config_gerador.tipoGerador == "poisson":
+        return GeradorPoisson(config_gerador, rng)
+    elif config_gerador.tipoGerador == "categorico":
+        return GeradorCategorico(config_gerador, rng)
+    elif config_gerador.tipoGerador == "expressao":
+        return GeradorExpressao(
+            config_gerador, contexto if contexto is not None else {}
+        )
+    elif config_gerador.tipoGerador == "referencia":
+        chave = (config_gerador.tabela, config_gerador.coluna)
+        if chaves is None or chave not in chaves:
+            raise ValueError(
+                f"As chaves de '{config_gerador.tabela}.{config_gerador.coluna}' "
+                "ainda não foram geradas (a tabela referenciada é gerada antes, "
+                "no mesmo esquema)."
+            )
+        return GeradorReferencia(config_gerador, chaves[chave], rng)
     else:
         # Isso não deve acontecer se a validação do Pydantic (Fase 1)
         # estiver funcionando.
         raise ValueError(f"Tipo de gerador desconhecido: {config_gerador.tipoGerador}")
 
 
+def get_gerador_unico(
+    config_gerador: TipoGeradorConfig,
+    rng: np.random.Generator | None,
+    semente: np.random.SeedSequence,
+    capacidade: int,
+) -> GeradorDados:
+    """
+    Factory dos geradores de colunas com valores distintos ('unico').
+
+    'semente' define a permutação das regex enumeráveis e 'capacidade'
+    (o número de linhas) dimensiona o registro das demais.
+    """
+    if config_gerador.tipoGerador == "linear":
+        # Incremento não nulo (validado): a sequência já é estritamente monotônica
+        return GeradorLinear(config_gerador, rng)
+    if config_gerador.tipoGerador == "regex":
+        programa = compilar_regex(config_gerador.expressao)
+        if programa is not None and programa.comprimento_fixo:
+            return GeradorRegexUnico(config_gerador, rng, semente)
+        return GeradorUnicoFiltrado(GeradorRegex(config_gerador, rng), capacidade)
+    raise ValueError(
+        f"'unico' não é suportado pelo gerador '{config_gerador.tipoGerador}'."
+    )
+
+
+# Componente extra da 'spawn_key' que separa a semente da permutação das
+# colunas únicas do fluxo aleatório da própria coluna
+_FLUXO_UNICIDADE = 1
+
+
+def _chaves_colunas(nomes: list[str]) -> list[int]:
+    """
+    Calcula uma chave estável (64 bits) para o fluxo aleatório de cada coluna.
+
+    A chave vem do nome da coluna (e de sua ocorrência, para nomes repetidos),
+    e não da posição: reordenar ou incluir colunas não altera as demais.
+    """
+    ocorrencias: dict[str, int] = {}
+    chaves = []
+    for nome in nomes:
+        ocorrencia = ocorrencias.get(nome, 0)
+        ocorrencias[nome] = ocorrencia + 1
+        resumo = hashlib.blake2b(f"{ocorrencia}:{nome}".encode(), digest_size=8)
+        chaves.append(int.from_bytes(resumo.digest(), "little"))
+    return chaves
+
+
+class PlanoGeracao:
+    """
+    Configuração compilada: tudo o que não depende da semente nem da
+    requisição é calculado uma única vez e compartilhado entre os
+    'SistemaGerador' criados a partir dela.
+
+    Os programas de regex são compilados na criação do plano (e ficam em
+    cache por expressão); o resto é calculado sob demanda e memorizado.
+    """
+    def __init__(self, config: ConfiguracaoCSV, chave: str | None = None):
+        self.config = config
+        self.nomes_colunas: list[str] = [col.nome for col in config.colunas]
+        self.tipos_por_coluna: list[str] = [
+            col.configGerador.tipoGerador for col in config.colunas
+        ]
+        self.chaves_colunas: list[int] = _chaves_colunas(self.nomes_colunas)
+        # Séries de métricas de cada coluna (tempo e valores gerados por tipo)
+        self.metricas_colunas: list[tuple[tuple, tuple]] = [
+            (
+                chave_metrica("gerador_coluna_segundos", tipoGerador=tipo),
+                chave_metrica("gerador_valores_total", tipoGerador=tipo),
+            )
+            for tipo in self.tipos_por_coluna
+        ]
+        if chave is not None:
+            self.chave = chave
+        # Programas de regex compilados, compartilhados com os GeradorRegex
+        self.programas_regex = {
+            col.configGerador.expressao: compilar_regex(col.configGerador.expressao)
+            for col in config.colunas if col.configGerador.tipoGerador == "regex"
+        }
+        # Grupos de colunas correlacionadas: índices das colunas, médias e o
+        # fator da covariância (Cholesky), calculado uma única vez por plano
+        self.grupos_correlacao: list[tuple[list[int], list[float], np.ndarray]] = []
+        for grupo in config.correlacoes:
+            indices = [self.nomes_colunas.index(nome) for nome in grupo.colunas]
+            geradores = [config.colunas[indice].configGerador for indice in indices]
+            self.grupos_correlacao.append((
+                indices,
+                [gerador.media for gerador in geradores],
+                fator_covariancia(
+                    [gerador.desvioPadrao for gerador in geradores], grupo.correlacao
+                ),
+            ))
+        # Colunas únicas que dependem de um registro dos valores emitidos
+        # (e não da posição): com elas, a geração não é dividida em shards
+        self.colunas_sem_shards: list[str] = []
+        for col in config.colunas:
+            if col.unico and col.configGerador.tipoGerador == "regex":
+                programa = self.programas_regex[col.configGerador.expressao]
+                if programa is None or not programa.comprimento_fixo:
+                    self.colunas_sem_shards.append(col.nome)
+        # Colunas derivadas ('expressao') são avaliadas depois das colunas de
+        # que dependem; 'ordem_colunas' é a ordem de geração dos lotes
+        self._indices_por_nome = {nome: i for i, nome in enumerate(self.nomes_colunas)}
+        self._dependencias: dict[int, list[int]] = {}
+        for indice, col in enumerate(config.colunas):
+            if col.configGerador.tipoGerador == "expressao":
+                formula = compilar_formula(col.configGerador.formula)
+                self._dependencias[indice] = [
+                    self._indices_por_nome[nome]
+                    for nome in sorted(formula.dependencias)
+                ]
+        derivadas = ordem_topologica({
+            self.nomes_colunas[indice]: [self.nomes_colunas[d] for d in dependencias]
+            for indice, dependencias in self._dependencias.items()
+        })
+        self.ordem_colunas: list[int] = [
+            indice
+            for indice in range(len(config.colunas))
+            if indice not in self._dependencias
+        ] + [self._indices_por_nome[nome] for nome in derivadas]
+        # Colunas cujos lotes são lidos por alguma fórmula
+        self.colunas_referenciadas: set[int] = {
+            d for dependencias in self._dependencias.values() for d in dependencias
+        }
+        self._chaves_resultado: dict[tuple, str] = {}
+
+    def colunas_necessarias(self, indice: int) -> list[int]:
+        """
+        Índices das colunas que precisam ser geradas para obter a coluna
+        'indice' (ela inclusive), na ordem de geração.
+
+        Uma coluna correlacionada leva junto o seu grupo, cujos valores
+        são sorteados em conjunto.
+        """
+        grupos = {
+            i: indices for indices, _, _ in self.grupos_correlacao for i in indices
+        }
+        necessarias = {indice}
+        pendentes = [indice]
+        while pendentes:
+            atual = pendentes.pop()
+            for outra in self._dependencias.get(atual, grupos.get(atual, [])):
+                if outra not in necessarias:
+                    necessarias.add(outra)
+                    pendentes.append(outra)
+        return [i for i in self.ordem_colunas if i in necessarias]
+
+    @property
+    def permite_shards(self) -> bool:
+        """Se os lotes podem ser gerados como shards independentes."""
+        return not self.colunas_sem_shards
+
+    @cached_property
+    def chave(self) -> str:
+        """Hash canônico da configuração (ver 'cache.chave_configuracao')."""
+        return chave_configuracao(self.config)
+
+    def chave_resultado(self, **contexto) -> str:
+        """
+        Chave do cache de resultados para este plano e contexto (memorizada).
+
+        Inclui 'VERSAO_GERACAO': entradas gravadas por uma versão anterior
+        da geração deixam de ser encontradas.
+        """
+        chave = tuple(sorted(contexto.items()))
+        if chave not in self._chaves_resultado:
+            self._chaves_resultado[chave] = chave_configuracao(
+                self.config, versao=VERSAO_GERACAO, **contexto
+            )
+        return self._chaves_resultado[chave]
+
+    @cached_property
+    def cabecalho_csv(self) -> bytes:
+        """Linha de cabeçalho do CSV, já codificada."""
+        cabecalho = _cabecalho_csv(self.nomes_colunas, self.config.delimitador)
+        return cabecalho.encode("utf-8")
+
+
+class CachePlanos:
+    """
+    Cache LRU de planos de geração para requisições repetidas.
+
+    Os planos são indexados pelo hash canônico da configuração, e o hash do
+    corpo bruto da requisição aponta para ele: um corpo já visto não é nem
+    validado de novo, e corpos diferentes mas equivalentes compartilham o
+    mesmo plano. É seguro para uso entre threads.
+    """
+    def __init__(self, tamanho_maximo: int = 256):
+        self.tamanho_maximo = tamanho_maximo
+        self._lock = threading.Lock()
+        self._planos: OrderedDict[str, PlanoGeracao] = OrderedDict()
+        # hash do corpo bruto -> chave canônica
+        self._corpos: OrderedDict[bytes, str] = OrderedDict()
+        self.acertos = 0
+        self.falhas = 0
+
+    def obter(self, corpo: bytes) -> PlanoGeracao:
+        """
+        Retorna o plano para o corpo JSON de uma requisição, validando-o e
+        compilando-o apenas na primeira vez.
+
+        Levanta pydantic.ValidationError se a configuração for inválida.
+        """
+        resumo = hashlib.sha256(corpo).digest()
+        with self._lock:
+            chave = self._corpos.get(resumo)
+            if chave is not None and chave in self._planos:
+                self._corpos.move_to_end(resumo)
+                self._planos.move_to_end(chave)
+                self.acertos += 1
+                return self._planos[chave]
+
+        config = ConfiguracaoCSV.model_validate_json(corpo)
+        chave = chave_configuracao(config)
+        with self._lock:
+            plano = self._planos.get(chave)
+        if plano is None:
+            # Compila fora do lock; em uma corrida, o primeiro plano inserido vence
+            plano = PlanoGeracao(config, chave)
+
+        with self._lock:
+            if chave in self._planos:
+                self.acertos += 1
+                plano = self._planos[chave]
+            else:
+                self.falhas += 1
+                self._planos[chave] = plano
+            self._planos.move_to_end(chave)
+            self._corpos[resumo] = chave
+            self._corpos.move_to_end(resumo)
+            while len(self._planos) > self.tamanho_maximo:
+                self._planos.popitem(last=False)
+            while len(self._corpos) > self.tamanho_maximo:
+                self._corpos.popitem(last=False)
+        return plano
+
+    def estatisticas(self) -> dict:
+        """Contadores de uso do cache de planos."""
+        with self._lock:
+            return {
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "entradas": len(self._planos),
+                "entradasMaximo": self.tamanho_maximo,
+            }
+
+
+# Plano dos processos que geram shards, compilado uma vez por processo
+_plano_shards: PlanoGeracao | None = None
+
+
+def iniciar_processo_shards(config: ConfiguracaoCSV) -> None:
+    """
+    Inicializador ('initializer') dos processos que geram shards: compila o
+    plano de 'config' uma única vez por processo, para todos os seus shards.
+    """
+    global _plano_shards
+    _plano_shards = PlanoGeracao(config)
+
+
+def gerar_shard(
+    entropia: int, indice: int, inicio: int, quantidade: int
+) -> list[LoteValores]:
+    """
+    Gera as colunas de um shard, em um processo iniciado por
+    'iniciar_processo_shards'.
+
+    Cada shard tem seu próprio fluxo aleatório, derivado da entropia do
+    sistema e do índice do shard (SeedSequence com 'spawn_key'), e os
+    geradores posicionais (ex: linear) começam na linha 'inicio'.
+    """
+    if _plano_shards is None:
+        raise RuntimeError(
+            "Processo de shards não iniciado (ver 'iniciar_processo_shards')."
+        )
+    semente = np.random.SeedSequence(entropia, spawn_key=(indice,))
+    sistema = SistemaGerador(_plano_shards.config, semente=semente, plano=_plano_shards)
+    sistema.avancar(inicio)
+    return sistema.gerar_colunas(quantidade)
+
+
 class SistemaGerador:
     """
     Serviço orquestrador que gerencia o processo de geração de dados.
     (Equivalente ao 'SistemaGerador' do Diagrama de Classes)
-    
+
+    Com 'processos' > 1, os lotes são gerados em paralelo, cada um como um
+    shard independente em um ProcessPoolExecutor, e devolvidos em ordem
+    (exceto se o plano não permitir shards; ver 'PlanoGeracao.permite_shards').
+
+    Um 'plano' já compilado (ex: do CachePlanos) pode ser reaproveitado;
+    sem ele, o plano é compilado a partir de 'config'.
+
+    Em um esquema relacional, 'chaves' traz as chaves das tabelas já
+    geradas, lidas pelas colunas 'referencia' (ver 'relacional').
     """
-    def __init__(self, config: ConfiguracaoCSV):
+    def __init__(
+        self,
+        config: ConfiguracaoCSV,
+        semente: np.random.SeedSequence | None = None,
+        processos: int = 1,
+        plano: PlanoGeracao | None = None,
+        chaves: dict[tuple[str, str], IndiceChaves] | None = None,
+    ):
         self.config = config
+        self.processos = processos
+        self.chaves = chaves
+        self.plano = plano if plano is not None else PlanoGeracao(config)
+        # Armazena os nomes das colunas
+        self.nomes_colunas: list[str] = self.plano.nomes_colunas
+        # Semente raiz: vem da configuração ('semente') ou, sem ela, da
+        # entropia do sistema operacional. Nunca usa o estado global do NumPy.
+        if semente is None:
+            semente = np.random.SeedSequence(self.config.semente)
+        self.semente = semente
+        # Cada coluna recebe um numpy.random.Generator próprio, derivado
+        # da semente raiz e da chave da coluna
+        self.rngs_por_coluna = [
+            np.random.default_rng(np.random.SeedSequence(
+                self.semente.entropy, spawn_key=(*self.semente.spawn_key, chave)
+            ))
+            for chave in self.plano.chaves_colunas
+        ]
+        # Lotes das colunas lidos pelas colunas derivadas, válidos durante um lote
+        self._contexto: dict[str, LoteValores] = {}
+        # Colunas correlacionadas compartilham um gerador multivariado,
+        # que usa o fluxo aleatório da primeira coluna do grupo
+        componentes: dict[int, GeradorDados] = {}
+        for indices, medias, fator in self.plano.grupos_correlacao:
+            grupo = GeradorMultivariado(medias, fator, self.rngs_por_coluna[indices[0]])
+            for posicao, indice in enumerate(indices):
+                componentes[indice] = ComponenteMultivariado(grupo, posicao)
         # Cria a lista de geradores (Strategies) usando a Factory
         self.geradores_por_coluna: list[GeradorDados] = [
-            get_gerador(col.configGerador) for col in self.config.colunas
+            componentes[indice] if indice in componentes
+            else self._criar_gerador(col, rng, chave)
+            for indice, (col, rng, chave) in enumerate(zip(
+                self.config.colunas, self.rngs_por_coluna, self.plano.chaves_colunas
+            ))
         ]
-        # Armazena os nomes das colunas
-        self.nomes_colunas: list[str] = [col.nome for col in self.config.colunas]
+        self.tipos_por_coluna = self.plano.tipos_por_coluna
+        # Posição (índice da linha) do próximo lote gerado por linhas
+        self.linha = 0
+        # Tempo de geração acumulado, recolhido por 'metricas.medir_fluxo'
+        self.cronometro = Cronometro()
+
+    def _criar_gerador(
+        self, coluna: ConfiguracaoColuna, rng: np.random.Generator, chave: int
+    ) -> GeradorDados:
+        if not coluna.unico:
+            return get_gerador(coluna.configGerador, rng, self._contexto, self.chaves)
+        # A permutação ignora o índice do shard ('spawn_key' da semente):
+        # todos os shards enumeram a mesma sequência, cada um na sua faixa
+        semente = np.random.SeedSequence(
+            self.semente.entropy, spawn_key=(chave, _FLUXO_UNICIDADE)
+        )
+        return get_gerador_unico(
+            coluna.configGerador, rng, semente, self.config.numLinhas
+        )
+
+    def avancar(self, n: int) -> None:
+        """Avança todos os geradores 'n' linhas (início de um shard)."""
+        for gerador in self.geradores_por_coluna:
+            gerador.avancar(n)
+        self.linha += n
+
+    def exportar_estado(self) -> dict:
+        """
+        Estado da geração entre dois lotes, serializável em JSON: a semente,
+        a linha atual, o estado do gerador de bits de cada coluna e o estado
+        posicional de cada gerador (ex: a posição da sequência linear).
+
+        Restaurado em um sistema com a mesma configuração (ver
+        'restaurar_estado'), a geração continua exatamente de onde parou.
+        Na geração paralela os lotes vêm de outros processos, então não
+        há estado a salvar aqui.
+        """
+        if self.processos > 1:
+            raise ValueError(
+                "O estado da geração paralela (processos > 1) não pode ser salvo."
+            )
+        return {
+            "entropia": self.semente.entropy,
+            "linha": self.linha,
+            "rngs": [rng.bit_generator.state for rng in self.rngs_por_coluna],
+            "geradores": [
+                gerador.exportar_estado() for gerador in self.geradores_por_coluna
+            ],
+        }
+
+    def restaurar_estado(self, estado: dict) -> None:
+        """Continua a geração a partir de um estado de 'exportar_estado'."""
+        num_colunas = len(self.geradores_por_coluna)
+        if not len(estado["rngs"]) == len(estado["geradores"]) == num_colunas:
+            raise ValueError(
+                "O estado salvo não corresponde às colunas da configuração."
+            )
+        if estado["entropia"] != self.semente.entropy:
+            # As permutações das colunas únicas também dependem da semente
+            raise ValueError("O estado foi salvo com outra semente.")
+        for rng, estado_rng in zip(self.rngs_por_coluna, estado["rngs"]):
+            rng.bit_generator.state = estado_rng
+        geradores = zip(self.geradores_por_coluna, estado["geradores"])
+        for gerador, estado_gerador in geradores:
+            gerador.restaurar_estado(estado_gerador)
+        self.linha = estado["linha"]
 
-    def gerar_dados(self) -> list[dict]:
+    def gerar_colunas(self, quantidade: int) -> list[LoteValores]:
         """
-        Gera a lista completa de dados em memória (RF01).
-        
-        
+        Gera 'quantidade' valores para cada coluna, uma coluna por vez.
+
+        Cada gerador produz seu lote inteiro em uma única chamada
+        ('gerarLote'), evitando uma chamada por célula. O tempo de cada
+        coluna (por tipo de gerador) é registrado uma vez por lote.
+
+        Retorna:
+            Uma lista com o lote de cada coluna (array NumPy ou lista),
+            na ordem das colunas.
+        """
+        lotes, tempos = self._gerar_em_ordem(self.plano.ordem_colunas, quantidade)
+        self._registrar_tempos(list(tempos), list(tempos.values()), quantidade)
+        self.linha += quantidade
+        return [lotes[indice] for indice in range(len(lotes))]
+
+    def _gerar_em_ordem(
+        self, indices: list[int], quantidade: int
+    ) -> tuple[dict[int, LoteValores], dict[int, float]]:
+        """
+        Gera os lotes das colunas 'indices' (na ordem de geração), expondo
+        às colunas derivadas os lotes de que elas dependem.
+        """
+        lotes: dict[int, LoteValores] = {}
+        tempos: dict[int, float] = {}
+        referenciadas = self.plano.colunas_referenciadas
+        try:
+            for indice in indices:
+                inicio = time.perf_counter()
+                lotes[indice] = self.geradores_por_coluna[indice].gerarLote(quantidade)
+                tempos[indice] = time.perf_counter() - inicio
+                if indice in referenciadas:
+                    self._contexto[self.nomes_colunas[indice]] = lotes[indice]
+        finally:
+            self._contexto.clear()
+        return lotes, tempos
+
+    def _gerar_lote_medido(self, indice: int, quantidade: int) -> LoteValores:
+        inicio = time.perf_counter()
+        lote = self.geradores_por_coluna[indice].gerarLote(quantidade)
+        self._registrar_tempos([indice], [time.perf_counter() - inicio], quantidade)
+        return lote
+
+    def _registrar_tempos(self, indices, tempos: list[float], quantidade: int) -> None:
+        """Registra o tempo e os valores gerados das colunas com um único lock."""
+        self.cronometro.adicionar("geracao", sum(tempos))
+        metricas = [self.plano.metricas_colunas[indice] for indice in indices]
+        registro_metricas.atualizar(
+            observacoes=[
+                (tempo, segundos) for (tempo, _), segundos in zip(metricas, tempos)
+            ],
+            incrementos=[(valores, quantidade) for _, valores in metricas],
+        )
+
+    def gerar_lotes_colunares(
+        self, tamanho: int = TAMANHO_LOTE_PADRAO
+    ) -> Iterator[list[LoteValores]]:
+        """
+        Gera os dados em lotes colunares de até 'tamanho' linhas.
+
         Retorna:
-            Uma lista de dicionários (ex: [{'col1': val1}, {'col1': val2}])
-        """
-        dados_gerados = []
-        for _ in range(self.config.numLinhas):
-            linha = {}
-            # Itera sobre os nomes das colunas e seus respectivos geradores
-            for nome_col, gerador in zip(self.nomes_colunas, self.geradores_por_coluna):
-                linha[nome_col] = gerador.gerarValor()
-            dados_gerados.append(linha)
-        return dados_gerados
+            Um iterador em que cada item é a lista de colunas de um lote.
+        """
+        if tamanho <= 0:
+            raise ValueError("O tamanho do lote deve ser maior que zero.")
+
+        if (
+            self.processos > 1
+            and self.config.numLinhas > tamanho
+            and self.plano.permite_shards
+        ):
+            yield from self._gerar_lotes_paralelo(tamanho)
+            return
+
+        restantes = self.config.numLinhas
+        while restantes > 0:
+            quantidade = min(tamanho, restantes)
+            yield self.gerar_colunas(quantidade)
+            restantes -= quantidade
+
+    def gerar_lotes_da_coluna(
+        self, indice: int, tamanho: int = TAMANHO_LOTE_PADRAO
+    ) -> Iterator[LoteValores]:
+        """
+        Gera todos os valores de uma única coluna, em lotes de até 'tamanho'.
+
+        Como cada coluna tem seu próprio fluxo aleatório, os valores são os
+        mesmos que a coluna teria na geração por linhas. Colunas derivadas e
+        correlacionadas dependem de outras colunas e são geradas em uma
+        réplica (ver '_gerar_lotes_em_replica').
+        """
+        if self.tipos_por_coluna[indice] == "expressao" or isinstance(
+            self.geradores_por_coluna[indice], ComponenteMultivariado
+        ):
+            yield from self._gerar_lotes_em_replica(indice, tamanho)
+            return
+        for inicio in range(0, self.config.numLinhas, tamanho):
+            yield self._gerar_lote_medido(
+                indice, min(tamanho, self.config.numLinhas - inicio)
+            )
+
+    def _gerar_lotes_em_replica(
+        self, indice: int, tamanho: int
+    ) -> Iterator[LoteValores]:
+        """
+        Lotes de uma coluna derivada ou correlacionada gerada sozinha: as
+        colunas de que ela depende (ou o seu grupo de correlação) são
+        geradas de novo, lote a lote, em uma réplica deste sistema (mesma
+        semente), sem consumir os fluxos aleatórios das colunas daqui. A
+        memória fica limitada a um lote.
+        """
+        replica = SistemaGerador(
+            self.config, semente=self.semente, plano=self.plano, chaves=self.chaves
+        )
+        necessarias = self.plano.colunas_necessarias(indice)
+        for inicio in range(0, self.config.numLinhas, tamanho):
+            quantidade = min(tamanho, self.config.numLinhas - inicio)
+            comeco = time.perf_counter()
+            lotes, _ = replica._gerar_em_ordem(necessarias, quantidade)
+            self._registrar_tempos([indice], [time.perf_counter() - comeco], quantidade)
+            yield lotes[indice]
+
+    def _gerar_lotes_paralelo(self, tamanho: int) -> Iterator[list[LoteValores]]:
+        """
+        Distribui os lotes (shards) entre processos e os devolve em ordem.
+
+        Com qualquer 'processos' > 1, o resultado depende apenas da semente e
+        do tamanho do lote. Ele difere da geração sequencial ('processos' = 1)
+        com a mesma semente: cada shard usa um fluxo aleatório próprio, e não
+        os fluxos contínuos por coluna (por isso a chave do cache de
+        resultados inclui o modo paralelo). No máximo '2 * processos' shards
+        ficam pendentes, mantendo a memória limitada. A espera por cada shard
+        conta como tempo de geração (as métricas por coluna ficam nos
+        processos filhos).
+
+        O plano é compilado uma vez por processo ('iniciar_processo_shards'),
+        e não a cada shard.
+        """
+        # Importado só aqui: carrega 'multiprocessing' e afins, que a
+        # geração sequencial não usa
+        from concurrent.futures import ProcessPoolExecutor
+
+        entropia = self.semente.entropy
+        executor = ProcessPoolExecutor(
+            max_workers=self.processos,
+            initializer=iniciar_processo_shards,
+            initargs=(self.config,),
+        )
+        try:
+            pendentes = deque()
+            for indice, inicio in enumerate(range(0, self.config.numLinhas, tamanho)):
+                quantidade = min(tamanho, self.config.numLinhas - inicio)
+                pendentes.append(executor.submit(
+                    gerar_shard, entropia, indice, inicio, quantidade
+                ))
+                if len(pendentes) >= 2 * self.processos:
+                    yield self._aguardar_shard(pendentes.popleft())
+            while pendentes:
+                yield self._aguardar_shard(pendentes.popleft())
+        finally:
+            # Se o consumidor parar antes do fim, descarta os shards pendentes
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _aguardar_shard(self, futuro) -> list[LoteValores]:
+        inicio = time.perf_counter()
+        colunas = futuro.result()
+        self.cronometro.adicionar("geracao", time.perf_counter() - inicio)
+        return colunas
+
+    def pre_visualizar(self, quantidade: int) -> list[list]:
+        """
+        Gera apenas as primeiras 'quantidade' linhas (no máximo 'numLinhas'),
+        como listas de valores serializáveis em JSON (NaN e infinitos viram
+        None). O custo não depende de 'numLinhas'.
+        """
+        colunas = self.gerar_colunas(min(quantidade, self.config.numLinhas))
+        valores = []
+        for coluna in colunas:
+            if isinstance(coluna, np.ndarray):
+                if coluna.dtype.kind == "f" and not np.isfinite(coluna).all():
+                    coluna = np.where(np.isfinite(coluna), coluna, None)
+                if coluna.dtype.kind == "S":
+                    coluna = decodificar_textos(coluna)
+                else:
+                    coluna = coluna.tolist()
+            valores.append(coluna)
+        return [list(linha) for linha in zip(*valores)]
+
+    def gerar_lotes(
+        self, tamanho: int = TAMANHO_LOTE_PADRAO
+    ) -> Iterator[DadosColunares]:
+        """
+        Gera os dados em lotes de até 'tamanho' linhas (RF01).
+
+        Apenas um lote fica em memória por vez, o que permite gerar
+        arquivos muito maiores que a memória disponível.
+
+        Retorna:
+            Um iterador de lotes no mesmo formato de 'gerar_dados'.
+        """
+        for colunas in self.gerar_lotes_colunares(tamanho):
+            compactadas = [compactar_coluna(coluna) for coluna in colunas]
+            yield DadosColunares(self.nomes_colunas, compactadas)
+
+    def gerar_dados(self) -> DadosColunares:
+        """
+        Gera os dados completos em memória (RF01).
+
+        Os valores ficam em arrays por coluna (ver 'DadosColunares'), sem um
+        dicionário por linha; o resultado ainda pode ser lido como a lista
+        de dicionários de antes (ex: dados[0] == {'col1': val1}).
+        """
+        return DadosColunares.de_lotes(
+            self.nomes_colunas, self.gerar_lotes_colunares(), self.config.numLinhas
+        )
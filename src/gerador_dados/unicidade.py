@@ -0,0 +1,159 @@
+"""
+Estruturas para colunas com valores únicos ('unico').
+
+- PermutacaoFeistel: bijeção pseudoaleatória de [0, tamanho) em si mesmo,
+  usada para enumerar a linguagem de uma regex de comprimento fixo sem
+  guardar os valores já gerados.
+- ConjuntoExato / FiltroBloom: registro dos valores já emitidos, para
+  geradores que não podem ser enumerados (reamostragem até obter valores novos).
+"""
+import math
+
+import numpy as np
+
+# Até este número de valores, o registro é um set exato; acima, um filtro de Bloom
+LIMITE_CONJUNTO_EXATO = 100_000
+
+# Taxa de falsos positivos do filtro de Bloom. Um falso positivo apenas descarta
+# um valor inédito (que é sorteado de novo); nunca produz uma duplicata.
+TAXA_FALSOS_POSITIVOS = 1e-3
+
+
+def _misturar(x: np.ndarray) -> np.ndarray:
+    """Finalizador do splitmix64: espalha os bits de inteiros de 64 bits."""
+    x = x ^ (x >> np.uint64(30))
+    x = x * np.uint64(0xBF58476D1CE4E5B9)
+    x = x ^ (x >> np.uint64(27))
+    x = x * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+class PermutacaoFeistel:
+    """
+    Permutação pseudoaleatória de [0, tamanho), definida por uma chave.
+
+    Rede de Feistel balanceada sobre o menor número par de bits que cobre
+    'tamanho'; valores fora do domínio são cifrados de novo até caírem
+    dentro dele (cycle-walking), o que mantém a bijeção. Cada índice é
+    cifrado de forma independente, então qualquer faixa de índices (ex: a
+    de um shard) pode ser calculada sem as anteriores.
+    """
+    RODADAS = 4
+
+    def __init__(self, tamanho: int, chaves: np.ndarray):
+        if not 1 <= tamanho <= 1 << 62:
+            raise ValueError(
+                "O domínio da permutação deve ter entre 1 e 2^62 elementos."
+            )
+        if len(chaves) < self.RODADAS:
+            raise ValueError(f"São necessárias {self.RODADAS} chaves de rodada.")
+        self.tamanho = tamanho
+        bits = max(2, (tamanho - 1).bit_length())
+        self._metade = np.uint64((bits + 1) // 2)
+        self._mascara = np.uint64((1 << int(self._metade)) - 1)
+        self._chaves = np.asarray(chaves[:self.RODADAS], dtype=np.uint64)
+
+    def _cifrar(self, x: np.ndarray) -> np.ndarray:
+        esquerda, direita = x >> self._metade, x & self._mascara
+        for chave in self._chaves:
+            mistura = _misturar(direita ^ chave) & self._mascara
+            esquerda, direita = direita, esquerda ^ mistura
+        return (esquerda << self._metade) | direita
+
+    def aplicar(self, indices: np.ndarray) -> np.ndarray:
+        """Retorna a imagem de cada índice (uint64 com valores em [0, tamanho))."""
+        resultado = self._cifrar(np.asarray(indices, dtype=np.uint64))
+        fora = resultado >= np.uint64(self.tamanho)
+        while fora.any():
+            resultado[fora] = self._cifrar(resultado[fora])
+            fora = resultado >= np.uint64(self.tamanho)
+        return resultado
+
+
+class ConjuntoExato:
+    """Registro exato dos valores já emitidos (para poucos valores)."""
+    def __init__(self):
+        self._vistos: set = set()
+
+    def registrar(self, valores: list) -> list:
+        """Registra os valores e retorna os inéditos, na ordem, sem repetições."""
+        novos = []
+        for valor in valores:
+            if valor not in self._vistos:
+                self._vistos.add(valor)
+                novos.append(valor)
+        return novos
+
+
+class FiltroBloom:
+    """
+    Registro aproximado de strings já emitidas, em ~1,8 byte por valor
+    (para a taxa padrão de 0,1%), em vez das dezenas de bytes de um set.
+
+    O hash é calculado de forma vetorizada sobre os códigos dos caracteres
+    (FNV-1a seguido do splitmix64), e não com 'hash()', que varia entre
+    processos: com semente, os valores descartados (e portanto o arquivo)
+    são sempre os mesmos.
+    """
+    def __init__(
+        self, capacidade: int, taxa_falsos_positivos: float = TAXA_FALSOS_POSITIVOS
+    ):
+        capacidade = max(capacidade, 1)
+        bits = math.ceil(
+            -capacidade * math.log(taxa_falsos_positivos) / math.log(2) ** 2
+        )
+        self.num_bits = max(bits, 64)
+        self.num_hashes = max(1, round(self.num_bits / capacidade * math.log(2)))
+        self._bits = np.zeros((self.num_bits + 7) // 8, dtype=np.uint8)
+
+    @staticmethod
+    def _hash(valores: np.ndarray) -> np.ndarray:
+        codigos = valores.view(np.uint32).reshape(len(valores), -1)
+        resumo = np.full(len(valores), 0xCBF29CE484222325, dtype=np.uint64)
+        for coluna in codigos.T:
+            # Ignora o preenchimento ('\x00'), que depende da largura do lote
+            resumo = np.where(
+                coluna != 0, (resumo ^ coluna) * np.uint64(0x100000001B3), resumo
+            )
+        return _misturar(resumo)
+
+    def _posicoes(self, resumo: np.ndarray) -> list[np.ndarray]:
+        # Hashing duplo (Kirsch-Mitzenmacher): h1 + i * h2
+        passo = _misturar(resumo ^ np.uint64(0x9E3779B97F4A7C15)) | np.uint64(1)
+        tamanho = np.uint64(self.num_bits)
+        return [
+            (resumo + np.uint64(i) * passo) % tamanho for i in range(self.num_hashes)
+        ]
+
+    def registrar(self, valores: list[str]) -> list[str]:
+        """
+        Registra os valores e retorna os (provavelmente) inéditos, na ordem,
+        sem repetições.
+        """
+        if not valores:
+            return []
+        resumo = self._hash(np.asarray(valores, dtype=str))
+        # Repetições dentro do próprio lote: mantém a primeira ocorrência
+        _, primeiras = np.unique(resumo, return_index=True)
+        primeiras.sort()
+        posicoes = [p[primeiras] for p in self._posicoes(resumo)]
+
+        # Cada posição é um byte do array e a máscara do bit dentro dele
+        bytes_e_mascaras = [
+            (p >> np.uint64(3), np.left_shift(1, p & np.uint64(7)).astype(np.uint8))
+            for p in posicoes
+        ]
+        presentes = np.ones(len(primeiras), dtype=bool)
+        for byte, mascara in bytes_e_mascaras:
+            presentes &= (self._bits[byte] & mascara) != 0
+        novas = ~presentes
+        for byte, mascara in bytes_e_mascaras:
+            np.bitwise_or.at(self._bits, byte[novas], mascara[novas])
+        return [valores[i] for i in primeiras[novas]]
+
+
+def criar_registro(capacidade: int) -> ConjuntoExato | FiltroBloom:
+    """Escolhe o registro de valores emitidos conforme a quantidade esperada."""
+    if capacidade <= LIMITE_CONJUNTO_EXATO:
+        return ConjuntoExato()
+    return FiltroBloom(capacidade)
@@ -1,40 +1,243 @@
 import csv
 import io
-from typing import List, Dict, Any
+from collections.abc import Iterable, Iterator, Sequence
+from typing import Any
+
+import numpy as np
+
+from .colunar import DadosColunares, decodificar_textos
+
+# Formato do CSV gerado: o dialeto 'excel' padrão do módulo csv
+# (aspas '"' duplicadas, fim de linha '\r\n', QUOTE_MINIMAL).
+ASPAS = '"'
+FIM_DE_LINHA = "\r\n"
+
+
+def _formatar_valor(valor: Any, separadorDecimal: str) -> str:
+    """Formata um único valor como o csv.writer faria (caminho genérico)."""
+    if valor is None:
+        return ""
+    if isinstance(valor, float):
+        return str(valor).replace(".", separadorDecimal)
+    return str(valor)
+
+
+def formatar_coluna(
+    valores: np.ndarray | Sequence[Any],
+    separadorDecimal: str = ".",
+    precisao: int | None = None,
+) -> list[str]:
+    """
+    Formata uma coluna inteira de valores como texto (RF09).
+
+    Colunas numéricas (arrays NumPy) são formatadas de uma vez e o separador
+    decimal é aplicado à coluna inteira, e não célula a célula. Com
+    'precisao', os floats são escritos com esse número fixo de casas decimais.
+    """
+    if isinstance(valores, np.ndarray):
+        if valores.dtype.kind == "f":
+            formato = repr if precisao is None else f"{{:.{precisao}f}}".format
+            textos = list(map(formato, valores.tolist()))
+            if separadorDecimal != "." and textos:
+                # Uma única substituição sobre a coluna inteira
+                textos = "\n".join(textos).replace(".", separadorDecimal).split("\n")
+            return textos
+        if valores.dtype.kind in "iub":
+            return list(map(str, valores.tolist()))
+        if valores.dtype.kind == "U":
+            return valores.tolist()
+        if valores.dtype.kind == "S":
+            # Textos compactos (bytes UTF-8, ver 'colunar')
+            return decodificar_textos(valores)
+        valores = valores.tolist()
+
+    # Listas Python: texto puro passa direto; o resto é formatado por valor
+    if all(type(valor) is str for valor in valores):
+        return valores if isinstance(valores, list) else list(valores)
+    if precisao is not None:
+        return [
+            f"{valor:.{precisao}f}".replace(".", separadorDecimal)
+            if isinstance(valor, float) else _formatar_valor(valor, separadorDecimal)
+            for valor in valores
+        ]
+    return [_formatar_valor(valor, separadorDecimal) for valor in valores]
+
+
+def _precisa_aspas(delimitador: str) -> str:
+    """Caracteres que obrigam um campo a ser escrito entre aspas."""
+    return delimitador + ASPAS + "\r\n"
+
+
+def _coluna_precisa_aspas(textos: list[str], especiais: str) -> bool:
+    """Verifica de uma vez se algum campo da coluna precisa de aspas."""
+    conteudo = "".join(textos)
+    return any(caractere in conteudo for caractere in especiais)
+
+
+def codificar_colunas_csv(
+    colunas: Sequence[np.ndarray | Sequence[Any]],
+    delimitador: str = ",",
+    separadorDecimal: str = ".",
+    precisao: int | None = None,
+) -> str:
+    """
+    Codifica um lote colunar como linhas CSV (sem cabeçalho).
+
+    Cada coluna é formatada inteira de uma vez. Se nenhuma coluna tiver
+    campos que exigem aspas, as linhas são montadas com 'join' direto;
+    caso contrário, usa o csv.writer (writerows), que aplica as aspas.
+    O resultado é idêntico ao do csv.DictWriter com o dialeto padrão.
+    """
+    textos = [formatar_coluna(coluna, separadorDecimal, precisao) for coluna in colunas]
+    if not textos or not textos[0]:
+        return ""
+
+    especiais = _precisa_aspas(delimitador)
+    # Uma linha com um único campo vazio é escrita como '""' pelo csv.writer
+    linha_vazia_unica = len(textos) == 1 and "" in textos[0]
+    if linha_vazia_unica or any(_coluna_precisa_aspas(t, especiais) for t in textos):
+        buffer = io.StringIO()
+        csv.writer(buffer, delimiter=delimitador).writerows(zip(*textos))
+        return buffer.getvalue()
+
+    if len(textos) == 1:
+        linhas = textos[0]
+    else:
+        linhas = map(delimitador.join, zip(*textos))
+    return FIM_DE_LINHA.join(linhas) + FIM_DE_LINHA
+
+
+def _texto_fixo(valores: Any) -> bool:
+    return isinstance(valores, np.ndarray) and valores.dtype.kind == "S"
+
+
+def codificar_colunas_csv_bytes(
+    colunas: Sequence[np.ndarray | Sequence[Any]],
+    delimitador: str = ",",
+    separadorDecimal: str = ".",
+    precisao: int | None = None,
+) -> bytes:
+    """
+    Como 'codificar_colunas_csv', mas já em bytes UTF-8.
+
+    Colunas de texto de largura fixa (dtype 'S', ex: regex ASCII de
+    comprimento fixo) não são convertidas em strings Python: se todas as
+    colunas forem assim, as linhas são montadas em uma matriz uint8 e
+    escritas de uma vez; se houver outras colunas, as linhas são unidas
+    como bytes. Campos que exigem aspas usam o caminho de texto.
+    """
+    fixas = [_texto_fixo(coluna) for coluna in colunas]
+    if not any(fixas) or not len(colunas[0]):
+        texto = codificar_colunas_csv(colunas, delimitador, separadorDecimal, precisao)
+        return texto.encode("utf-8")
+
+    especiais = _precisa_aspas(delimitador)
+    especiais_bytes = [caractere.encode("utf-8") for caractere in especiais]
+    conteudos = [
+        coluna.tobytes() if fixa else b"" for coluna, fixa in zip(colunas, fixas)
+    ]
+    # Preenchimento ('\x00') indica campos mais curtos que a largura da coluna
+    completas = all(b"\x00" not in conteudo for conteudo in conteudos)
+    if any(c in conteudo for conteudo in conteudos for c in especiais_bytes) or (
+        len(colunas) == 1 and not completas
+    ):
+        return codificar_colunas_csv(
+            [decodificar_textos(c) if f else c for c, f in zip(colunas, fixas)],
+            delimitador, separadorDecimal, precisao,
+        ).encode("utf-8")
+
+    separador = delimitador.encode("utf-8")
+    if all(fixas) and completas:
+        return _montar_linhas_fixas(colunas, separador)
+
+    campos = []
+    for coluna, fixa in zip(colunas, fixas):
+        if fixa:
+            campos.append(coluna.tolist())
+            continue
+        textos = formatar_coluna(coluna, separadorDecimal, precisao)
+        if _coluna_precisa_aspas(textos, especiais):
+            return codificar_colunas_csv(
+                [decodificar_textos(c) if f else c for c, f in zip(colunas, fixas)],
+                delimitador, separadorDecimal, precisao,
+            ).encode("utf-8")
+        # Sem quebras de linha (verificado acima), '\n' separa os campos com segurança
+        campos.append("\n".join(textos).encode("utf-8").split(b"\n"))
+    fim = FIM_DE_LINHA.encode("ascii")
+    return fim.join(map(separador.join, zip(*campos))) + fim
+
+
+def _montar_linhas_fixas(colunas: Sequence[np.ndarray], separador: bytes) -> bytes:
+    """Escreve as linhas de colunas 'S' sem preenchimento em uma matriz uint8."""
+    n = len(colunas[0])
+    fim = FIM_DE_LINHA.encode("ascii")
+    separadores = len(separador) * (len(colunas) - 1)
+    largura = sum(coluna.itemsize for coluna in colunas) + separadores + len(fim)
+    matriz = np.empty((n, largura), dtype=np.uint8)
+    posicao = 0
+    for indice, coluna in enumerate(colunas):
+        if indice:
+            bytes_separador = np.frombuffer(separador, dtype=np.uint8)
+            matriz[:, posicao:posicao + len(separador)] = bytes_separador
+            posicao += len(separador)
+        bytes_coluna = coluna.view(np.uint8).reshape(n, coluna.itemsize)
+        matriz[:, posicao:posicao + coluna.itemsize] = bytes_coluna
+        posicao += coluna.itemsize
+    matriz[:, posicao:] = np.frombuffer(fim, dtype=np.uint8)
+    return matriz.tobytes()
+
+
+def _cabecalho_csv(nomes_colunas: list[str], delimitador: str) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer, delimiter=delimitador).writerow(nomes_colunas)
+    return buffer.getvalue()
+
 
 def converter_para_csv_string(
-    dados: List[Dict[str, Any]],
-    nomes_colunas: List[str],
+    dados: DadosColunares | list[dict[str, Any]],
+    nomes_colunas: list[str],
     delimitador: str = ",",
-    separadorDecimal: str = "."
+    separadorDecimal: str = ".",
+    precisao: int | None = None,
 ) -> str:
     """
     Converte uma lista de dicionários em uma string formatada como CSV (RF04, RF09).
 
-    Usa um buffer de string em memória (StringIO) para construir o CSV.
+    As linhas são transpostas em colunas e codificadas pelo mesmo
+    codificador colunar usado no streaming. Dados colunares (de
+    'SistemaGerador.gerar_dados') são codificados direto das colunas.
     """
-    # io.StringIO() é um buffer de texto em memória.
-    # Funciona como um arquivo, mas sem tocar no disco.
-    buffer = io.StringIO()
+    if isinstance(dados, DadosColunares):
+        colunas = [dados.coluna(nome) for nome in nomes_colunas]
+    else:
+        colunas = [[linha.get(nome) for linha in dados] for nome in nomes_colunas]
+    return _cabecalho_csv(nomes_colunas, delimitador) + codificar_colunas_csv(
+        colunas, delimitador, separadorDecimal, precisao
+    )
 
-    # Usamos DictWriter para escrever o CSV a partir dos dicionários
-    # 'fieldnames' garante a ordem correta das colunas
-    # Adiciona o delimitador configurável
-    writer = csv.DictWriter(buffer, fieldnames=nomes_colunas, delimiter=delimitador)
-
-    # Escreve o cabeçalho (nomes das colunas)
-    writer.writeheader()
-
-    # Escreve todas as linhas de dados
-    for linha in dados:
-        linha_processada = {}
-        for chave, valor in linha.items():
-            if isinstance(valor, float):
-                # Substitui o separador decimal padrão por um configurável
-                linha_processada[chave] = str(valor).replace('.', separadorDecimal)
-            else:
-                linha_processada[chave] = valor
-        writer.writerow(linha_processada)
-
-    # Pega o valor completo do buffer como uma string
-    return buffer.getvalue()
+
+def gerar_csv_em_blocos(
+    lotes: Iterable[Sequence[np.ndarray | Sequence[Any]]],
+    nomes_colunas: list[str],
+    delimitador: str = ",",
+    separadorDecimal: str = ".",
+    precisao: int | None = None,
+    cabecalho: bytes | None = None,
+) -> Iterator[bytes]:
+    """
+    Codifica lotes colunares como CSV de forma incremental (RF04, RF09).
+
+    Recebe os lotes de 'SistemaGerador.gerar_lotes_colunares' e produz um
+    bloco de bytes UTF-8 para o cabeçalho e um para cada lote. Assim, a
+    memória usada fica limitada ao tamanho de um lote, e não ao arquivo inteiro.
+    O 'cabecalho' já codificado pode ser informado (ex: vindo do plano de
+    geração); vazio, o CSV sai sem cabeçalho (continuação de um arquivo).
+    """
+    if cabecalho is None:
+        cabecalho = _cabecalho_csv(nomes_colunas, delimitador).encode("utf-8")
+    if cabecalho:
+        yield cabecalho
+    for colunas in lotes:
+        yield codificar_colunas_csv_bytes(
+            colunas, delimitador, separadorDecimal, precisao
+        )
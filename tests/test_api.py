@@ -1,9 +1,54 @@
+import asyncio
+import gzip
+import io
 import json
+import os
+import threading
+import time
+import zipfile
+
+import numpy as np
+import pytest
 from fastapi.testclient import TestClient
+
+from src.gerador_dados import main
+from src.gerador_dados.cache import CacheResultados
+from src.gerador_dados.jobs import GerenciadorJobs, Job
 from src.gerador_dados.main import app
+from src.gerador_dados.modelos import ConfiguracaoCSV
 
 client = TestClient(app)
 
+
+@pytest.fixture(autouse=True)
+def cache_isolado(tmp_path, monkeypatch):
+    """Cada teste usa um cache de resultados vazio em uma pasta temporária."""
+    cache = CacheResultados(str(tmp_path / "cache"), tamanho_maximo=10 * 1024**2)
+    monkeypatch.setattr(main, "cache_resultados", cache)
+    return cache
+
+
+@pytest.fixture
+def jobs_isolados(tmp_path, monkeypatch):
+    """Gerenciador de jobs com uma pasta temporária e um único trabalhador."""
+    gerenciador = GerenciadorJobs(
+        str(tmp_path / "jobs"), max_trabalhadores=1, max_fila=1
+    )
+    monkeypatch.setattr(main, "gerenciador_jobs", gerenciador)
+    yield gerenciador
+    gerenciador.encerrar()
+
+
+def aguardar_job(id_job, timeout=10):
+    """Consulta o job até ele sair dos estados ativos."""
+    limite = time.time() + timeout
+    while time.time() < limite:
+        estado = client.get(f"/jobs/{id_job}").json()
+        if estado["estado"] not in ("na_fila", "executando"):
+            return estado
+        time.sleep(0.02)
+    raise AssertionError("O job não terminou a tempo.")
+
 def test_gerar_csv_caminho_feliz():
     """
     Testa o 'caminho feliz' da API, enviando uma configuração válida
@@ -163,3 +208,668 @@ def test_gerar_csv_com_separador_decimal_personalizado():
     assert lines[0] == "VALOR"
     assert lines[1] == "\"1,5\""
     assert lines[2] == "\"2,5\""
+
+
+def test_gerar_csv_em_varios_lotes():
+    """
+    Testa uma geração maior que o tamanho do lote, que é enviada
+    em vários blocos pelo streaming.
+    """
+    config = {
+        "numLinhas": 25_001,
+        "colunas": [
+            {
+                "nome": "SEQ",
+                "configGerador": {
+                    "tipoGerador": "linear",
+                    "valorInicial": 0,
+                    "incremento": 1,
+                },
+            }
+        ],
+    }
+
+    response = client.post("/gerar-csv", json=config)
+
+    assert response.status_code == 200
+    lines = response.text.strip().split('\r\n')
+
+    assert len(lines) == 25_002  # 1 cabeçalho + 25001 linhas
+    assert lines[1] == "0.0"
+    assert lines[-1] == "25000.0"
+
+
+def test_gerar_csv_com_semente_e_reprodutivel():
+    """A mesma configuração com 'semente' deve gerar exatamente o mesmo arquivo."""
+    with open("config/exemplo.json") as f:
+        config = json.load(f)
+    config["semente"] = 2024
+
+    primeira = client.post("/gerar-csv", json=config)
+    segunda = client.post("/gerar-csv", json=config)
+
+    assert primeira.status_code == 200
+    assert primeira.content == segunda.content
+
+    config["semente"] = 2025
+    assert client.post("/gerar-csv", json=config).content != primeira.content
+
+
+def test_gerar_csv_com_semente_usa_cache_e_etag(cache_isolado):
+    """
+    Configurações com semente são servidas do cache na segunda chamada e
+    respondem 304 quando o cliente já tem a versão atual (If-None-Match).
+    """
+    with open("config/exemplo.json") as f:
+        config = json.load(f)
+    config["semente"] = 1
+
+    primeira = client.post("/gerar-csv", json=config)
+    assert primeira.status_code == 200
+    assert primeira.headers["x-cache"] == "MISS"
+    etag = primeira.headers["etag"]
+
+    segunda = client.post("/gerar-csv", json=config)
+    assert segunda.status_code == 200
+    assert segunda.headers["x-cache"] == "HIT"
+    assert segunda.headers["etag"] == etag
+    assert "text/csv" in segunda.headers["content-type"]
+    assert segunda.content == primeira.content
+
+    nao_modificado = client.post(
+        "/gerar-csv", json=config, headers={"If-None-Match": etag}
+    )
+    assert nao_modificado.status_code == 304
+    assert nao_modificado.content == b""
+
+    estatisticas = client.get("/cache/estatisticas").json()
+    assert estatisticas["acertos"] == 1
+    assert estatisticas["falhas"] == 1
+    assert estatisticas["entradas"] == 1
+
+
+def test_acerto_do_cache_com_zerocopysend(cache_isolado):
+    """
+    Com a extensão ASGI 'zerocopysend', o acerto do cache é enviado do
+    arquivo já aberto (sendfile), mesmo que ele seja despejado no meio.
+    """
+    sem_codificacao = {"Accept-Encoding": "identity"}
+    primeira = client.post("/gerar-csv", json=CONFIG_NUMERICA, headers=sem_codificacao)
+    # Sem a extensão (TestClient, uvicorn), o arquivo aberto é lido em blocos
+    segunda = client.post("/gerar-csv", json=CONFIG_NUMERICA, headers=sem_codificacao)
+    assert segunda.headers["x-cache"] == "HIT"
+    assert segunda.headers["content-length"] == str(len(primeira.content))
+    assert segunda.content == primeira.content
+
+    chave = primeira.headers["etag"].strip('"')
+    arquivo = cache_isolado.abrir(chave)
+    resposta = main.RespostaArquivoAberto(arquivo, "text/csv", {"X-Cache": "HIT"})
+    os.remove(cache_isolado.caminho(chave))
+
+    mensagens, enviados = [], []
+
+    async def enviar(mensagem):
+        mensagens.append(mensagem)
+        if mensagem["type"] == "http.response.zerocopysend":
+            descritor = mensagem["file"].fileno()
+            enviados.append(os.pread(descritor, mensagem["count"], 0))
+
+    escopo = {"type": "http", "extensions": {"http.response.zerocopysend": {}}}
+    asyncio.run(resposta(escopo, None, enviar))
+
+    assert [mensagem["type"] for mensagem in mensagens] == [
+        "http.response.start", "http.response.zerocopysend",
+    ]
+    tamanho = str(len(primeira.content)).encode()
+    assert (b"content-length", tamanho) in mensagens[0]["headers"]
+    assert enviados == [primeira.content]
+    assert arquivo.closed
+
+
+def test_gerar_csv_sem_semente_nao_usa_cache(cache_isolado):
+    """Sem semente a saída é aleatória: nada de ETag nem cache."""
+    with open("config/exemplo.json") as f:
+        config = json.load(f)
+
+    response = client.post("/gerar-csv", json=config)
+
+    assert response.status_code == 200
+    assert "etag" not in response.headers
+    assert cache_isolado.estatisticas()["entradas"] == 0
+
+
+def test_job_assincrono_caminho_feliz(jobs_isolados):
+    """Cria um job, acompanha o progresso e baixa o resultado."""
+    with open("config/exemplo.json") as f:
+        config = json.load(f)
+
+    criado = client.post("/jobs", json=config)
+    assert criado.status_code == 202
+    id_job = criado.json()["id"]
+
+    estado = aguardar_job(id_job)
+    assert estado["estado"] == "concluido"
+    assert estado["linhasGeradas"] == 100
+    assert estado["percentual"] == 100
+
+    resultado = client.get(f"/jobs/{id_job}/resultado")
+    assert resultado.status_code == 200
+    assert "attachment" in resultado.headers["content-disposition"]
+    lines = resultado.text.strip().split('\r\n')
+    assert len(lines) == 101
+    assert lines[0] == "ID_USUARIO;PONTUACAO_RISCO;SEQUENCIA_LINEAR"
+
+    # Remover um job concluído apaga o job e o arquivo
+    assert client.delete(f"/jobs/{id_job}").status_code == 200
+    assert client.get(f"/jobs/{id_job}").status_code == 404
+
+
+def test_job_cancelamento_e_admissao(jobs_isolados):
+    """
+    Com 1 trabalhador e fila de 1, o terceiro job é recusado (503);
+    jobs cancelados liberam espaço e não produzem resultado.
+    """
+    config = {
+        "numLinhas": 5_000_000,
+        "colunas": [
+            {
+                "nome": "A",
+                "configGerador": {"tipoGerador": "regex", "expressao": "[a-z]{20}"},
+            }
+        ],
+    }
+
+    primeiro = client.post("/jobs", json=config).json()["id"]
+    segundo = client.post("/jobs", json=config).json()["id"]
+    recusado = client.post("/jobs", json=config)
+    assert recusado.status_code == 503
+
+    assert client.delete(f"/jobs/{segundo}").json()["estado"] == "cancelado"
+    client.delete(f"/jobs/{primeiro}")
+    assert aguardar_job(primeiro)["estado"] == "cancelado"
+    assert client.get(f"/jobs/{primeiro}/resultado").status_code == 409
+
+    assert client.get("/jobs/inexistente").status_code == 404
+
+
+def test_job_cancelado_ao_iniciar_nao_executa(jobs_isolados, tmp_path):
+    """
+    Um trabalhador que pega o job enquanto 'cancelar' o marca como
+    cancelado espera o lock e não o executa.
+    """
+    config = ConfiguracaoCSV.model_validate({
+        "numLinhas": 10,
+        "colunas": [
+            {"nome": "A", "configGerador": {"tipoGerador": "poisson", "media": 3}}
+        ],
+    })
+    job = Job(id="corrida", config=config, caminho=str(tmp_path / "corrida.csv"))
+
+    with jobs_isolados._lock:
+        trabalhador = threading.Thread(target=jobs_isolados._executar, args=(job,))
+        trabalhador.start()
+        time.sleep(0.05)
+        # Mesmas transições de 'cancelar' para um job na fila
+        job.cancelamento.set()
+        job.estado = "cancelado"
+        job.fim = time.time()
+    trabalhador.join(timeout=10)
+
+    assert job.estado == "cancelado"
+    assert job.inicio is None
+    assert not os.path.exists(job.caminho)
+
+
+def test_jobs_finalizados_sao_removidos(tmp_path, monkeypatch):
+    """
+    Jobs finalizados e seus arquivos saem da memória e do disco além do
+    limite e após a retenção.
+    """
+    gerenciador = GerenciadorJobs(
+        str(tmp_path / "jobs"), max_trabalhadores=1, max_fila=4, max_finalizados=2
+    )
+    monkeypatch.setattr(main, "gerenciador_jobs", gerenciador)
+    config = {
+        "numLinhas": 10,
+        "colunas": [
+            {"nome": "A", "configGerador": {"tipoGerador": "poisson", "media": 3}}
+        ],
+    }
+    try:
+        ids = []
+        for _ in range(3):
+            ids.append(client.post("/jobs", json=config).json()["id"])
+            assert aguardar_job(ids[-1])["estado"] == "concluido"
+        # Passou do limite de 2 finalizados: o mais antigo é removido, com o arquivo
+        assert client.get(f"/jobs/{ids[0]}").status_code == 404
+        assert client.get(f"/jobs/{ids[2]}/resultado").status_code == 200
+        assert sorted(os.listdir(tmp_path / "jobs")) == sorted(
+            f"{id_job}.csv" for id_job in ids[1:]
+        )
+
+        # Depois da retenção, nada fica para trás
+        gerenciador.retencao = 0
+        assert client.get(f"/jobs/{ids[2]}").status_code == 404
+        assert os.listdir(tmp_path / "jobs") == []
+    finally:
+        gerenciador.encerrar()
+
+
+CONFIG_NUMERICA = {
+    "numLinhas": 25_000,
+    "semente": 3,
+    "colunas": [
+        {
+            "nome": "RISCO",
+            "configGerador": {
+                "tipoGerador": "gaussiano",
+                "media": 150.5,
+                "desvioPadrao": 25.0,
+            },
+        },
+        {
+            "nome": "SEQ",
+            "configGerador": {
+                "tipoGerador": "linear",
+                "valorInicial": 10,
+                "incremento": 0.5,
+            },
+        },
+    ],
+}
+
+
+def test_gerar_npy_e_npz():
+    """Configurações numéricas podem ser baixadas como .npy e .npz (float64)."""
+    csv_texto = client.post("/gerar-csv", json=CONFIG_NUMERICA).text
+    risco_csv = [
+        float(linha.split(",")[0]) for linha in csv_texto.strip().split("\r\n")[1:]
+    ]
+
+    npy = client.post("/gerar-csv", json={**CONFIG_NUMERICA, "formato": "npy"})
+    assert npy.status_code == 200
+    assert "dados_sinteticos.npy" in npy.headers["content-disposition"]
+    matriz = np.load(io.BytesIO(npy.content))
+    assert matriz.shape == (25_000, 2)
+    assert matriz.dtype == np.float64
+    assert matriz[:, 0].tolist() == risco_csv
+    assert matriz[-1, 1] == 10 + 24_999 * 0.5
+
+    npz = client.post("/gerar-csv", json={**CONFIG_NUMERICA, "formato": "npz"})
+    assert npz.status_code == 200
+    arquivos = np.load(io.BytesIO(npz.content))
+    # A geração por coluna produz os mesmos valores da geração por linhas
+    assert arquivos["RISCO"].tolist() == risco_csv
+    assert np.array_equal(arquivos["SEQ"], matriz[:, 1])
+
+
+def test_formato_npy_rejeita_colunas_textuais():
+    """Os formatos NumPy exigem colunas numéricas (erro de validação 422)."""
+    with open("config/exemplo.json") as f:
+        config = json.load(f)
+    config["formato"] = "npy"
+
+    response = client.post("/gerar-csv", json=config)
+
+    assert response.status_code == 422
+    assert "apenas colunas numéricas" in response.text
+
+
+@pytest.mark.parametrize("formato", ["parquet", "arrow"])
+def test_gerar_parquet_e_arrow(formato):
+    """
+    Parquet e Arrow IPC têm colunas tipadas e row groups/batches limitados
+    ao lote.
+    """
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+
+    with open("config/exemplo.json") as f:
+        config = json.load(f)
+    config["numLinhas"] = 25_000
+    config["formato"] = formato
+
+    response = client.post("/gerar-csv", json=config)
+    assert response.status_code == 200
+
+    if formato == "parquet":
+        arquivo = pq.ParquetFile(io.BytesIO(response.content))
+        assert arquivo.metadata.num_row_groups == 3  # 10000 + 10000 + 5000
+        tabela = arquivo.read()
+    else:
+        tabela = pa.ipc.open_stream(response.content).read_all()
+
+    assert tabela.num_rows == 25_000
+    assert tabela.schema.field("ID_USUARIO").type == pa.string()
+    assert tabela.schema.field("PONTUACAO_RISCO").type == pa.float64()
+    assert tabela.column("SEQUENCIA_LINEAR")[1].as_py() == 10.5
+
+
+def test_gerar_distribuicoes_adicionais():
+    """As distribuições do RF08 chegam ao CSV e ao Arrow com os tipos corretos."""
+    pa = pytest.importorskip("pyarrow")
+    config = {
+        "numLinhas": 1_000,
+        "semente": 2,
+        "colunas": [
+            {"nome": "U", "configGerador": {
+                "tipoGerador": "uniforme", "minimo": -1, "maximo": 1}},
+            {"nome": "E", "configGerador": {"tipoGerador": "exponencial", "taxa": 2}},
+            {"nome": "L", "configGerador": {
+                "tipoGerador": "lognormal", "media": 0, "desvioPadrao": 1}},
+            {"nome": "P", "configGerador": {"tipoGerador": "poisson", "media": 3}},
+            {"nome": "C", "configGerador": {
+                "tipoGerador": "categorico", "categorias": ["a", "b"],
+                "pesos": [1, 3]}},
+        ],
+    }
+
+    response = client.post("/gerar-csv", json=config)
+    assert response.status_code == 200
+    linhas = response.text.splitlines()
+    assert linhas[0] == "U,E,L,P,C"
+    u, e, ln, p, c = linhas[1].split(",")
+    assert -1 <= float(u) < 1 and float(e) >= 0 and float(ln) > 0
+    assert p.isdigit() and c in ("a", "b")
+
+    response = client.post("/gerar-csv", json={**config, "formato": "arrow"})
+    tabela = pa.ipc.open_stream(response.content).read_all()
+    assert tabela.schema.field("P").type == pa.int64()
+    assert tabela.schema.field("U").type == pa.float64()
+    assert tabela.schema.field("C").type == pa.string()
+
+    config["colunas"][0]["configGerador"]["maximo"] = -1
+    response = client.post("/gerar-csv", json=config)
+    assert response.status_code == 422
+    assert "'maximo' deve ser maior que 'minimo'" in response.text
+
+
+def test_gerar_csv_com_colunas_correlacionadas():
+    """
+    'correlacoes' gera colunas gaussianas correlacionadas; uma coluna
+    inexistente é 422.
+    """
+    config = {
+        **CONFIG_NUMERICA,
+        "colunas": CONFIG_NUMERICA["colunas"] + [
+            {"nome": "VALOR", "configGerador": {
+                "tipoGerador": "gaussiano", "media": 10, "desvioPadrao": 2}},
+        ],
+        "correlacoes": [
+            {"colunas": ["RISCO", "VALOR"], "correlacao": [[1, 0.9], [0.9, 1]]}
+        ],
+    }
+
+    response = client.post("/gerar-csv", json={**config, "formato": "npy"})
+    assert response.status_code == 200
+    matriz = np.load(io.BytesIO(response.content))
+    assert np.corrcoef(matriz[:, 0], matriz[:, 2])[0, 1] == pytest.approx(0.9, abs=0.01)
+
+    config["correlacoes"][0]["colunas"] = ["RISCO", "NAO_EXISTE"]
+    response = client.post("/gerar-csv", json=config)
+    assert response.status_code == 422
+    assert "Coluna de correlação inexistente" in response.text
+
+
+def test_gerar_csv_com_colunas_derivadas():
+    """
+    Colunas 'expressao' são calculadas a partir das demais; fórmulas
+    inválidas são 422.
+    """
+    config = {
+        "numLinhas": 1_000,
+        "semente": 4,
+        "colunas": [
+            {"nome": "PEDIDO", "configGerador": {
+                "tipoGerador": "expressao",
+                "formula": '"PED-" + preencher(texto(inteiro(SEQ)), 6)',
+            }},
+            {"nome": "SEQ", "configGerador": {
+                "tipoGerador": "linear", "valorInicial": 1, "incremento": 1}},
+            {"nome": "PRECO", "configGerador": {
+                "tipoGerador": "uniforme", "minimo": 1, "maximo": 50}},
+            {"nome": "QTD", "configGerador": {"tipoGerador": "poisson", "media": 3}},
+            {"nome": "TOTAL", "configGerador": {
+                "tipoGerador": "expressao", "formula": "PRECO * QTD"}},
+        ],
+    }
+
+    response = client.post("/gerar-csv", json=config)
+    assert response.status_code == 200
+    linhas = [linha.split(",") for linha in response.text.splitlines()]
+    assert linhas[0] == ["PEDIDO", "SEQ", "PRECO", "QTD", "TOTAL"]
+    pedidos = [linha[0] for linha in linhas[1:4]]
+    assert pedidos == ["PED-000001", "PED-000002", "PED-000003"]
+    for _, _, preco, qtd, total in linhas[1:]:
+        assert float(total) == pytest.approx(float(preco) * int(qtd))
+
+    config["colunas"][4]["configGerador"]["formula"] = "open('/etc/passwd')"
+    response = client.post("/gerar-csv", json=config)
+    assert response.status_code == 422
+    assert "Função não permitida" in response.text
+
+    # Fórmulas aninhadas demais ou com parâmetros tirados de colunas também são 422
+    for formula in ["-" * 999 + "PRECO", "preencher(texto(QTD), inteiro(PRECO))"]:
+        config["colunas"][4]["configGerador"]["formula"] = formula
+        assert client.post("/gerar-csv", json=config).status_code == 422
+        assert client.post("/jobs", json=config).status_code == 422
+
+
+def test_pre_visualizar_primeiras_linhas():
+    """/pre-visualizar devolve as primeiras linhas do arquivo, sem gerar as demais."""
+    config = {
+        "numLinhas": 50_000_000,
+        "semente": 11,
+        "colunas": [
+            {"nome": "ID", "configGerador": {
+                "tipoGerador": "regex", "expressao": "[A-Z]{4}"}},
+            {"nome": "RISCO", "configGerador": {
+                "tipoGerador": "gaussiano", "media": 0, "desvioPadrao": 1}},
+            {"nome": "LOG", "configGerador": {
+                "tipoGerador": "expressao", "formula": "log(RISCO)"}},
+        ],
+    }
+
+    response = client.post("/pre-visualizar?linhas=5", json=config)
+    assert response.status_code == 200
+    amostra = response.json()
+    assert amostra["colunas"] == ["ID", "RISCO", "LOG"]
+    assert amostra["numLinhas"] == 50_000_000
+    assert len(amostra["linhas"]) == 5
+    # Logaritmo de negativos: NaN vira null
+    assert all((linha[2] is None) == (linha[1] <= 0) for linha in amostra["linhas"])
+
+    resposta = client.post("/gerar-csv", json={**config, "numLinhas": 5})
+    completo = resposta.text.splitlines()[1:]
+    assert [linha.split(",")[:2] for linha in completo] == [
+        [identificador, repr(risco)] for identificador, risco, _ in amostra["linhas"]
+    ]
+
+    curta = client.post("/pre-visualizar", json={**config, "numLinhas": 3}).json()
+    assert len(curta["linhas"]) == 3
+    assert client.post("/pre-visualizar?linhas=100000", json=config).status_code == 422
+
+
+def test_gerar_ndjson():
+    """formato 'ndjson' transmite um objeto JSON por linha, lote a lote."""
+    response = client.post("/gerar-csv", json={**CONFIG_NUMERICA, "formato": "ndjson"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert "dados_sinteticos.ndjson" in response.headers["content-disposition"]
+
+    linhas = [json.loads(linha) for linha in response.text.splitlines()]
+    csv_texto = client.post("/gerar-csv", json=CONFIG_NUMERICA).text.splitlines()
+    assert len(linhas) == CONFIG_NUMERICA["numLinhas"]
+    assert list(linhas[0]) == ["RISCO", "SEQ"]
+    como_csv = [f"{linha['RISCO']!r},{linha['SEQ']!r}" for linha in linhas[:100]]
+    assert como_csv == csv_texto[1:101]
+
+
+def test_gerar_csv_com_compressao_gzip():
+    """'compressao' gera um arquivo .csv.gz, comprimido em streaming."""
+    descomprimido = client.post("/gerar-csv", json=CONFIG_NUMERICA).content
+
+    response = client.post("/gerar-csv", json={**CONFIG_NUMERICA, "compressao": "gzip"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/gzip"
+    assert "dados_sinteticos.csv.gz" in response.headers["content-disposition"]
+    assert "content-encoding" not in response.headers
+    assert len(response.content) < len(descomprimido)
+    assert gzip.decompress(response.content).splitlines()[0] == b"RISCO,SEQ"
+
+
+def test_gerar_csv_negocia_accept_encoding(cache_isolado):
+    """Sem 'compressao', o CSV é comprimido conforme o Accept-Encoding do cliente."""
+    config = {**CONFIG_NUMERICA, "semente": 3}
+
+    sem_compressao = client.post(
+        "/gerar-csv", json=config, headers={"Accept-Encoding": "identity"}
+    )
+    assert "content-encoding" not in sem_compressao.headers
+    assert sem_compressao.headers["vary"] == "Accept-Encoding"
+
+    for _ in range(2):  # MISS e depois HIT (o cache guarda a versão sem compressão)
+        comprimido = client.post(
+            "/gerar-csv", json=config, headers={"Accept-Encoding": "gzip"}
+        )
+        assert comprimido.headers["content-encoding"] == "gzip"
+        assert comprimido.headers["etag"] != sem_compressao.headers["etag"]
+        # O httpx descomprime automaticamente o Content-Encoding
+        assert comprimido.content == sem_compressao.content
+    assert comprimido.headers["x-cache"] == "HIT"
+
+    estatisticas = client.get("/compressao/estatisticas").json()
+    assert estatisticas["fluxos"] >= 2
+    assert estatisticas["razao"] > 1
+
+
+def test_compressao_zstd_sem_dependencia():
+    """Sem o pacote 'zstandard', pedir 'zstd' é um erro 400 explicativo."""
+    try:
+        import zstandard  # noqa: F401
+        pytest.skip("zstandard instalado")
+    except ImportError:
+        pass
+
+    response = client.post("/gerar-csv", json={**CONFIG_NUMERICA, "compressao": "zstd"})
+
+    assert response.status_code == 400
+    assert "zstandard" in response.text
+
+
+def test_metricas_e_server_timing():
+    """/gerar-csv informa o Server-Timing e alimenta as métricas do /metrics."""
+    response = client.post("/gerar-csv", json=CONFIG_NUMERICA)
+    assert response.status_code == 200
+    etapas = [
+        item.split(";")[0] for item in response.headers["server-timing"].split(", ")
+    ]
+    # Com semente, a consulta ao cache também é uma etapa
+    assert etapas == ["validacao", "cache", "construcao"]
+
+    metricas = client.get("/metrics")
+    assert metricas.status_code == 200
+    assert metricas.headers["content-type"].startswith("text/plain; version=0.0.4")
+    texto = metricas.text
+    assert "# TYPE gerador_etapa_segundos summary" in texto
+    for etapa in ("validacao", "construcao", "geracao", "codificacao", "envio"):
+        assert f'gerador_etapa_segundos_count{{etapa="{etapa}"}}' in texto
+    assert 'gerador_coluna_segundos_sum{tipoGerador="gaussiano"}' in texto
+    assert 'gerador_valores_total{tipoGerador="linear"}' in texto
+    assert "gerador_memoria_pico_bytes" in texto
+    assert "gerador_cache_acertos_total" in texto
+    # A própria requisição de /metrics está em andamento durante a coleta
+    assert "gerador_requisicoes_em_andamento 1.0" in texto
+    assert 'rota="/gerar-csv",status="200"' in texto
+
+
+def test_planos_compilados_sao_reaproveitados():
+    """
+    Requisições repetidas reaproveitam o plano; corpos inválidos continuam
+    com 422.
+    """
+    config = {**CONFIG_NUMERICA, "numLinhas": 7}
+    antes = client.get("/planos/estatisticas").json()
+
+    primeira = client.post("/gerar-csv", json=config)
+    segunda = client.post("/gerar-csv", json=config)
+
+    assert primeira.content == segunda.content
+    depois = client.get("/planos/estatisticas").json()
+    assert depois["falhas"] == antes["falhas"] + 1
+    assert depois["acertos"] == antes["acertos"] + 1
+
+    response = client.post(
+        "/gerar-csv",
+        content=b"{nao e json",
+        headers={"Content-Type": "application/json"},
+    )
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"][0] == "body"
+    response = client.post("/gerar-csv", json={**config, "numLinhas": 0})
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", "numLinhas"]
+
+
+def test_gerar_csv_com_coluna_unica():
+    """Uma coluna 'unico' gera chaves distintas; linguagem pequena demais é 422."""
+    config = {
+        "numLinhas": 20_000,
+        "colunas": [{
+            "nome": "ID", "unico": True,
+            "configGerador": {"tipoGerador": "regex", "expressao": "ID[0-9]{5}"},
+        }],
+    }
+
+    response = client.post("/gerar-csv", json=config)
+    assert response.status_code == 200
+    valores = response.text.splitlines()[1:]
+    assert len(valores) == len(set(valores)) == 20_000
+
+    response = client.post("/gerar-csv", json={**config, "numLinhas": 100_001})
+    assert response.status_code == 422
+    assert "no máximo 100000 valores distintos" in response.text
+
+
+def test_gerar_esquema_zip_com_uma_tabela_por_csv():
+    """
+    /gerar-esquema transmite um zip com um CSV por tabela, com chaves
+    estrangeiras válidas.
+    """
+    esquema = {
+        "semente": 3,
+        "compressao": "deflate",
+        "tabelas": [
+            {"nome": "pedidos", "numLinhas": 5_000, "delimitador": ";", "colunas": [
+                {"nome": "ID_USUARIO", "configGerador": {
+                    "tipoGerador": "referencia", "tabela": "usuarios",
+                    "coluna": "ID_USUARIO", "distribuicao": "zipf"}},
+                {"nome": "VALOR", "configGerador": {
+                    "tipoGerador": "lognormal", "media": 4, "desvioPadrao": 0.5}},
+            ]},
+            {"nome": "usuarios", "numLinhas": 200, "colunas": [
+                {"nome": "ID_USUARIO", "unico": True, "configGerador": {
+                    "tipoGerador": "regex", "expressao": r"\d{6}"}},
+            ]},
+        ],
+    }
+    response = client.post("/gerar-esquema", json=esquema)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/zip"
+    assert "dados_sinteticos.zip" in response.headers["content-disposition"]
+
+    with zipfile.ZipFile(io.BytesIO(response.content)) as arquivo_zip:
+        assert arquivo_zip.namelist() == ["usuarios.csv", "pedidos.csv"]
+        usuarios = arquivo_zip.read("usuarios.csv").decode().splitlines()
+        pedidos = arquivo_zip.read("pedidos.csv").decode().splitlines()
+    assert usuarios[0] == "ID_USUARIO" and pedidos[0] == "ID_USUARIO;VALOR"
+    assert len(pedidos) == 5_001
+    assert {linha.split(";")[0] for linha in pedidos[1:]} <= set(usuarios[1:])
+
+    assert client.post("/gerar-esquema", json=esquema).content == response.content
+
+    esquema["tabelas"][1]["colunas"][0]["unico"] = False
+    assert client.post("/gerar-esquema", json=esquema).status_code == 422
+    # Fora de um esquema, 'referencia' é rejeitada
+    assert client.post("/gerar-csv", json=esquema["tabelas"][0]).status_code == 422
@@ -0,0 +1,261 @@
+import csv
+import io
+import json
+import re
+from typing import get_args
+
+import numpy as np
+import pytest
+
+from src.gerador_dados import cli
+from src.gerador_dados.cli import main
+from src.gerador_dados.formatos import gerar_em_formato
+from src.gerador_dados.modelos import CompressaoSaida, ConfiguracaoCSV, FormatoSaida
+from src.gerador_dados.perfilador import main as main_perfil
+from src.gerador_dados.servicos import SistemaGerador
+
+CONFIG_NUMERICA = {
+    "numLinhas": 25_000,
+    "semente": 11,
+    "colunas": [
+        {"nome": "RISCO", "configGerador": {
+            "tipoGerador": "gaussiano", "media": 150.5, "desvioPadrao": 25.0,
+        }},
+        {"nome": "SEQ", "configGerador": {
+            "tipoGerador": "linear", "valorInicial": 10, "incremento": 0.5,
+        }},
+    ],
+}
+
+
+@pytest.fixture
+def config_numerica(tmp_path):
+    caminho = tmp_path / "numerico.json"
+    caminho.write_text(json.dumps(CONFIG_NUMERICA))
+    return str(caminho)
+
+
+def gerar_em_memoria(
+    config: dict, processos: int = 1, tamanho: int = 10_000
+) -> bytes:
+    config_csv = ConfiguracaoCSV.model_validate(config)
+    sistema = SistemaGerador(config_csv, processos=processos)
+    return b"".join(gerar_em_formato(sistema, tamanho))
+
+
+def test_cli_gera_arquivo_igual_ao_da_api(tmp_path, capsys):
+    """O arquivo da CLI é idêntico à resposta do servidor para a mesma configuração."""
+    saida = tmp_path / "dados.csv"
+
+    assert main([
+        "config/exemplo.json", "--linhas", "30000", "--semente", "5", "-o", str(saida),
+    ]) == 0
+
+    with open("config/exemplo.json") as f:
+        config = {**json.load(f), "numLinhas": 30_000, "semente": 5}
+    assert saida.read_bytes() == gerar_em_memoria(config)
+    assert "linhas/s" in capsys.readouterr().err
+
+
+def test_cli_escreve_no_stdout(capsysbinary):
+    """Com '-o -' (padrão) o arquivo vai para o stdout e o resumo para o stderr."""
+    assert main(["config/exemplo.json", "--linhas", "3", "--semente", "1"]) == 0
+
+    saida = capsysbinary.readouterr()
+    linhas = saida.out.decode().splitlines()
+    assert linhas[0] == "ID_USUARIO;PONTUACAO_RISCO;SEQUENCIA_LINEAR"
+    assert len(linhas) == 4
+    assert b"linhas/s" in saida.err
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_cli_partes_independem_dos_workers(tmp_path, config_numerica, workers):
+    """
+    As partes têm tamanho fixo e juntas equivalem ao modo paralelo com
+    lotes do tamanho da parte, qualquer que seja o número de workers.
+    """
+    diretorio = tmp_path / "partes"
+
+    assert main([
+        config_numerica, "--linhas-por-parte", "10000", "--workers", str(workers),
+        "-o", str(diretorio),
+    ]) == 0
+
+    partes = sorted(diretorio.iterdir())
+    assert [p.name for p in partes] == [f"parte-{i:05d}.csv" for i in range(3)]
+    linhas = []
+    for parte in partes:
+        leitor = csv.reader(io.StringIO(parte.read_text()))
+        assert next(leitor) == ["RISCO", "SEQ"]  # cada parte tem seu cabeçalho
+        linhas.extend(leitor)
+    assert len(linhas) == 25_000
+    assert float(linhas[-1][1]) == 10 + 24_999 * 0.5
+
+    esperado = gerar_em_memoria(CONFIG_NUMERICA, processos=2, tamanho=10_000)
+    recompostas = ["RISCO,SEQ"] + [",".join(linha) for linha in linhas]
+    assert recompostas == esperado.decode().splitlines()
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_cli_npy_via_mmap(tmp_path, config_numerica, workers):
+    """O .npy pré-alocado e preenchido via mmap é igual ao gerado em streaming."""
+    saida = tmp_path / "matriz.npy"
+
+    assert main([
+        config_numerica, "--formato", "npy", "--workers", str(workers),
+        "-o", str(saida),
+    ]) == 0
+
+    esperado = gerar_em_memoria(
+        {**CONFIG_NUMERICA, "formato": "npy"}, processos=workers
+    )
+    assert saida.read_bytes() == esperado
+    assert np.load(saida).shape == (25_000, 2)
+
+
+def test_cli_configuracao_invalida(tmp_path, capsys):
+    """Erros de validação encerram a CLI com código 2 e a mensagem do Pydantic."""
+    with pytest.raises(SystemExit) as erro:
+        main(["config/exemplo.json", "--formato", "npy", "-o", str(tmp_path / "x.npy")])
+
+    assert erro.value.code == 2
+    assert "apenas colunas numéricas" in capsys.readouterr().err
+
+
+def test_cli_opcoes_seguem_o_modelo():
+    """As escolhas de --formato e --compressao vêm dos literais de 'modelos'."""
+    opcoes = {acao.dest: acao.choices for acao in cli._criar_parser()._actions}
+    assert list(opcoes["formato"]) == list(get_args(FormatoSaida))
+    assert list(opcoes["compressao"]) == list(get_args(CompressaoSaida))
+
+
+def test_cli_retoma_geracao_interrompida(tmp_path, monkeypatch):
+    """
+    Uma geração interrompida e retomada do último checkpoint produz o
+    mesmo arquivo que uma geração ininterrupta com a mesma semente.
+    """
+    saida, checkpoint = tmp_path / "dados.csv", tmp_path / "dados.ckpt"
+    argumentos = [
+        "config/exemplo.json", "--linhas", "50000", "--semente", "3",
+        "--tamanho-lote", "4000", "--checkpoint", str(checkpoint),
+        "--checkpoint-a-cada", "10000", "--retomar", "-o", str(saida),
+    ]
+    gerar_em_formato_original = cli.gerar_em_formato
+
+    def interromper(*args, **kwargs):
+        for numero, bloco in enumerate(gerar_em_formato_original(*args, **kwargs)):
+            if numero == 8:
+                raise KeyboardInterrupt  # ex: o processo é encerrado
+            yield bloco
+
+    monkeypatch.setattr(cli, "gerar_em_formato", interromper)
+    with pytest.raises(KeyboardInterrupt):
+        main(argumentos)
+    salvo = json.loads(checkpoint.read_text())
+    # Checkpoints nos lotes que passam de 10.000 linhas do anterior: 12.000 e 24.000
+    assert salvo["linhas"] == 24_000
+    assert saida.stat().st_size > salvo["bytes"]  # o 7º lote foi escrito depois dele
+
+    monkeypatch.undo()
+    assert main(argumentos) == 0
+
+    with open("config/exemplo.json") as f:
+        config = {**json.load(f), "numLinhas": 50_000, "semente": 3}
+    assert saida.read_bytes() == gerar_em_memoria(config, tamanho=4000)
+    assert json.loads(checkpoint.read_text())["linhas"] == 50_000
+
+
+def test_cli_anexa_linhas_continuando_a_geracao(tmp_path):
+    """
+    Após lotes completos, '--anexar' estende o arquivo como se ele tivesse
+    sido gerado de uma vez.
+    """
+    saida, checkpoint = tmp_path / "dados.csv", tmp_path / "dados.ckpt"
+    base = ["config/exemplo.json", "--checkpoint", str(checkpoint), "-o", str(saida)]
+
+    assert main(base + ["--linhas", "20000"]) == 0
+    assert main(base + ["--linhas", "15000", "--anexar"]) == 0
+
+    with open("config/exemplo.json") as f:
+        config = json.load(f)
+    linhas = saida.read_text().splitlines()
+    assert len(linhas) == 1 + 35_000
+    assert linhas[-1].split(";")[2] == "17509,5"  # 10 + 34.999 * 0,5
+
+    # Sem semente, a entropia sorteada na primeira execução fica no checkpoint
+    entropia = json.loads(checkpoint.read_text())["estado"]["entropia"]
+    sistema = SistemaGerador(
+        ConfiguracaoCSV.model_validate({**config, "numLinhas": 35_000}),
+        semente=np.random.SeedSequence(entropia),
+    )
+    assert saida.read_bytes() == b"".join(gerar_em_formato(sistema))
+
+    # Outra configuração (além de 'numLinhas') não continua o arquivo
+    with pytest.raises(SystemExit) as erro:
+        main(base + ["--linhas", "10", "--anexar", "--formato", "ndjson"])
+    assert erro.value.code == 1
+
+
+
+def test_cli_anexa_depois_de_lote_parcial(tmp_path):
+    """
+    Depois de um lote parcial, '--anexar' continua exatamente só as colunas
+    posicionais: a regex de comprimento variável depende da divisão em lotes.
+    """
+    config = tmp_path / "config.json"
+    config.write_text(json.dumps({"semente": 5, "colunas": [
+        {"nome": "COD", "configGerador": {
+            "tipoGerador": "regex", "expressao": "[a-z]{1,8}"}},
+        {"nome": "SEQ", "configGerador": {
+            "tipoGerador": "linear", "valorInicial": 1, "incremento": 1}},
+    ]}))
+    saida, checkpoint = tmp_path / "dados.csv", tmp_path / "dados.ckpt"
+    base = [
+        str(config), "--checkpoint", str(checkpoint), "--tamanho-lote", "10",
+        "-o", str(saida),
+    ]
+
+    assert main(base + ["--linhas", "15"]) == 0
+    assert main(base + ["--linhas", "15", "--anexar"]) == 0
+
+    linhas = list(csv.reader(io.StringIO(saida.read_text())))[1:]
+    unica = list(csv.reader(io.StringIO(gerar_em_memoria(
+        json.loads(config.read_text()) | {"numLinhas": 30}, tamanho=10
+    ).decode())))[1:]
+    sequencia = [f"{i}.0" for i in range(1, 31)]
+    assert [seq for _, seq in linhas] == [seq for _, seq in unica] == sequencia
+    assert all(re.fullmatch("[a-z]{1,8}", cod) for cod, _ in linhas)
+    assert [cod for cod, _ in linhas] != [cod for cod, _ in unica]
+
+
+def test_cli_perfil_gera_configuracao_para_copia(tmp_path, capsys):
+    """O JSON do perfilador é uma configuração válida para o próprio 'gerador-dados'."""
+    original = tmp_path / "original.csv.gz"
+    config, copia = tmp_path / "config.json", tmp_path / "copia.csv"
+    assert main([
+        "config/exemplo.json", "--linhas", "5000", "--compressao", "gzip",
+        "-o", str(original),
+    ]) == 0
+
+    assert main_perfil([
+        str(original), "--delimitador", ";", "--separador-decimal", ",",
+        "-o", str(config),
+    ]) == 0
+    assert "5,000 linhas, 3 colunas" in capsys.readouterr().err
+
+    inferida = json.loads(config.read_text())
+    tipos = [c["configGerador"]["tipoGerador"] for c in inferida["colunas"]]
+    assert tipos == ["regex", "gaussiano", "linear"]
+    assert main([str(config), "--linhas", "100", "-o", str(copia)]) == 0
+    cabecalho = copia.read_text().splitlines()[0]
+    assert cabecalho == "ID_USUARIO;PONTUACAO_RISCO;SEQUENCIA_LINEAR"
+
+
+def test_cli_perfil_csv_invalido(tmp_path, capsys):
+    """Linhas com um número de campos diferente do cabeçalho são rejeitadas."""
+    entrada = tmp_path / "ruim.csv"
+    entrada.write_text("A,B\n1,2\n3\n")
+    with pytest.raises(SystemExit) as erro:
+        main_perfil([str(entrada)])
+    assert erro.value.code == 1
+    assert "A linha 3 tem 1 campos" in capsys.readouterr().err
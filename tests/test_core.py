@@ -1,9 +1,70 @@
-import pytest
+import io
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+import tracemalloc
 from unittest.mock import Mock
-from src.gerador_dados.modelos import ConfigGeradorRegex, ConfigGeradorGaussiano, ConfigGeradorLinear, ConfiguracaoColuna, ConfiguracaoCSV
-from src.gerador_dados.geradores import GeradorRegex, GeradorGaussiano, GeradorLinear
-from src.gerador_dados.servicos import get_gerador, SistemaGerador
-from src.gerador_dados.utils_csv import converter_para_csv_string
+
+import numpy as np
+import pytest
+
+from src.gerador_dados import metricas, servicos
+from src.gerador_dados.cache import CacheResultados, chave_configuracao, ler_em_blocos
+from src.gerador_dados.colunar import DadosColunares
+from src.gerador_dados.compressao import (
+    comprimir_fluxo,
+    negociar_codificacao,
+    zstd_disponivel,
+)
+from src.gerador_dados.expressoes import (
+    ErroExpressao,
+    compilar_formula,
+    ordem_topologica,
+)
+from src.gerador_dados.geradores import (
+    GeradorCategorico,
+    GeradorGaussiano,
+    GeradorLinear,
+    GeradorRegex,
+)
+from src.gerador_dados.metricas import RegistroMetricas, registro_metricas
+from src.gerador_dados.modelos import (
+    ConfigGeradorCategorico,
+    ConfigGeradorExponencial,
+    ConfigGeradorGaussiano,
+    ConfigGeradorLinear,
+    ConfigGeradorLogNormal,
+    ConfigGeradorPoisson,
+    ConfigGeradorRegex,
+    ConfigGeradorUniforme,
+    ConfiguracaoColuna,
+    ConfiguracaoCSV,
+    EsquemaRelacional,
+)
+from src.gerador_dados.perfilador import inferir_regex, perfilar_csv
+from src.gerador_dados.regex_compilado import (
+    PadraoNaoSuportado,
+    ProgramaRegex,
+    compilar_regex,
+)
+from src.gerador_dados.relacional import GeradorEsquema
+from src.gerador_dados.servicos import (
+    CachePlanos,
+    SistemaGerador,
+    gerar_shard,
+    get_gerador,
+    iniciar_processo_shards,
+)
+from src.gerador_dados.unicidade import FiltroBloom, PermutacaoFeistel
+from src.gerador_dados.utils_csv import (
+    codificar_colunas_csv,
+    codificar_colunas_csv_bytes,
+    converter_para_csv_string,
+    gerar_csv_em_blocos,
+)
 
 # Testes para as Strategies (Geradores)
 
@@ -33,6 +94,142 @@ def test_gerador_linear():
     assert gerador.gerarValor() == 14
 
 
+def test_gerador_gaussiano_lote():
+    """Testa a geração vetorizada de um lote gaussiano."""
+    config = ConfigGeradorGaussiano(media=100, desvioPadrao=10)
+    gerador = GeradorGaussiano(config)
+    lote = gerador.gerarLote(10_000)
+    assert lote.shape == (10_000,)
+    # Com 10 mil amostras, a média amostral fica muito próxima da média
+    assert abs(lote.mean() - 100) < 1
+
+
+def test_gerador_linear_lote_continua_sequencia():
+    """Lotes e chamadas unitárias compartilham a mesma sequência linear."""
+    config = ConfigGeradorLinear(valorInicial=10, incremento=2)
+    gerador = GeradorLinear(config)
+    assert gerador.gerarLote(3).tolist() == [10, 12, 14]
+    assert gerador.gerarValor() == 16
+    assert gerador.gerarLote(2).tolist() == [18, 20]
+
+
+def test_gerador_regex_lote_padrao():
+    """Geradores sem versão vetorizada usam a implementação padrão da ABC."""
+    gerador = GeradorRegex(ConfigGeradorRegex(expressao=r'\d{3}'))
+    lote = gerador.gerarLote(4)
+    assert len(lote) == 4
+    assert all(len(v) == 3 and v.isdigit() for v in lote)
+
+
+@pytest.mark.parametrize("expressao", [
+    r"USER_[A-Z0-9]{8}",
+    r"\d{3}\.\d{3}\.\d{3}-\d{2}",
+    r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}",
+    r"((25[0-5]|2[0-4]\d|1?\d?\d)\.){3}(25[0-5]|2[0-4]\d|1?\d?\d)",
+    r"\(\d{2}\)\s?9?\d{4}-\d{4}",
+    r"[^abc]{2,5}x*",
+    r"^(foo|barbaz)+$",
+])
+def test_programa_regex_gera_valores_validos(expressao):
+    """O plano compilado deve gerar apenas strings que casam com a regex."""
+    programa = ProgramaRegex(expressao)
+    valores = programa.gerar_lote(500, np.random.default_rng(0))
+    assert len(valores) == 500
+    assert all(re.fullmatch(expressao, v) for v in valores)
+
+
+def test_regex_de_largura_fixa_gera_bytes():
+    """
+    Regex ASCII de comprimento fixo geram arrays 'S' (via uint8) com os
+    mesmos valores.
+    """
+    expressao = r"\d{5}-\d{3}"
+    programa = compilar_regex(expressao)
+    assert programa.bytes_fixos
+
+    gerador = GeradorRegex(
+        ConfigGeradorRegex(expressao=expressao), np.random.default_rng(4)
+    )
+    lote = gerador.gerarLote(1_000)
+    assert isinstance(lote, np.ndarray) and lote.dtype == np.dtype("S9")
+    esperado = programa.gerar_lote(1_000, np.random.default_rng(4))
+    assert [v.decode() for v in lote.tolist()] == esperado
+    assert all(re.fullmatch(expressao, v.decode()) for v in lote.tolist())
+
+    # Sem os requisitos, o gerador continua devolvendo listas de str
+    for expressao in (r"[áé]{3}", r"\d{2,4}"):
+        assert not compilar_regex(expressao).bytes_fixos
+        gerador = GeradorRegex(ConfigGeradorRegex(expressao=expressao))
+        assert isinstance(gerador.gerarLote(3), list)
+
+
+@pytest.mark.parametrize("colunas", [
+    [np.array([b"123-45", b"678-90"]), np.array([b"AB", b"CD"])],
+    [np.array([b"123-45", b"678-90"]), np.array([1.5, -2.0]), ["x", "y z"]],
+    [np.array([b"1,2", b"34"]), np.array([1, 2])],
+    [np.array([b"", b"ab"])],
+])
+def test_codificador_csv_bytes_igual_ao_de_texto(colunas):
+    """O caminho de bytes (colunas 'S') gera o mesmo CSV que o caminho de texto."""
+    textuais = [
+        [v.decode() for v in c.tolist()]
+        if isinstance(c, np.ndarray) and c.dtype.kind == "S" else c
+        for c in colunas
+    ]
+    for delimitador, separador in ((",", "."), (";", ",")):
+        texto = codificar_colunas_csv(textuais, delimitador, separador)
+        bytes_csv = codificar_colunas_csv_bytes(colunas, delimitador, separador)
+        assert bytes_csv == texto.encode("utf-8")
+
+
+def test_gerador_regex_fallback_rstr():
+    """Regex com referência a grupo não é compilada e usa o rstr."""
+    with pytest.raises(PadraoNaoSuportado):
+        ProgramaRegex(r"(ab)-\1")
+
+    gerador = GeradorRegex(ConfigGeradorRegex(expressao=r"(ab)-\1"))
+    assert gerador.programa is None
+    assert gerador.gerarLote(2) == ["ab-ab", "ab-ab"]
+
+
+@pytest.mark.parametrize("config, media_esperada", [
+    (ConfigGeradorUniforme(minimo=10, maximo=20), 15.0),
+    (ConfigGeradorExponencial(taxa=0.5), 2.0),
+    (ConfigGeradorLogNormal(media=0, desvioPadrao=0.5), float(np.exp(0.125))),
+    (ConfigGeradorPoisson(media=4), 4.0),
+])
+def test_distribuicoes_adicionais(config, media_esperada):
+    """As distribuições do RF08 geram lotes NumPy com a média esperada."""
+    gerador = get_gerador(config, np.random.default_rng(0))
+    lote = gerador.gerarLote(100_000)
+
+    assert isinstance(lote, np.ndarray) and lote.shape == (100_000,)
+    assert lote.mean() == pytest.approx(media_esperada, rel=0.02)
+    tipo = int if config.tipoGerador == "poisson" else float
+    assert isinstance(gerador.gerarValor(), tipo)
+    if config.tipoGerador == "uniforme":
+        assert lote.min() >= 10 and lote.max() < 20
+
+
+def test_gerador_categorico_com_pesos():
+    """Categorias são sorteadas na proporção dos pesos; peso zero nunca aparece."""
+    config = ConfigGeradorCategorico(
+        categorias=["SP", "RJ", "AM", "MG"], pesos=[6, 3, 0, 1]
+    )
+    gerador = GeradorCategorico(config, np.random.default_rng(1))
+    valores, contagens = np.unique(gerador.gerarLote(100_000), return_counts=True)
+
+    assert valores.tolist() == ["MG", "RJ", "SP"]
+    assert (contagens / 100_000) == pytest.approx([0.1, 0.3, 0.6], abs=0.01)
+    unica = GeradorCategorico(ConfigGeradorCategorico(categorias=["x"]))
+    assert unica.gerarValor() == "x"
+
+    with pytest.raises(ValueError, match="um valor por categoria"):
+        ConfigGeradorCategorico(categorias=["a", "b"], pesos=[1])
+    with pytest.raises(ValueError, match="soma dos 'pesos'"):
+        ConfigGeradorCategorico(categorias=["a", "b"], pesos=[0, 0])
+
+
 # Teste para a Factory
 
 def test_get_gerador_factory():
@@ -78,11 +275,12 @@ def test_sistema_gerador():
     sistema = SistemaGerador(config_csv)
 
     # Mock dos geradores para ter um resultado previsível
+    # (a geração é colunar: cada gerador produz um lote por chamada)
     mock_gerador_a = Mock()
-    mock_gerador_a.gerarValor.return_value = "VALOR_A"
+    mock_gerador_a.gerarLote.side_effect = lambda n: ["VALOR_A"] * n
     
     mock_gerador_b = Mock()
-    mock_gerador_b.gerarValor.return_value = "VALOR_B"
+    mock_gerador_b.gerarLote.side_effect = lambda n: ["VALOR_B"] * n
 
     sistema.geradores_por_coluna = [mock_gerador_a, mock_gerador_b]
 
@@ -94,9 +292,245 @@ def test_sistema_gerador():
     assert dados[0] == {"COL_A": "VALOR_A", "COL_B": "VALOR_B"}
     assert dados[4] == {"COL_A": "VALOR_A", "COL_B": "VALOR_B"}
 
-    # Verifica se os mocks foram chamados o número correto de vezes
-    assert mock_gerador_a.gerarValor.call_count == 5
-    assert mock_gerador_b.gerarValor.call_count == 5
+    # Verifica se cada gerador foi chamado uma única vez, para o lote inteiro
+    mock_gerador_a.gerarLote.assert_called_once_with(5)
+    mock_gerador_b.gerarLote.assert_called_once_with(5)
+    mock_gerador_a.gerarValor.assert_not_called()
+
+
+def test_sistema_gerador_lotes():
+    """Testa a geração em lotes: tamanhos dos lotes e total de linhas."""
+    config_csv = ConfiguracaoCSV(
+        numLinhas=25,
+        colunas=[
+            ConfiguracaoColuna(
+                nome="SEQ",
+                configGerador=ConfigGeradorLinear(valorInicial=0, incremento=1)
+            )
+        ]
+    )
+    sistema = SistemaGerador(config_csv)
+
+    lotes = list(sistema.gerar_lotes(tamanho=10))
+
+    # 25 linhas em lotes de 10 => 10, 10, 5
+    assert [len(lote) for lote in lotes] == [10, 10, 5]
+    # A sequência continua entre os lotes
+    assert lotes[1][0] == {"SEQ": 10.0}
+    assert lotes[2][-1] == {"SEQ": 24.0}
+
+    with pytest.raises(ValueError):
+        next(sistema.gerar_lotes(tamanho=0))
+
+
+def test_sistema_gerador_paralelo_deterministico():
+    """
+    A geração em shards continua a sequência linear entre shards e, com
+    processos > 1, depende apenas da semente e do tamanho do lote.
+    """
+    config_csv = ConfiguracaoCSV(
+        numLinhas=95,
+        colunas=[
+            ConfiguracaoColuna(
+                nome="SEQ",
+                configGerador=ConfigGeradorLinear(valorInicial=5, incremento=2)
+            ),
+            ConfiguracaoColuna(
+                nome="RISCO",
+                configGerador=ConfigGeradorGaussiano(media=0, desvioPadrao=1)
+            ),
+        ]
+    )
+
+    def gerar(processos):
+        sistema = SistemaGerador(
+            config_csv, semente=np.random.SeedSequence(42), processos=processos
+        )
+        return [linha for lote in sistema.gerar_lotes(tamanho=10) for linha in lote]
+
+    dois_processos = gerar(2)
+    assert len(dois_processos) == 95
+    assert [linha["SEQ"] for linha in dois_processos] == [5 + 2 * i for i in range(95)]
+    # Shards diferentes usam fluxos aleatórios diferentes
+    assert dois_processos[0]["RISCO"] != dois_processos[10]["RISCO"]
+    assert gerar(3) == dois_processos
+    # A geração sequencial usa fluxos contínuos por coluna: com a mesma
+    # semente, os valores aleatórios diferem dos shards (a linear não)
+    sequencial = gerar(1)
+    assert [linha["SEQ"] for linha in sequencial] == [
+        linha["SEQ"] for linha in dois_processos
+    ]
+    assert [linha["RISCO"] for linha in sequencial] != [
+        linha["RISCO"] for linha in dois_processos
+    ]
+    # Fora do pool, gerar_shard reproduz o mesmo shard com o plano do processo
+    iniciar_processo_shards(config_csv)
+    shard = gerar_shard(np.random.SeedSequence(42).entropy, 3, 30, 10)
+    assert shard[1].tolist() == [linha["RISCO"] for linha in dois_processos[30:40]]
+
+
+def test_sistema_gerador_semente_reprodutivel():
+    """
+    Com 'semente', cada coluna tem seu próprio fluxo aleatório: a saída é
+    idêntica entre execuções e não muda ao reordenar ou incluir colunas.
+    """
+    risco = ConfiguracaoColuna(
+        nome="RISCO", configGerador=ConfigGeradorGaussiano(media=0, desvioPadrao=1)
+    )
+    chave = ConfiguracaoColuna(
+        nome="CHAVE", configGerador=ConfigGeradorRegex(expressao=r"[A-Z]{6}")
+    )
+    extra = ConfiguracaoColuna(
+        nome="EXTRA", configGerador=ConfigGeradorGaussiano(media=5, desvioPadrao=2)
+    )
+
+    def gerar(colunas, semente=7):
+        config = ConfiguracaoCSV(numLinhas=20, colunas=colunas, semente=semente)
+        return SistemaGerador(config).gerar_dados()
+
+    base = gerar([risco, chave])
+    assert gerar([risco, chave]) == base
+    assert gerar([risco, chave], semente=8) != base
+
+    reordenado = gerar([extra, chave, risco])
+    assert [linha["RISCO"] for linha in reordenado] == [
+        linha["RISCO"] for linha in base
+    ]
+    assert [linha["CHAVE"] for linha in reordenado] == [
+        linha["CHAVE"] for linha in base
+    ]
+
+
+def test_gerador_regex_fallback_semeado():
+    """O caminho via rstr também usa o 'rng' da coluna, e não o 'random' global."""
+    config = ConfigGeradorRegex(expressao=r"([a-z]{4})-\1")
+    primeiro = GeradorRegex(config, np.random.default_rng(3)).gerarLote(5)
+    segundo = GeradorRegex(config, np.random.default_rng(3)).gerarLote(5)
+    assert primeiro == segundo
+
+
+def test_estado_do_sistema_retoma_geracao():
+    """
+    O estado exportado entre dois lotes (serializado em JSON) continua a
+    geração em outro sistema exatamente como o original continuaria.
+    """
+    config = ConfiguracaoCSV.model_validate({
+        "numLinhas": 100,
+        "colunas": [
+            {"nome": "ID", "configGerador": {
+                "tipoGerador": "regex", "expressao": r"[A-Z]{3}-\d{4}"}},
+            {"nome": "NOME", "configGerador": {
+                "tipoGerador": "regex", "expressao": r"([a-z]{3})\1"}},
+            {"nome": "CHAVE", "unico": True, "configGerador": {
+                "tipoGerador": "regex", "expressao": r"\d{6}"}},
+            {"nome": "A", "configGerador": {
+                "tipoGerador": "gaussiano", "media": 0, "desvioPadrao": 1}},
+            {"nome": "B", "configGerador": {
+                "tipoGerador": "gaussiano", "media": 5, "desvioPadrao": 2}},
+            {"nome": "SEQ", "configGerador": {
+                "tipoGerador": "linear", "valorInicial": 1, "incremento": 0.5,
+                "ruido": 0.1}},
+            {"nome": "SOMA", "configGerador": {
+                "tipoGerador": "expressao", "formula": "A + SEQ"}},
+        ],
+        "correlacoes": [{"colunas": ["A", "B"], "correlacao": [[1, 0.5], [0.5, 1]]}],
+    })
+    original = SistemaGerador(config)
+    original.gerar_colunas(30)
+    estado = json.loads(json.dumps(original.exportar_estado()))
+    assert estado["linha"] == 30
+    assert estado["geradores"][5] == {"indice": 30}
+
+    semente = np.random.SeedSequence(estado["entropia"])
+    retomado = SistemaGerador(config, semente=semente)
+    retomado.restaurar_estado(estado)
+    for _ in range(2):
+        esperado, obtido = original.gerar_colunas(20), retomado.gerar_colunas(20)
+        for a, b in zip(esperado, obtido):
+            np.testing.assert_array_equal(np.asarray(a), np.asarray(b))
+
+    with pytest.raises(ValueError, match="outra semente"):
+        outra = SistemaGerador(config, semente=np.random.SeedSequence(1))
+        outra.restaurar_estado(estado)
+
+
+def test_csv_em_blocos_igual_a_string_completa():
+    """
+    O codificador incremental (colunar) deve produzir o mesmo conteúdo do
+    conversor completo.
+    """
+    nomes_colunas = ["Produto", "Preco"]
+    lotes = [
+        [["Item A"], np.array([123.45])],
+        [["Item B; com ponto-e-virgula"], np.array([9.99])],
+    ]
+
+    blocos = list(
+        gerar_csv_em_blocos(lotes, nomes_colunas, delimitador=";", separadorDecimal=",")
+    )
+    esperado = converter_para_csv_string(
+        [
+            {"Produto": "Item A", "Preco": 123.45},
+            {"Produto": "Item B; com ponto-e-virgula", "Preco": 9.99},
+        ],
+        nomes_colunas,
+        delimitador=";",
+        separadorDecimal=",",
+    )
+
+    # 1 bloco de cabeçalho + 1 bloco por lote
+    assert len(blocos) == 3
+    assert b"".join(blocos).decode("utf-8") == esperado
+
+
+@pytest.mark.parametrize(
+    "delimitador,separador", [(",", "."), (";", ","), (",", ","), ("\t", ".")]
+)
+def test_codificador_colunar_identico_ao_dictwriter(delimitador, separador):
+    """O codificador colunar gera exatamente os mesmos bytes que o csv.DictWriter."""
+    import csv
+    import io
+
+    nomes = ["TEXTO", "VALOR", "INTEIRO"]
+    textos = [
+        "simples",
+        'com "aspas"',
+        "com, virgula",
+        "com; ponto",
+        "linha\nquebrada",
+        "",
+        "tab\tx",
+    ]
+    valores = np.array([1.5, -0.1, 1e-7, 123456789.125, float("nan"), 2.0, 1e20])
+    inteiros = np.arange(7)
+
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=nomes, delimiter=delimitador)
+    writer.writeheader()
+    for texto, valor, inteiro in zip(textos, valores.tolist(), inteiros.tolist()):
+        writer.writerow(
+            {
+                "TEXTO": texto,
+                "VALOR": str(valor).replace(".", separador),
+                "INTEIRO": inteiro,
+            }
+        )
+
+    blocos = gerar_csv_em_blocos(
+        [[textos, valores, inteiros]],
+        nomes,
+        delimitador=delimitador,
+        separadorDecimal=separador,
+    )
+    assert b"".join(blocos).decode("utf-8") == buffer.getvalue()
+
+
+def test_codificador_colunar_precisao():
+    """Com 'precisao', os floats são escritos com casas decimais fixas."""
+    csv_string = converter_para_csv_string(
+        [{"V": 1 / 3}, {"V": 2.0}], ["V"], separadorDecimal=",", precisao=3
+    )
+    assert csv_string.split("\r\n")[1:3] == ['"0,333"', '"2,000"']
 
 
 def test_conversor_csv_string_delimitador_separador_customizados():
@@ -123,3 +557,815 @@ def test_conversor_csv_string_delimitador_separador_customizados():
     assert linhas[1] == 'Item A;123,45' # Separador ,
     # O módulo CSV adiciona aspas se o delimitador estiver no campo
     assert linhas[2] == '"Item B; com ponto-e-virgula";9,99'
+
+
+# Teste para o cache de resultados
+
+def test_cache_resultados_lru(tmp_path):
+    """O cache despeja a entrada menos usada ao exceder o tamanho máximo."""
+    cache = CacheResultados(str(tmp_path), tamanho_maximo=10)
+
+    list(cache.gravar_em_fluxo("a" * 64, [b"1234"]))
+    list(cache.gravar_em_fluxo("b" * 64, [b"1234"]))
+    with cache.abrir("a" * 64) as arquivo:  # 'a' passa a ser a mais recente
+        assert arquivo.read() == b"1234"
+    list(cache.gravar_em_fluxo("c" * 64, [b"1234"]))
+
+    assert cache.abrir("b" * 64) is None
+    cache.abrir("c" * 64).close()
+    assert cache.estatisticas()["despejos"] == 1
+    assert cache.estatisticas()["bytes"] == 8
+
+    # Um novo cache na mesma pasta reaproveita as entradas existentes
+    reaberto = CacheResultados(str(tmp_path), tamanho_maximo=10)
+    assert reaberto.estatisticas()["entradas"] == 2
+
+
+def test_cache_resultados_despejo_concorrente_e_sobras(tmp_path):
+    """
+    Uma entrada aberta continua legível se for despejada; sobras '.parcial'
+    são removidas.
+    """
+    cache = CacheResultados(str(tmp_path), tamanho_maximo=4)
+    list(cache.gravar_em_fluxo("a" * 64, [b"1234"]))
+    arquivo = cache.abrir("a" * 64)
+    list(cache.gravar_em_fluxo("b" * 64, [b"5678"]))  # despeja 'a'
+    assert not os.path.exists(cache.caminho("a" * 64))
+    assert b"".join(ler_em_blocos(arquivo)) == b"1234"
+    assert arquivo.closed
+
+    # Removido por fora do cache: conta como falha, não como erro
+    os.remove(cache.caminho("b" * 64))
+    assert cache.abrir("b" * 64) is None
+    assert cache.estatisticas()["bytes"] == 0
+
+    # Um processo que morreu no meio do fluxo deixa um '.parcial' para trás
+    (tmp_path / "tmpabc.parcial").write_bytes(b"12")
+    CacheResultados(str(tmp_path), tamanho_maximo=4)
+    assert not (tmp_path / "tmpabc.parcial").exists()
+
+
+def test_chave_configuracao_canonica():
+    """JSONs equivalentes geram a mesma chave de cache."""
+    curta = ConfiguracaoCSV.model_validate(
+        {
+            "numLinhas": 10,
+            "colunas": [
+                {
+                    "nome": "A",
+                    "configGerador": {
+                        "tipoGerador": "linear",
+                        "valorInicial": 1,
+                        "incremento": 2,
+                    },
+                }
+            ],
+        }
+    )
+    explicita = ConfiguracaoCSV.model_validate(
+        {
+            "colunas": [
+                {
+                    "configGerador": {
+                        "incremento": 2.0,
+                        "valorInicial": 1.0,
+                        "tipoGerador": "linear",
+                    },
+                    "nome": "A",
+                }
+            ],
+            "numLinhas": 10,
+            "delimitador": ",",
+        }
+    )
+    assert chave_configuracao(curta) == chave_configuracao(explicita)
+    assert chave_configuracao(curta) != chave_configuracao(curta, paralelo=True)
+
+
+def test_chave_resultado_inclui_versao_da_geracao(monkeypatch):
+    """Uma nova versão da geração invalida as entradas de cache (e ETags) anteriores."""
+    config = ConfiguracaoCSV.model_validate(
+        {
+            "numLinhas": 10,
+            "semente": 1,
+            "colunas": [
+                {
+                    "nome": "A",
+                    "configGerador": {
+                        "tipoGerador": "gaussiano",
+                        "media": 0,
+                        "desvioPadrao": 1,
+                    },
+                }
+            ],
+        }
+    )
+    atual = servicos.PlanoGeracao(config).chave_resultado(paralelo=False)
+    assert atual == chave_configuracao(
+        config, versao=servicos.VERSAO_GERACAO, paralelo=False
+    )
+    monkeypatch.setattr(servicos, "VERSAO_GERACAO", servicos.VERSAO_GERACAO + 1)
+    assert servicos.PlanoGeracao(config).chave_resultado(paralelo=False) != atual
+
+
+def test_comprimir_fluxo_gzip_incremental():
+    """A compressão em blocos produz um gzip válido do conteúdo inteiro."""
+    import gzip
+
+    blocos = [b"a,b\r\n" * 1000, b"", b"1,2\r\n" * 1000]
+    comprimido = b"".join(comprimir_fluxo(iter(blocos), "gzip"))
+    assert gzip.decompress(comprimido) == b"".join(blocos)
+
+
+@pytest.mark.parametrize("cabecalho, esperado", [
+    (None, None),
+    ("", None),
+    ("identity", None),
+    ("gzip", "gzip"),
+    ("gzip;q=0", None),
+    ("deflate, gzip;q=0.5", "gzip"),
+    ("*", "zstd" if zstd_disponivel() else "gzip"),
+    ("*, gzip;q=0", "zstd" if zstd_disponivel() else None),
+])
+def test_negociar_codificacao(cabecalho, esperado):
+    """A negociação respeita os valores 'q' e prefere zstd quando disponível."""
+    assert negociar_codificacao(cabecalho) == esperado
+
+
+def test_registro_metricas_formato_prometheus():
+    """O registro agrega contadores e resumos e os exporta no formato do Prometheus."""
+    registro = RegistroMetricas()
+    registro.incrementar("gerador_linhas_total", 10)
+    registro.incrementar("gerador_linhas_total", 5)
+    registro.observar("gerador_etapa_segundos", 0.5, etapa="geracao")
+    registro.observar("gerador_etapa_segundos", 0.25, etapa="geracao")
+    registro.incrementar("gerador_bytes_total", 3, formato='c"s\\v')
+
+    texto = registro.exportar()
+
+    assert "# TYPE gerador_linhas_total counter\ngerador_linhas_total 15.0\n" in texto
+    assert 'gerador_etapa_segundos_sum{etapa="geracao"} 0.75' in texto
+    assert 'gerador_etapa_segundos_count{etapa="geracao"} 2' in texto
+    assert 'gerador_bytes_total{formato="c\\"s\\\\v"} 3.0' in texto
+
+
+@pytest.mark.parametrize(
+    "plataforma, esperado", [("linux", 2048 * 1024), ("darwin", 2048)]
+)
+def test_pico_de_memoria_em_bytes_por_plataforma(monkeypatch, plataforma, esperado):
+    """
+    ru_maxrss vem em KiB no Linux e em bytes no macOS; a métrica é sempre
+    em bytes.
+    """
+    uso = Mock(ru_maxrss=2048)
+    monkeypatch.setattr(
+        metricas, "resource", Mock(RUSAGE_SELF=0, getrusage=Mock(return_value=uso))
+    )
+    monkeypatch.setattr(metricas.sys, "platform", plataforma)
+
+    assert f"gerador_memoria_pico_bytes {esperado}\n" in RegistroMetricas().exportar()
+
+
+def test_sistema_gerador_mede_tempo_por_coluna():
+    """O tempo de geração é acumulado por lote no cronômetro do sistema."""
+    config = ConfiguracaoCSV(
+        numLinhas=100,
+        colunas=[
+            ConfiguracaoColuna(
+                nome="A",
+                configGerador=ConfigGeradorLinear(
+                    tipoGerador="linear", valorInicial=0, incremento=1
+                ),
+            ),
+        ],
+    )
+    sistema = SistemaGerador(config)
+    antes = registro_metricas.valor("gerador_valores_total", tipoGerador="linear")
+
+    list(sistema.gerar_lotes_colunares(tamanho=30))
+
+    assert sistema.cronometro.recolher()["geracao"] > 0
+    depois = registro_metricas.valor("gerador_valores_total", tipoGerador="linear")
+    assert depois == antes + 100
+
+
+def test_cache_planos_reaproveita_configuracoes_equivalentes():
+    """
+    Corpos repetidos ou equivalentes (outra ordem, padrões explícitos) usam
+    o mesmo plano.
+    """
+    cache = CachePlanos(tamanho_maximo=2)
+    corpo = (
+        b'{"numLinhas": 5, "colunas": [{"nome": "A", "configGerador": '
+        b'{"tipoGerador": "regex", "expressao": "[A-Z]{3}"}}]}'
+    )
+    equivalente = (
+        b'{"colunas": [{"nome": "A", "configGerador": '
+        b'{"expressao": "[A-Z]{3}", "tipoGerador": "regex"}}], '
+        b'"delimitador": ",", "numLinhas": 5.0}'
+    )
+
+    plano = cache.obter(corpo)
+    assert cache.obter(corpo) is plano
+    assert cache.obter(equivalente) is plano
+    assert plano.programas_regex["[A-Z]{3}"] is compilar_regex("[A-Z]{3}")
+    assert plano.cabecalho_csv == b"A\r\n"
+    assert cache.estatisticas() == {
+        "acertos": 2,
+        "falhas": 1,
+        "entradas": 1,
+        "entradasMaximo": 2,
+    }
+
+    # Sistemas criados a partir do plano geram o mesmo que a configuração direta
+    config = plano.config.model_copy(update={"semente": 3})
+    com_plano = SistemaGerador(config, plano=plano).gerar_dados()
+    assert com_plano == SistemaGerador(config).gerar_dados()
+
+    for linhas in (6, 7):
+        cache.obter(corpo.replace(b"5", str(linhas).encode()))
+    assert cache.estatisticas()["entradas"] == 2
+    assert cache.obter(corpo) is not plano  # despejado (LRU)
+
+
+@pytest.mark.parametrize("tamanho", [1, 7, 1000, 12_345])
+def test_permutacao_feistel_e_bijecao(tamanho):
+    """A permutação leva [0, tamanho) em si mesmo, sem repetições."""
+    chaves = np.random.SeedSequence(1).generate_state(4, np.uint64)
+    imagem = PermutacaoFeistel(tamanho, chaves).aplicar(np.arange(tamanho))
+    assert sorted(imagem.tolist()) == list(range(tamanho))
+
+
+def test_filtro_bloom_descarta_repetidos():
+    """
+    O filtro nunca deixa passar um valor já registrado, nem repetições do
+    mesmo lote.
+    """
+    filtro = FiltroBloom(capacidade=10_000)
+    assert filtro.registrar(["a", "bb", "a", "ccc"]) == ["a", "bb", "ccc"]
+    # Lote mais largo ('U5'): o hash de "bb" não depende da largura do array
+    assert filtro.registrar(["bb", "ddddd", "ccc"]) == ["ddddd"]
+
+
+@pytest.mark.parametrize(
+    "expressao", ["USER_[A-Z0-9]{8}", "[0-9]{4}", "[a-c]{1,8}", r"(\d)\1[0-9]{3}"]
+)
+def test_coluna_unica_sem_repeticoes(expressao):
+    """Colunas 'unico' não repetem valores, entre lotes e inclusive no modo paralelo."""
+    config = ConfiguracaoCSV(numLinhas=5_000, semente=4, colunas=[
+        ConfiguracaoColuna(
+            nome="K", unico=True, configGerador=ConfigGeradorRegex(expressao=expressao)
+        ),
+    ])
+
+    def valores(processos):
+        sistema = SistemaGerador(config, processos=processos)
+        lotes = sistema.gerar_lotes_colunares(tamanho=1_000)
+        return [v for lote in lotes for v in lote[0]]
+
+    sequencial, paralelo = valores(1), valores(2)
+
+    assert len(set(sequencial)) == 5_000
+    assert all(re.fullmatch(expressao, v) for v in sequencial)
+    # Regex de comprimento fixo é enumerada por posição: shards dão o mesmo
+    # resultado.
+    # As demais são geradas sequencialmente, mesmo com 'processos' > 1.
+    assert paralelo == sequencial
+
+
+def test_coluna_unica_validacao():
+    """'unico' falha na validação quando não há valores distintos suficientes."""
+    def coluna(config_gerador):
+        return {"nome": "K", "unico": True, "configGerador": config_gerador}
+
+    with pytest.raises(ValueError, match="no máximo 1000 valores distintos"):
+        ConfiguracaoCSV.model_validate({"numLinhas": 1001, "colunas": [
+            coluna({"tipoGerador": "regex", "expressao": r"\d{3}"})
+        ]})
+    with pytest.raises(ValueError, match="gera valores repetidos"):
+        ConfiguracaoCSV.model_validate({"numLinhas": 10, "colunas": [
+            coluna({"tipoGerador": "linear", "valorInicial": 0, "incremento": 0})
+        ]})
+    with pytest.raises(ValueError, match="gera valores repetidos"):
+        ConfiguracaoCSV.model_validate({
+            "numLinhas": 10, "precisaoDecimal": 1, "colunas": [
+                coluna({"tipoGerador": "linear", "valorInicial": 0, "incremento": 0.01})
+            ],
+        })
+    with pytest.raises(ValueError, match="não é suportado pelo gerador 'gaussiano'"):
+        ConfiguracaoCSV.model_validate({"numLinhas": 10, "colunas": [
+            coluna({"tipoGerador": "gaussiano", "media": 0, "desvioPadrao": 1})
+        ]})
+
+
+def test_tamanho_linguagem_para_no_limite():
+    """
+    A contagem da linguagem satura em 'limite', sem aritmética com inteiros
+    enormes.
+    """
+    assert compilar_regex("(a|b){0,3}").tamanho_linguagem(limite=100) == 15
+    assert compilar_regex("(a|b){0,3}").tamanho_linguagem(limite=10) == 10
+
+    # Repetições aninhadas: a linguagem exata teria milhares de dígitos
+    inicio = time.perf_counter()
+    config = ConfiguracaoCSV.model_validate({"numLinhas": 1_000_000, "colunas": [
+        {"nome": "K", "unico": True, "configGerador": {
+            "tipoGerador": "regex", "expressao": r"((\w*)*)*",
+        }},
+    ]})
+    assert time.perf_counter() - inicio < 1
+    assert config.colunas[0].unico
+
+
+def test_colunas_correlacionadas():
+    """
+    Um grupo de correlação mantém as marginais das colunas e impõe a
+    correlação pedida.
+    """
+    config = ConfiguracaoCSV.model_validate({
+        "numLinhas": 200_000,
+        "semente": 8,
+        "colunas": [
+            {"nome": "RISCO", "configGerador": {
+                "tipoGerador": "gaussiano", "media": 500, "desvioPadrao": 100}},
+            {"nome": "ID", "configGerador": {
+                "tipoGerador": "regex", "expressao": "[A-Z]{3}"}},
+            {"nome": "VALOR", "configGerador": {
+                "tipoGerador": "gaussiano", "media": 1000, "desvioPadrao": 300}},
+        ],
+        "correlacoes": [
+            {"colunas": ["VALOR", "RISCO"], "correlacao": [[1, -0.7], [-0.7, 1]]}
+        ],
+    })
+    lotes = list(SistemaGerador(config).gerar_lotes_colunares(tamanho=30_000))
+    risco = np.concatenate([lote[0] for lote in lotes])
+    valor = np.concatenate([lote[2] for lote in lotes])
+
+    assert np.corrcoef(risco, valor)[0, 1] == pytest.approx(-0.7, abs=0.01)
+    assert (risco.mean(), risco.std()) == pytest.approx((500, 100), rel=0.01)
+    assert (valor.mean(), valor.std()) == pytest.approx((1000, 300), rel=0.01)
+
+    # Coluna a coluna (ex: .npz), os valores são os mesmos da geração por lotes
+    sistema = SistemaGerador(config)
+    por_coluna = [
+        np.concatenate(list(sistema.gerar_lotes_da_coluna(i, 30_000))) for i in (0, 2)
+    ]
+    np.testing.assert_array_equal(por_coluna[0], risco)
+    np.testing.assert_array_equal(por_coluna[1], valor)
+
+
+def test_colunas_correlacionadas_coluna_a_coluna_com_memoria_limitada():
+    """
+    Gerado coluna a coluna, um grupo correlacionado não acumula os lotes das
+    outras colunas.
+    """
+    config = ConfiguracaoCSV.model_validate({
+        "numLinhas": 1_000_000,
+        "semente": 2,
+        "colunas": [
+            {"nome": nome, "configGerador": {
+                "tipoGerador": "gaussiano", "media": 0, "desvioPadrao": 1}}
+            for nome in "AB"
+        ],
+        "correlacoes": [{"colunas": ["A", "B"], "correlacao": [[1, 0.5], [0.5, 1]]}],
+    })
+    sistema = SistemaGerador(config)
+    tracemalloc.start()
+    try:
+        for indice in (0, 1):
+            for _ in sistema.gerar_lotes_da_coluna(indice, 10_000):
+                pass
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    # Um lote do grupo tem 2 x 10.000 floats (160 kB); a coluna inteira, 8 MB
+    assert pico < 2_000_000
+    assert not sistema.geradores_por_coluna[0].grupo.pendente
+
+
+@pytest.mark.parametrize("correlacoes, mensagem", [
+    ([{"colunas": ["A", "B"], "correlacao": [[1, 0.5], [0.4, 1]]}], "simétrica"),
+    ([{"colunas": ["A", "B"], "correlacao": [[1, 0.5]]}], "matriz 2x2"),
+    ([{"colunas": ["A", "B", "C"],
+       "correlacao": [[1, 0.9, -0.9], [0.9, 1, 0.9], [-0.9, 0.9, 1]]}], "semidefinida"),
+    ([{"colunas": ["A", "X"], "correlacao": [[1, 0], [0, 1]]}], "inexistente"),
+    ([{"colunas": ["A", "L"], "correlacao": [[1, 0], [0, 1]]}],
+     "Apenas colunas gaussianas"),
+    ([{"colunas": ["A", "B"], "correlacao": [[1, 0], [0, 1]]},
+      {"colunas": ["B", "C"], "correlacao": [[1, 0], [0, 1]]}], "mais de um grupo"),
+])
+def test_correlacoes_invalidas(correlacoes, mensagem):
+    """Grupos de correlação inconsistentes falham na validação (RF05)."""
+    gaussiana = {"tipoGerador": "gaussiano", "media": 0, "desvioPadrao": 1}
+    linear = {"tipoGerador": "linear", "valorInicial": 0, "incremento": 1}
+    with pytest.raises(ValueError, match=mensagem):
+        ConfiguracaoCSV.model_validate({
+            "numLinhas": 10,
+            "colunas": [{"nome": nome, "configGerador": gaussiana} for nome in "ABC"]
+            + [{"nome": "L", "configGerador": linear}],
+            "correlacoes": correlacoes,
+        })
+
+
+def test_gerador_linear_com_ruido():
+    """
+    O ruído gaussiano é somado à tendência linear; sem ruído, a sequência é
+    exata.
+    """
+    gerador = GeradorLinear(
+        ConfigGeradorLinear(valorInicial=10, incremento=2, ruido=0.5),
+        np.random.default_rng(3),
+    )
+    residuos = gerador.gerarLote(100_000) - (10 + 2 * np.arange(100_000))
+
+    assert residuos.mean() == pytest.approx(0, abs=0.01)
+    assert residuos.std() == pytest.approx(0.5, rel=0.02)
+    exato = GeradorLinear(ConfigGeradorLinear(valorInicial=1, incremento=1))
+    assert exato.gerarLote(3).tolist() == [1, 2, 3]
+
+
+def test_formula_avaliada_em_lote():
+    """Fórmulas operam sobre os lotes inteiros das colunas, com os tipos inferidos."""
+    contexto = {
+        "PRECO": np.array([2.5, 4.0, 10.0]),
+        "QTD": np.array([2, 0, 3]),
+        "UF": ["SP", "RJ", "SP"],
+    }
+
+    total = compilar_formula("PRECO * QTD if UF == 'SP' else 0")
+    assert total.dependencias == {"PRECO", "QTD", "UF"}
+    assert total.tipo({"PRECO": "numero", "QTD": "inteiro", "UF": "texto"}) == "numero"
+    assert total.avaliar(contexto, 3).tolist() == [5.0, 0.0, 30.0]
+
+    chave = compilar_formula('UF + "-" + preencher(texto(QTD + 1), 4)')
+    assert chave.avaliar(contexto, 3).tolist() == ["SP-0003", "RJ-0001", "SP-0004"]
+    assert compilar_formula("7").avaliar(contexto, 3).tolist() == [7, 7, 7]
+    arredondada = compilar_formula("arredondar(PRECO * 13, -1)")
+    assert arredondada.avaliar(contexto, 3).tolist() == [30.0, 50.0, 130.0]
+
+
+@pytest.mark.parametrize("formula, mensagem", [
+    ("__import__('os')", "Função não permitida"),
+    ("__import__('os').system('ls')", "Construção não permitida"),
+    ("PRECO.real", "Construção não permitida"),
+    ("[PRECO][0]", "Construção não permitida"),
+    ("lambda: 1", "Construção não permitida"),
+    ("PRECO *", "sintaxe inválida"),
+    ("raiz(PRECO, 2)", "Número de argumentos"),
+    ("-" * 999 + "PRECO", "aninhada demais"),
+    ("PRECO" + " + PRECO" * 150, "aninhada demais"),
+    ("preencher(texto(QTD), inteiro(QTD))", "deve ser um número inteiro"),
+    ("preencher(texto(QTD), 4.5)", "deve ser um número inteiro"),
+    ("preencher(texto(QTD), 10**9)", "deve ser um número inteiro"),
+    ("preencher(texto(QTD), 1000000000)", "deve estar entre 0 e 1000"),
+    ("arredondar(PRECO, QTD)", "deve ser um número inteiro"),
+])
+def test_formula_com_construcoes_proibidas(formula, mensagem):
+    """Só expressões aritméticas, comparações e as funções de FUNCOES são aceitas."""
+    with pytest.raises(ErroExpressao, match=mensagem):
+        compilar_formula(formula)
+
+
+def test_colunas_derivadas_validadas():
+    """
+    Referências desconhecidas, ciclos e tipos incompatíveis falham na
+    validação (RF05).
+    """
+    def config(*formulas):
+        return {
+            "numLinhas": 10,
+            "colunas": [
+                {"nome": "UF", "configGerador": {
+                    "tipoGerador": "categorico", "categorias": ["SP"]}},
+                {"nome": "N", "configGerador": {"tipoGerador": "poisson", "media": 2}},
+            ] + [
+                {"nome": nome, "configGerador": {
+                    "tipoGerador": "expressao", "formula": formula}}
+                for nome, formula in formulas
+            ],
+        }
+
+    valida = ConfiguracaoCSV.model_validate(config(("D", "N * 2"), ("E", "D / 4")))
+    assert valida.tipos_valores() == ["texto", "inteiro", "inteiro", "numero"]
+    with pytest.raises(ValueError, match="Coluna desconhecida na fórmula: 'X'"):
+        ConfiguracaoCSV.model_validate(config(("D", "X + 1")))
+    with pytest.raises(ValueError, match="D -> E -> D"):
+        ConfiguracaoCSV.model_validate(config(("D", "E + 1"), ("E", "D + N")))
+    with pytest.raises(ValueError, match="Operação inválida entre texto e inteiro"):
+        ConfiguracaoCSV.model_validate(config(("D", "UF * N")))
+    with pytest.raises(ErroExpressao, match="A -> B -> A"):
+        ordem_topologica({"A": ["B"], "B": ["A", "C"]})
+
+
+def test_coluna_derivada_gerada_sozinha():
+    """
+    Gerada coluna a coluna (ex: .npz), a derivada coincide com a geração por
+    lotes.
+    """
+    config = ConfiguracaoCSV.model_validate({
+        "numLinhas": 1_000,
+        "semente": 5,
+        "colunas": [
+            {"nome": "TOTAL", "configGerador": {
+                "tipoGerador": "expressao", "formula": "PRECO * QTD"}},
+            {"nome": "PRECO", "configGerador": {
+                "tipoGerador": "uniforme", "minimo": 1, "maximo": 9}},
+            {"nome": "QTD", "configGerador": {"tipoGerador": "poisson", "media": 4}},
+        ],
+    })
+    lotes = list(SistemaGerador(config).gerar_lotes_colunares(tamanho=300))
+    total, preco, qtd = (np.concatenate([lote[i] for lote in lotes]) for i in range(3))
+    np.testing.assert_array_equal(total, preco * qtd)
+
+    sistema = SistemaGerador(config)
+    for indice, esperado in ((0, total), (1, preco)):
+        coluna = np.concatenate(list(sistema.gerar_lotes_da_coluna(indice, 300)))
+        np.testing.assert_array_equal(coluna, esperado)
+
+
+def test_gerar_dados_colunar_com_visao_de_linhas():
+    """
+    'gerar_dados' guarda arrays por coluna e ainda se lê como lista de
+    dicionários.
+    """
+    config = ConfiguracaoCSV.model_validate({
+        "numLinhas": 25_000,
+        "semente": 2,
+        "colunas": [
+            {"nome": "NOME", "configGerador": {
+                "tipoGerador": "categorico", "categorias": ["Ana", "João"]}},
+            {"nome": "SEQ", "configGerador": {
+                "tipoGerador": "linear", "valorInicial": 0, "incremento": 1}},
+            {"nome": "QTD", "configGerador": {"tipoGerador": "poisson", "media": 2}},
+        ],
+    })
+    dados = SistemaGerador(config).gerar_dados()
+
+    assert isinstance(dados, DadosColunares)
+    assert [coluna.dtype.kind for coluna in dados.colunas] == ["S", "f", "i"]
+    assert dados.nbytes < 25_000 * 30
+    assert len(dados) == 25_000
+    assert dados[-1]["SEQ"] == 24_999.0 and dados[-1]["NOME"] in ("Ana", "João")
+    assert [linha["SEQ"] for linha in dados[10:13]] == [10.0, 11.0, 12.0]
+    linhas = list(dados)
+    assert dados == linhas and dados == SistemaGerador(config).gerar_dados()
+    assert set(dados.valores("NOME")) == {"Ana", "João"}
+
+    # O CSV é codificado direto das colunas, com o mesmo resultado das linhas
+    nomes = dados.nomes_colunas
+    csv_colunar = converter_para_csv_string(dados, nomes)
+    assert csv_colunar == converter_para_csv_string(linhas, nomes)
+
+
+@pytest.mark.parametrize("expressao", [
+    "USER_[A-Z0-9]{8}",
+    r"\d{3}\.\d{3}\.\d{3}-\d{2}",
+    "[A-Z][a-z]{2,9} [A-Z][a-z]{3,8}",
+])
+def test_inferir_regex_recupera_a_expressao(expressao):
+    """A regex inferida de uma amostra grande mantém os literais e agrupa as classes."""
+    gerador = GeradorRegex(
+        ConfigGeradorRegex(expressao=expressao), np.random.default_rng(2)
+    )
+    amostra = [
+        valor.decode() if isinstance(valor, bytes) else valor
+        for valor in gerador.gerarLote(1_000)
+    ]
+    assert inferir_regex(amostra, 0, 0) == expressao
+
+
+@pytest.mark.parametrize("amostra, esperada", [
+    # Poucos textos: letras e dígitos iguais por acaso não viram literais
+    (["AB-10", "AC-12"], r"[A-Z]{2}-\d{2}"),
+    (["a1", "b-2c", "xyz"], r"[a-z0-9\-]{2,4}"),
+])
+def test_inferir_regex_amostra_pequena(amostra, esperada):
+    assert inferir_regex(amostra, 2, 4) == esperada
+    assert all(re.fullmatch(esperada, texto) for texto in amostra)
+
+
+def test_perfilar_csv_recupera_a_configuracao():
+    """O perfil de um CSV gerado reconstrói os geradores e parâmetros de cada coluna."""
+    original = ConfiguracaoCSV.model_validate({
+        "numLinhas": 30_000,
+        "semente": 4,
+        "delimitador": ";",
+        "separadorDecimal": ",",
+        "colunas": [
+            {"nome": "ID", "configGerador": {
+                "tipoGerador": "regex", "expressao": "USER_[A-Z0-9]{8}"}},
+            {"nome": "RISCO", "configGerador": {
+                "tipoGerador": "gaussiano", "media": 150.5, "desvioPadrao": 25}},
+            {"nome": "SEQ", "configGerador": {
+                "tipoGerador": "linear", "valorInicial": 10, "incremento": 0.5}},
+            {"nome": "UF", "configGerador": {
+                "tipoGerador": "categorico", "categorias": ["SP", "RJ"],
+                "pesos": [3, 1]}},
+        ],
+    })
+    texto = converter_para_csv_string(
+        SistemaGerador(original).gerar_dados(), ["ID", "RISCO", "SEQ", "UF"], ";", ","
+    )
+
+    # Blocos pequenos: as estatísticas são combinadas entre vários blocos
+    perfil = perfilar_csv(
+        io.StringIO(texto, newline=""), ";", ",", tamanho_bloco=7_000, semente=1
+    )
+
+    assert perfil.numLinhas == 30_000
+    assert (perfil.delimitador, perfil.separadorDecimal) == (";", ",")
+    id_, risco, seq, uf = (coluna.configGerador for coluna in perfil.colunas)
+    assert id_.tipoGerador == "regex" and id_.expressao == "USER_[A-Z0-9]{8}"
+    assert risco.tipoGerador == "gaussiano"
+    assert (risco.media, risco.desvioPadrao) == pytest.approx((150.5, 25), rel=0.01)
+    valores = SistemaGerador(original).gerar_dados().valores("RISCO")
+    esperado = (np.mean(valores), np.std(valores, ddof=1))
+    assert (risco.media, risco.desvioPadrao) == pytest.approx(esperado)
+    assert (seq.tipoGerador, seq.valorInicial, seq.incremento) == ("linear", 10, 0.5)
+    assert uf.tipoGerador == "categorico" and uf.categorias == ["SP", "RJ"]
+    assert uf.pesos[0] / sum(uf.pesos) == pytest.approx(0.75, abs=0.01)
+
+
+def _esquema_lojas(**pedidos_referencia):
+    return {
+        "semente": 21,
+        "tabelas": [
+            {"nome": "pedidos", "numLinhas": 20_000, "colunas": [
+                {"nome": "ID_PEDIDO", "configGerador": {
+                    "tipoGerador": "linear", "valorInicial": 1, "incremento": 1}},
+                {"nome": "ID_USUARIO", "configGerador": {
+                    "tipoGerador": "referencia", "tabela": "usuarios",
+                    "coluna": "ID_USUARIO", **pedidos_referencia}},
+                {"nome": "ID_LOJA", "configGerador": {
+                    "tipoGerador": "referencia", "tabela": "lojas",
+                    "coluna": "ID_LOJA"}},
+            ]},
+            {"nome": "usuarios", "numLinhas": 1_000, "colunas": [
+                {"nome": "ID_USUARIO", "unico": True, "configGerador": {
+                    "tipoGerador": "regex", "expressao": "USER_[A-Z0-9]{8}"}},
+            ]},
+            {"nome": "lojas", "numLinhas": 50, "colunas": [
+                {"nome": "ID_LOJA", "unico": True, "configGerador": {
+                    "tipoGerador": "linear", "valorInicial": 100, "incremento": 1}},
+            ]},
+        ],
+    }
+
+
+def _tabelas_csv(gerador):
+    tabelas = {}
+    for posicao, tabela in enumerate(gerador.ordem):
+        texto = b"".join(gerador.gerar_tabela(posicao)).decode()
+        tabelas[tabela.nome] = [linha.split(",") for linha in texto.splitlines()[1:]]
+    return tabelas
+
+
+def test_esquema_relacional_chaves_estrangeiras_validas():
+    """Cada chave estrangeira aponta para uma chave existente da tabela referenciada."""
+    esquema = EsquemaRelacional.model_validate(_esquema_lojas())
+    gerador = GeradorEsquema(esquema, tamanho=3_000)
+    assert [tabela.nome for tabela in gerador.ordem] == ["lojas", "usuarios", "pedidos"]
+
+    tabelas = _tabelas_csv(gerador)
+    usuarios = {linha[0] for linha in tabelas["usuarios"]}
+    lojas = {linha[0] for linha in tabelas["lojas"]}
+    assert len(usuarios) == 1_000 and len(lojas) == 50
+    assert len(tabelas["pedidos"]) == 20_000
+    assert {linha[1] for linha in tabelas["pedidos"]} <= usuarios
+    assert {linha[2] for linha in tabelas["pedidos"]} == lojas
+    # Depois da última tabela que as lê, as chaves deixam a memória
+    assert gerador.chaves == {}
+
+    # Mesma semente, mesmos dados
+    assert _tabelas_csv(GeradorEsquema(esquema)) == tabelas
+
+
+def test_esquema_relacional_chaves_compactadas_por_lote():
+    """
+    As chaves guardadas são compactadas a cada lote: o pico fica perto do
+    índice final.
+    """
+    esquema = EsquemaRelacional.model_validate({"semente": 1, "tabelas": [
+        {"nome": "filhos", "numLinhas": 10, "colunas": [
+            {"nome": "PAI", "configGerador": {
+                "tipoGerador": "referencia", "tabela": "pais", "coluna": "COD"}},
+        ]},
+        {"nome": "pais", "numLinhas": 200_000, "colunas": [
+            {"nome": "COD", "unico": True, "configGerador": {
+                "tipoGerador": "regex", "expressao": "[A-Z]{12}"}},
+        ]},
+    ]})
+    gerador = GeradorEsquema(esquema, tamanho=10_000)
+    posicao = [tabela.nome for tabela in gerador.ordem].index("pais")
+    tracemalloc.start()
+    try:
+        for _ in gerador.gerar_tabela(posicao):
+            pass
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    indice = gerador.chaves[("pais", "COD")]
+    # 200.000 chaves de 12 bytes (2,4 MB); como listas de str, seriam ~15 MB
+    assert indice.nbytes == 200_000 * 12
+    assert pico < 3 * indice.nbytes
+
+
+def _contagens_usuarios(esquema):
+    pedidos = _tabelas_csv(GeradorEsquema(EsquemaRelacional.model_validate(esquema)))
+    return np.unique([linha[1] for linha in pedidos["pedidos"]], return_counts=True)[1]
+
+
+def test_esquema_relacional_referencia_zipf():
+    """distribuicao 'zipf' concentra as referências em poucas chaves."""
+    contagens = _contagens_usuarios(_esquema_lojas(distribuicao="zipf", expoente=1.2))
+    pesos = np.arange(1, 1_001, dtype=np.float64) ** -1.2
+    esperada = pesos[0] / pesos.sum()
+    assert contagens.max() / 20_000 == pytest.approx(esperada, abs=0.02)
+
+    assert _contagens_usuarios(_esquema_lojas()).max() < 60
+
+
+_ULTIMO_PEDIDO = {"nome": "ULTIMO_PEDIDO", "configGerador": {
+    "tipoGerador": "referencia", "tabela": "pedidos", "coluna": "ID_PEDIDO"}}
+
+
+@pytest.mark.parametrize("alterar, mensagem", [
+    (lambda e: e["tabelas"][0]["colunas"][1]["configGerador"].update(
+        tabela="clientes"), "tabela inexistente 'clientes'"),
+    (lambda e: e["tabelas"][0]["colunas"][1]["configGerador"].update(
+        coluna="NOME"), "coluna inexistente"),
+    (lambda e: e["tabelas"][1]["colunas"][0].update(unico=False), "deve ser uma chave"),
+    (lambda e: e["tabelas"][2].update(nome="usuarios"), "Nome de tabela repetido"),
+    (lambda e: e["tabelas"][1]["colunas"].append(_ULTIMO_PEDIDO), "deve ser uma chave"),
+    (lambda e: (
+        e["tabelas"][0]["colunas"][0].update(unico=True),
+        e["tabelas"][1]["colunas"].append(_ULTIMO_PEDIDO),
+    ), "Dependência circular entre tabelas"),
+])
+def test_esquema_relacional_invalido(alterar, mensagem):
+    esquema = _esquema_lojas()
+    alterar(esquema)
+    with pytest.raises(ValueError, match=mensagem):
+        EsquemaRelacional.model_validate(esquema)
+
+
+def test_referencia_fora_de_esquema():
+    """Colunas 'referencia' só fazem sentido dentro de um esquema."""
+    with pytest.raises(ValueError, match="só podem ser usadas nas tabelas de um"):
+        ConfiguracaoCSV.model_validate(_esquema_lojas()["tabelas"][0])
+
+
+# Dependências da API ou de caminhos opcionais, que o motor não deve carregar
+MODULOS_FORA_DO_MOTOR = [
+    "fastapi", "starlette", "jinja2", "rstr", "pyarrow", "zstandard", "multiprocessing",
+]
+# Orçamentos de importação do motor, em ms (-X importtime, melhor de 3 execuções):
+# tempo próprio dos módulos do pacote, incluindo a montagem dos validadores, e
+# tempo total, que inclui numpy e pydantic (~260 ms na máquina de desenvolvimento)
+ORCAMENTO_IMPORTACAO_PACOTE_MS = 100
+ORCAMENTO_IMPORTACAO_TOTAL_MS = 500
+
+
+def _medir_importacao(
+    comando: list[str], raiz: str, ambiente: dict
+) -> tuple[set[str], int, int]:
+    """Módulos carregados e tempos (do pacote, total) em µs de uma importação."""
+    resultado = subprocess.run(
+        comando, cwd=raiz, env=ambiente, capture_output=True, text=True, check=True
+    )
+    pacote_us = total_us = 0
+    for linha in resultado.stderr.splitlines():
+        if not linha.startswith("import time:") or "[us]" in linha:
+            continue
+        proprio, acumulado, modulo = linha.removeprefix("import time:").split("|")
+        if modulo.strip().startswith("src"):
+            pacote_us += int(proprio)
+            if not modulo.startswith("  "):  # primeiro nível: inclui as dependências
+                total_us += int(acumulado)
+    return set(resultado.stdout.split()), pacote_us, total_us
+
+
+def test_importacao_do_motor_leve():
+    """
+    O motor importa sem a API nem dependências opcionais, dentro do orçamento
+    (-X importtime).
+    """
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    ambiente = dict(os.environ)
+    ambiente.pop("PYTHONDONTWRITEBYTECODE", None)
+    comando = [sys.executable, "-X", "importtime", "-c", (
+        "import sys; antes = set(sys.modules); import src.gerador_dados.servicos; "
+        "print(*sorted(set(sys.modules) - antes))"
+    )]
+    # A primeira execução grava os .pyc; as seguintes medem a importação como
+    # em produção
+    subprocess.run(comando, cwd=raiz, env=ambiente, capture_output=True, check=True)
+    medicoes = [_medir_importacao(comando, raiz, ambiente) for _ in range(3)]
+
+    carregados = medicoes[0][0]
+    assert "src.gerador_dados.servicos" in carregados
+    assert [modulo for modulo in MODULOS_FORA_DO_MOTOR if modulo in carregados] == []
+    pacote_ms = min(pacote for _, pacote, _ in medicoes) / 1000
+    total_ms = min(total for _, _, total in medicoes) / 1000
+    assert pacote_ms < ORCAMENTO_IMPORTACAO_PACOTE_MS
+    assert total_ms < ORCAMENTO_IMPORTACAO_TOTAL_MS